@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops  # noqa: E402
+
+from Helpers.movie_cover import open_cover_image, render_vectorized  # noqa: E402
+
+# (name, format, size); the bomb is a tiny file that claims more pixels than the decoder accepts.
+FIXTURES = [
+    ('poster.jpg', 'JPEG', (6000, 9000)),
+    ('poster.png', 'PNG', (3000, 4500)),
+    ('bomb.png', 'PNG', (8200, 8200)),
+]
+PATHS = ['full', 'reduced']
+
+
+def make_poster(size):
+    """
+    Build a poster-sized RGB image from gradients and noise, quickly enough for very large sizes.
+    """
+    horizontal = Image.linear_gradient('L').rotate(90).resize(size)
+    vertical = Image.linear_gradient('L').resize(size)
+    noise = Image.effect_noise(size, 64)
+    return Image.merge('RGB', (horizontal, vertical, ImageChops.add(noise, horizontal, 2.0)))
+
+
+def write_fixtures(directory):
+    paths = {}
+    for name, image_format, size in FIXTURES:
+        path = paths[name] = os.path.join(directory, name)
+        if name.startswith('bomb'):
+            Image.new('1', size).save(path, image_format)
+        elif image_format == 'JPEG':
+            make_poster(size).save(path, image_format, quality=90)
+        else:
+            make_poster(size).save(path, image_format, compress_level=1)
+    return paths
+
+
+def peak_rss_kb():
+    # VmHWM starts over in every new program, unlike ru_maxrss, which Linux carries across exec from the parent.
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def decode(path_name, data, width):
+    if path_name == 'full':
+        return Image.open(BytesIO(data))
+    return open_cover_image(data, width)
+
+
+def measure(path_name, fixture, width, repeat):
+    """
+    Time one decode path on one fixture in this process, and report how far it pushed the peak RSS.
+    """
+    with open(fixture, 'rb') as fixture_file:
+        data = fixture_file.read()
+    baseline_kb = peak_rss_kb()
+    timings = []
+    refused = False
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            render_vectorized(decode(path_name, data, width), width)
+        except Image.DecompressionBombError:
+            refused = True
+        timings.append(time.perf_counter() - started)
+    peak_kb = peak_rss_kb()
+    print(json.dumps({'ms': min(timings) * 1000, 'peak_mb': (peak_kb - baseline_kb) / 1024, 'refused': refused}))
+
+
+def glyph_match(fixture, width):
+    """
+    Compare the uncolored output of both paths.
+
+    Returns:
+        float: The fraction of characters the reduced path renders the same as the full one.
+    """
+    with open(fixture, 'rb') as fixture_file:
+        data = fixture_file.read()
+    full, reduced = (render_vectorized(decode(path_name, data, width), width, colorize=False) for path_name in PATHS)
+    if len(full) != len(reduced):
+        return 0.0
+    return sum(a == b for a, b in zip(full, reduced)) / len(full)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the latency and peak memory of decoding large covers "
+                                                 "at full size and at reduced size")
+    parser.add_argument('--width', type=int, default=120, help="Output width in characters (default: 120)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the fastest one counts (default: 3)")
+    parser.add_argument('--measure', nargs=2, metavar=('PATH', 'FIXTURE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure[0], args.measure[1], args.width, args.repeat)
+        return
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        print("Writing fixture images...")
+        fixtures = write_fixtures(directory)
+        print(f"{'fixture':<11} {'size':>10} {'full':>9} {'reduced':>9} {'full RSS':>10} {'reduced RSS':>12}  match")
+        for name, _, size in FIXTURES:
+            results = {}
+            for path_name in PATHS:
+                # Every path runs in a fresh interpreter, so the peak RSS of one cannot hide the other's.
+                output = subprocess.run([sys.executable, __file__, '--measure', path_name, fixtures[name],
+                                         '--width', str(args.width), '--repeat', str(args.repeat)],
+                                        capture_output=True, text=True, check=True).stdout
+                results[path_name] = json.loads(output.splitlines()[-1])
+            full, reduced = results['full'], results['reduced']
+
+            if name.startswith('bomb'):
+                match = 'refused' if reduced['refused'] else 'DECODED'
+                failed = failed or not reduced['refused']
+            else:
+                match = f"{glyph_match(fixtures[name], args.width):.1%}"
+                failed = failed or reduced['refused'] or reduced['peak_mb'] > full['peak_mb'] or \
+                    reduced['ms'] > full['ms']
+            print(f"{name:<11} {size[0]:>5}x{size[1]:<4} {full['ms']:>7.1f}ms {reduced['ms']:>7.1f}ms "
+                  f"{full['peak_mb']:>8.1f}MB {reduced['peak_mb']:>10.1f}MB  {match}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
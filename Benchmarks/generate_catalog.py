@@ -0,0 +1,208 @@
+import argparse
+import datetime
+import itertools
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_init import ConnectionManager, bind_connection_manager, transaction  # noqa: E402
+from db_migrations import migrate  # noqa: E402
+from Helpers.constants import IMPORT_BATCH_SIZE, PREDEFINED_GENRES, MAX_DESCRIPTION_LENGTH, UNKNOWN_GENRE  # noqa: E402
+from Models.Genre import Genre  # noqa: E402
+from Models.Movie import Movie  # noqa: E402
+
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+ADJECTIVES = [
+    'last', 'dark', 'silent', 'lost', 'hidden', 'broken', 'golden', 'final', 'secret', 'wild', 'red', 'little',
+    'forgotten', 'endless', 'burning', 'frozen', 'crimson', 'midnight', 'distant', 'electric', 'savage', 'quiet',
+    'fallen', 'bright', 'hollow', 'iron', 'long', 'new', 'strange', 'sweet', 'cold', 'perfect', 'deadly', 'eternal',
+]
+NOUNS = [
+    'night', 'city', 'road', 'heart', 'river', 'dream', 'house', 'game', 'war', 'sky', 'storm', 'shadow', 'king',
+    'summer', 'island', 'garden', 'mountain', 'kingdom', 'ghost', 'star', 'machine', 'promise', 'letter', 'sea',
+    'empire', 'wolf', 'fire', 'mirror', 'train', 'winter', 'hunter', 'detective', 'planet', 'queen', 'secret',
+    'journey', 'escape', 'revenge', 'legacy', 'signal', 'frontier', 'harbor', 'crown', 'circus', 'orchard',
+]
+ROLES = [
+    'detective', 'young woman', 'retired soldier', 'family', 'scientist', 'group of friends', 'teenager', 'journalist',
+    'con artist', 'widower', 'rookie cop', 'small-town doctor', 'astronaut', 'chef', 'boxer', 'musician', 'thief',
+]
+VERBS = [
+    'uncovers', 'must stop', 'falls for', 'searches for', 'is haunted by', 'races against', 'fights to protect',
+    'plots to steal', 'tries to escape', 'investigates', 'confronts', 'returns to', 'befriends', 'hides from',
+]
+OBJECTS = [
+    'a conspiracy', 'an old friend', 'a stranger', 'a deadly virus', 'a lost treasure', 'the truth', 'a rival gang',
+    'a missing child', 'a forbidden love', 'an ancient curse', 'a corrupt mayor', 'a killer', 'a second chance',
+]
+PLACES = [
+    'a sleepy village', 'New York', 'post-war Berlin', 'a distant planet', 'the Australian outback', 'Tokyo',
+    'a remote island', 'the suburbs', 'a haunted hotel', 'medieval England', 'the Wild West', 'Paris', 'Mumbai',
+]
+ENDINGS = [
+    'Nothing will ever be the same.', 'Time is running out.', 'Some secrets refuse to stay buried.',
+    'Based on a true story.', 'The past is never far behind.', 'Everything comes at a price.',
+]
+FIRST_NAMES = [
+    'James', 'Maria', 'Akira', 'Sofia', 'Luca', 'Chen', 'Amara', 'David', 'Ingrid', 'Pedro', 'Nadia', 'Olu', 'Greta',
+    'Ravi', 'Hana', 'Tomas', 'Elena', 'Kwame', 'Yuki', 'Claire', 'Mateo', 'Fatima', 'Jonas', 'Leila', 'Sam',
+]
+LAST_NAMES = [
+    'Anderson', 'Kurosawa', 'Rossi', 'Petrov', 'Garcia', 'Okafor', 'Larsen', 'Nguyen', 'Schmidt', 'Kapoor', 'Moreau',
+    'Silva', 'Kowalski', 'Haddad', 'Tanaka', 'Murphy', 'Jensen', 'Mensah', 'Costa', 'Bergman', 'Novak', 'Reyes',
+]
+
+# Relative weights of the genres; the rest are 1. Few movies end up in 'unknown'.
+GENRE_WEIGHTS = {'drama': 20, 'comedy': 15, 'thriller': 8, 'action': 8, 'romance': 7, 'horror': 6, 'documentary': 6,
+                 'crime': 5, 'science fiction': 4, 'adventure': 4, 'family': 3, 'animation': 3, 'fantasy': 3,
+                 UNKNOWN_GENRE: 0.2}
+
+
+def zipf_weights(count, exponent=1.1):
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class CatalogGenerator:
+    """
+    Generate reproducible movies with realistic shapes: Zipf-distributed words and directors,
+    descriptions of varying length, more movies in recent years, a few popular genres and
+    heavy-tailed like counts.
+    """
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.directors = [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES]
+        self.rng.shuffle(self.directors)
+        self.director_weights = zipf_weights(len(self.directors), 0.8)
+        self.adjective_weights = zipf_weights(len(ADJECTIVES))
+        self.noun_weights = zipf_weights(len(NOUNS))
+        self.genres = PREDEFINED_GENRES
+        self.genre_weights = list(itertools.accumulate(GENRE_WEIGHTS.get(genre, 1) for genre in self.genres))
+
+    def adjective(self):
+        return self.rng.choices(ADJECTIVES, cum_weights=self.adjective_weights)[0]
+
+    def noun(self):
+        return self.rng.choices(NOUNS, cum_weights=self.noun_weights)[0]
+
+    def title(self):
+        pattern = self.rng.random()
+        if pattern < 0.3:
+            title = f'The {self.adjective()} {self.noun()}'
+        elif pattern < 0.5:
+            title = f'The {self.noun()} of the {self.noun()}'
+        elif pattern < 0.7:
+            title = f'{self.adjective()} {self.noun()}'
+        elif pattern < 0.85:
+            title = f"{self.rng.choice(FIRST_NAMES)}'s {self.noun()}"
+        else:
+            title = f'{self.noun()} {self.rng.randint(2, 5)}'
+        return string.capwords(title)
+
+    def description(self):
+        sentences = [f'A {self.rng.choice(ROLES)} {self.rng.choice(VERBS)} {self.rng.choice(OBJECTS)} '
+                     f'in {self.rng.choice(PLACES)}.']
+        for _ in range(min(int(self.rng.expovariate(0.6)), 6)):
+            sentences.append(f'{self.rng.choice(["Meanwhile", "Soon", "But", "Years later"])}, '
+                             f'the {self.adjective()} {self.noun()} {self.rng.choice(VERBS)} {self.rng.choice(OBJECTS)}.')
+        if self.rng.random() < 0.4:
+            sentences.append(self.rng.choice(ENDINGS))
+        return ' '.join(sentences)[:MAX_DESCRIPTION_LENGTH]
+
+    def release_date(self):
+        year = max(1900, 2025 - int(self.rng.expovariate(1 / 25)))
+        day = datetime.date(year, 1, 1) + datetime.timedelta(days=self.rng.randrange(365))
+        return day.isoformat()
+
+    def likes(self):
+        return min(int((self.rng.paretovariate(1.2) - 1) * 15), 5_000_000)
+
+    def movie(self, genre_ids):
+        genre = self.rng.choices(self.genres, cum_weights=self.genre_weights)[0]
+        return (self.title(), self.description(), self.release_date(),
+                self.rng.choices(self.directors, cum_weights=self.director_weights)[0], genre_ids[genre], None,
+                self.likes())
+
+
+def generate_catalog(path, rows, seed=42, batch_size=IMPORT_BATCH_SIZE, on_progress=None):
+    """
+    Create a migrated database at path and fill it with generated movies.
+
+    Movies go through Movie.add_batch, so the full-text index and leaderboards are maintained by the
+    usual triggers. A rare generated duplicate is skipped by the unique index, so the catalog can hold
+    slightly fewer movies than requested.
+
+    Args:
+        path (str): The database file to create.
+        rows (int): The number of movies to generate.
+        seed (int, optional): The random seed; the same seed always produces the same catalog. Defaults to 42.
+        batch_size (int, optional): Movies inserted per transaction. Defaults to IMPORT_BATCH_SIZE.
+        on_progress (callable, optional): Called with the number of generated and inserted movies after every batch.
+
+    Returns:
+        int: The number of movies inserted.
+    """
+    manager = ConnectionManager(path)
+    bind_connection_manager(manager)
+    try:
+        migrate(manager.get_connection())
+        Genre.invalidate_cache()
+        genre_ids = {genre: Genre.get_id_by_name(genre) for genre in PREDEFINED_GENRES}
+        generator = CatalogGenerator(seed)
+
+        inserted = 0
+        for start in range(0, rows, batch_size):
+            movies = [generator.movie(genre_ids) for _ in range(min(batch_size, rows - start))]
+            with transaction() as conn:
+                inserted += Movie.add_batch([movie[:6] for movie in movies])
+                # Likes are applied as updates so the leaderboard triggers see them like real favourites.
+                conn.executemany('UPDATE Movies SET likes = ? WHERE title = ? AND release_date = ? AND director = ?',
+                                 [(movie[6], movie[0], movie[2], movie[3]) for movie in movies if movie[6]])
+            if on_progress:
+                on_progress(start + len(movies), inserted)
+        conn = manager.get_connection()
+        conn.execute('ANALYZE')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return inserted
+    finally:
+        bind_connection_manager(None)
+        Genre.invalidate_cache()
+        manager.close_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic movie catalog database")
+    parser.add_argument('--size', choices=list(SIZES), default='10k', help="Catalog size preset (default: 10k)")
+    parser.add_argument('--rows', type=int, help="Exact number of movies; overrides --size")
+    parser.add_argument('--output', default='movies.db', help="Database file to create (default: movies.db)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument('--force', action='store_true', help="Replace the output database if it exists")
+    args = parser.parse_args()
+
+    rows = args.rows or SIZES[args.size]
+    if os.path.exists(args.output):
+        if not args.force:
+            print(f"{args.output} already exists. Use --force to replace it.")
+            sys.exit(1)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.output + suffix):
+                os.remove(args.output + suffix)
+
+    started = time.perf_counter()
+
+    def report(generated, inserted):
+        if generated % (IMPORT_BATCH_SIZE * 20) == 0 or generated == rows:
+            elapsed = time.perf_counter() - started
+            print(f"[{generated:,}/{rows:,}] {inserted:,} inserted ({generated / elapsed:,.0f} movies/s)")
+
+    inserted = generate_catalog(args.output, rows, args.seed, on_progress=report)
+    print(f"Generated {inserted:,} movies into {args.output} in {time.perf_counter() - started:.1f}s (seed {args.seed}).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+DEFAULT_PATHS = [
+    '/movies?limit=20',
+    '/movies/1',
+    '/movies/search?q=the&limit=10',
+    '/movies/category/liked',
+    '/movies/category/newest',
+]
+
+
+async def run_client(host, port, paths, deadline, latencies, errors, like_ratio, rng):
+    """
+    Send requests over one keep-alive connection until the deadline, recording each latency in milliseconds.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < like_ratio:
+                request = f'POST /movies/{rng.randint(1, 100)}/favourite HTTP/1.1\r\nHost: {host}\r\n' \
+                          f'Content-Length: 0\r\n\r\n'
+            else:
+                request = f'GET {rng.choice(paths)} HTTP/1.1\r\nHost: {host}\r\n\r\n'
+
+            started = time.perf_counter()
+            writer.write(request.encode('latin-1'))
+            head = await reader.readuntil(b'\r\n\r\n')
+            length = 0
+            for line in head.decode('latin-1').split('\r\n'):
+                if line.lower().startswith('content-length:'):
+                    length = int(line.split(':', 1)[1])
+            json.loads(await reader.readexactly(length))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+            status = int(head.split(b' ', 2)[1])
+            if status >= 500:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def load_test(host, port, clients, seconds, paths, like_ratio, seed):
+    latencies = []
+    errors = []
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, paths, deadline, latencies, errors, like_ratio,
+                                      random.Random(rng.random())) for _ in range(clients)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a running 'serve' instance over keep-alive connections")
+    parser.add_argument('--host', default='127.0.0.1', help="Server host (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Server port (default: 8080)")
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent keep-alive connections (default: 16)")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Test duration (default: 10)")
+    parser.add_argument('--path', action='append', dest='paths', help="GET path to request; repeat for a mix")
+    parser.add_argument('--like-ratio', type=float, default=0.0,
+                        help="Fraction of requests that favourite a random movie (default: 0)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the request mix (default: 42)")
+    parser.add_argument('--max-p99-ms', type=float, help="Exit with an error when the p99 latency is higher")
+    args = parser.parse_args()
+
+    latencies, errors, elapsed = asyncio.run(load_test(args.host, args.port, args.clients, args.seconds,
+                                                       args.paths or DEFAULT_PATHS, args.like_ratio, args.seed))
+    if not latencies:
+        print("No requests completed.")
+        sys.exit(1)
+
+    latencies.sort()
+    print(f"requests:  {len(latencies)} in {elapsed:.1f}s with {args.clients} clients")
+    print(f"rate:      {len(latencies) / elapsed:.0f} requests/s")
+    print(f"latency:   p50 {percentile(latencies, 0.50):.2f} ms, p99 {percentile(latencies, 0.99):.2f} ms, "
+          f"mean {statistics.mean(latencies):.2f} ms, max {latencies[-1]:.2f} ms")
+    print(f"errors:    {len(errors)}")
+
+    failed = bool(errors) or (args.max_p99_ms is not None and percentile(latencies, 0.99) > args.max_p99_ms)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_init import ConnectionManager  # noqa: E402
+from db_migrations import migrate  # noqa: E402
+from Models.Movie import _query_movies  # noqa: E402
+
+SCAN_SQL = 'SELECT {columns} FROM Movies m LEFT JOIN Genres g ON m.genre_id = g.id ORDER BY m.id'
+
+
+def build_catalog(conn, rows):
+    """
+    Fill the Movies table with synthetic movies whose descriptions have a realistic length.
+
+    Args:
+        conn (sqlite3.Connection): A connection to a migrated, empty database.
+        rows (int): The number of movies to insert.
+    """
+    with conn:
+        conn.execute('''
+            INSERT INTO Movies (title, description, release_date, release_day, director, genre_id, likes)
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            SELECT 'Movie ' || i,
+                   substr(hex(randomblob(120)), 1, 120 + i % 120),
+                   date('1950-01-01', '+' || (i % 27000) || ' days'),
+                   -7305 + i % 27000,
+                   'Director ' || (i % 20000),
+                   1 + i % 29,
+                   abs(random()) % 10000
+            FROM n
+        ''', (rows,))
+
+
+def scan_rows(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    return cursor.execute(SCAN_SQL.format(columns='m.*, g.name AS genre_name'))
+
+
+def scan_records(conn, summary):
+    return _query_movies(conn, SCAN_SQL, (), summary)
+
+
+def bytes_per_row(scan, sample):
+    """
+    Measure the memory held per fetched row, including its field values.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = scan().fetchmany(sample)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held / len(rows)
+
+
+def rows_per_second(scan, read_field, repeat):
+    """
+    Time full scans that read one field of every row; the fastest run counts.
+    """
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = 0
+        for row in scan():
+            read_field(row)
+            count += 1
+        best = min(best, time.perf_counter() - started)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Movie records with sqlite3.Row on a large catalog")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Movies in the catalog (default: 1000000)")
+    parser.add_argument('--sample', type=int, default=100_000, help="Rows held in memory to measure their size")
+    parser.add_argument('--repeat', type=int, default=3, help="Full scans per variant; the fastest one counts")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        manager = ConnectionManager(os.path.join(directory, 'records.db'))
+        conn = manager.get_connection()
+        migrate(conn)
+        started = time.perf_counter()
+        build_catalog(conn, args.rows)
+        print(f"Built a {args.rows:,} movie catalog in {time.perf_counter() - started:.1f}s")
+
+        variants = [
+            ('sqlite3.Row', lambda: scan_rows(conn), lambda row: row['title']),
+            ('Movie (detail)', lambda: scan_records(conn, False), lambda movie: movie.title),
+            ('Movie (summary)', lambda: scan_records(conn, True), lambda movie: movie.title),
+        ]
+        results = []
+        print(f"{'variant':<16} {'bytes/row':>10} {'rows/s':>12}")
+        for name, scan, read_field in variants:
+            size = bytes_per_row(scan, args.sample)
+            rate = rows_per_second(scan, read_field, args.repeat)
+            results.append(size)
+            print(f"{name:<16} {size:>10.0f} {rate:>12,.0f}")
+        manager.close_all()
+
+    # Records must never hold more memory per row than the sqlite3.Row they replace.
+    sys.exit(1 if results[1] > results[0] or results[2] > results[0] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from Helpers.movie_cover import render, render_vectorized  # noqa: E402
+
+DEFAULT_WIDTHS = [40, 80, 120, 200, 300]
+
+
+def make_fixture_image(size=(600, 900), seed=42):
+    """
+    Build a reproducible poster-sized RGBA image with gradients, noise and a transparent border.
+
+    Args:
+        size (tuple, optional): The image size in pixels. Defaults to (600, 900).
+        seed (int, optional): The random seed. Defaults to 42.
+
+    Returns:
+        PIL.Image.Image: The fixture image.
+    """
+    rng = random.Random(seed)
+    width, height = size
+    border = width // 20
+    pixels = []
+    for y in range(height):
+        for x in range(width):
+            alpha = 0 if x < border or x >= width - border else 255
+            pixels.append(((x * 255) // width, (y * 255) // height, rng.randrange(256), alpha))
+    image = Image.new('RGBA', size)
+    image.putdata(pixels)
+    return image
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-pixel and NumPy cover renderers")
+    parser.add_argument('--widths', type=int, nargs='+', default=DEFAULT_WIDTHS, help="Output widths to benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per renderer; the fastest one counts")
+    args = parser.parse_args()
+
+    image = make_fixture_image()
+    failed = False
+    print(f"{'width':>6} {'render':>10} {'vectorized':>11} {'merged':>10} {'speedup':>8}  identical")
+    for width in args.widths:
+        # Both the colored and the plain output have to match for the width to count as identical.
+        identical = all(render(image, width, colorize=colorize) == render_vectorized(image, width, colorize=colorize)
+                        for colorize in (True, False))
+        failed = failed or not identical
+
+        def best_of(function, **options):
+            return min(timeit.repeat(lambda: function(image, width, **options), number=1, repeat=args.repeat))
+
+        baseline = best_of(render)
+        vectorized = best_of(render_vectorized)
+        merged = best_of(render_vectorized, merge_runs=True)
+        print(f"{width:>6} {baseline * 1000:>8.1f}ms {vectorized * 1000:>9.1f}ms {merged * 1000:>8.1f}ms "
+              f"{baseline / vectorized:>7.1f}x  {'yes' if identical else 'NO'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARKS_DIR)
+CLI_PATH = os.path.join(PROJECT_DIR, 'movie_database_cli.py')
+sys.path.insert(0, PROJECT_DIR)
+
+from db_init import ConnectionManager, bind_connection_manager, transaction  # noqa: E402
+from generate_catalog import generate_catalog  # noqa: E402
+from Models.Genre import Genre  # noqa: E402
+from Models.Movie import Movie  # noqa: E402
+from Helpers.result_cache import configure_result_cache  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+# Differences below this are timer noise, whatever their ratio.
+MIN_REGRESSION_MS = 0.05
+
+
+class Rollback(Exception):
+    pass
+
+
+def rolled_back(function):
+    """
+    Wrap a write so it runs inside a transaction that is always rolled back, leaving the catalog unchanged.
+    """
+    def run():
+        try:
+            with transaction():
+                function()
+                raise Rollback()
+        except Rollback:
+            # The genre cache may have been refreshed with a row that no longer exists.
+            Genre.invalidate_cache()
+    return run
+
+
+def time_call(function, repeat, min_seconds=0.2):
+    """
+    Time a call, repeating it until each sample lasts long enough to measure.
+
+    Returns:
+        dict: The fastest and median milliseconds per call, and the calls per sample.
+    """
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds / repeat or number >= 10_000:
+            break
+        number *= 4
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - started) / number)
+    return {'min_ms': min(samples) * 1000, 'median_ms': statistics.median(samples) * 1000, 'number': number}
+
+
+def model_cases(conn):
+    """
+    Build the Movie and Genre method calls to time, with arguments picked from the catalog itself.
+    """
+    max_id = conn.execute('SELECT MAX(id) FROM Movies').fetchone()[0]
+    sample = conn.execute('SELECT * FROM Movies WHERE id >= ? ORDER BY id LIMIT 1', (max_id // 2,)).fetchone()
+    common_word = sample['title'].split()[-1]
+    rare_phrase = f'"{" ".join(sample["description"].split()[1:4]).strip(".,")}"'
+    # Swap two letters in the middle of the title, the most common kind of typo.
+    middle = len(sample['title']) // 2
+    typo_title = sample['title'][:middle - 1] + sample['title'][middle] + sample['title'][middle - 1] + \
+        sample['title'][middle + 1:]
+
+    cases = {
+        'Movie.get_all first page': lambda: list(Movie.get_all(limit=500)),
+        'Movie.get_all deep page': lambda: list(Movie.get_all(max_id - 1000, 500)),
+        'Movie.get_all summary page': lambda: list(Movie.get_all(limit=500, summary=True)),
+        'Movie.get_by_id': lambda: Movie.get_by_id(sample['id']),
+        'Movie.search_by_title common': lambda: list(Movie.search_by_title(common_word, limit=20)),
+        'Movie.search_by_title prefix': lambda: list(Movie.search_by_title(common_word[:3], limit=20)),
+        'Movie.search_by_title phrase all': lambda: list(Movie.search_by_title(rare_phrase, 'all', 20)),
+        'Movie.fuzzy_search_by_title typo': lambda: Movie.fuzzy_search_by_title(typo_title),
+        'Movie.get_top_liked': lambda: list(Movie.get_top_liked()),
+        'Movie.get_top_liked 1000': lambda: list(Movie.get_top_liked(1000)),
+        'Movie.get_newest': lambda: list(Movie.get_newest()),
+        'Movie.get_by_release_date year': lambda: list(Movie.get_by_release_date('2010-01-01', '2010-12-31')),
+        'Movie.get_by_genre': lambda: list(Movie.get_by_genre('drama')),
+        'Movie.get_by_genre 1000': lambda: list(Movie.get_by_genre('drama', 1000)),
+        'Movie.movie_exists hit': lambda: Movie.movie_exists(sample['title'], sample['release_date'],
+                                                             sample['director']),
+        'Movie.movie_exists miss': lambda: Movie.movie_exists('No Such Movie', '1900-01-01', 'Nobody'),
+        'Movie.count_covers': Movie.count_covers,
+        'Movie.get_stats genre': lambda: Movie.get_stats('genre'),
+        'Movie.get_stats director': lambda: Movie.get_stats('director', 'likes'),
+        'Movie.add': rolled_back(lambda: Movie.add('Benchmark Movie', 'A benchmark.', '2020-01-01', 'Bench Marker',
+                                                   'drama')),
+        'Movie.favourite_movie': rolled_back(lambda: Movie.favourite_movie(sample['id'])),
+        'Movie.favourite_movies 1000': rolled_back(lambda: Movie.favourite_movies(range(1, 1001))),
+        'Movie.add_movie_cover_url': rolled_back(lambda: Movie.add_movie_cover_url(sample['id'],
+                                                                                   'https://example.com/cover.jpg')),
+        'Genre.get_all': Genre.get_all,
+        'Genre.get_id_by_name': lambda: Genre.get_id_by_name('drama'),
+        'Genre.get_name_by_id': lambda: Genre.get_name_by_id(1),
+        'Genre.get_genre_id_or_default': lambda: Genre.get_genre_id_or_default('no such genre', verbose=False),
+        'Genre.add': rolled_back(lambda: Genre.add('benchmark genre')),
+    }
+    if importlib.util.find_spec('numpy') is not None:
+        # Build and map the similarity index before timing, so the first sample only times a search too.
+        Movie.get_similar(sample['id'])
+        cases['Movie.get_similar'] = lambda: Movie.get_similar(sample['id'])
+    return cases
+
+
+def render_cases():
+    from render_benchmark import make_fixture_image
+    from Helpers.movie_cover import render, render_vectorized
+
+    image = make_fixture_image()
+    return {
+        'render 120': lambda: render(image, 120),
+        'render_vectorized 120': lambda: render_vectorized(image, 120),
+        'render_vectorized 120 plain': lambda: render_vectorized(image, 120, colorize=False),
+    }
+
+
+def cli_cases(database, sample_id):
+    """
+    Build CLI invocations to time end to end, each in a fresh interpreter against the catalog.
+    Commands that write are left out so the catalog stays unchanged; their model methods are timed instead.
+    """
+    env = dict(os.environ, MOVIE_DB_PATH=os.path.abspath(database))
+    env.pop('MOVIE_DB_RESULT_CACHE_DISK', None)
+    commands = {
+        'cli movlst --limit 20': ['movlst', '--limit', '20'],
+        'cli movdt': ['movdt', str(sample_id)],
+        'cli movsrch': ['movsrch', 'night', '--limit', '10'],
+        'cli movcat liked': ['movcat', 'liked'],
+        'cli movcat newest': ['movcat', 'newest'],
+        'cli movcat genre': ['movcat', 'genre', 'drama'],
+        'cli movcat range': ['movcat', 'range', '--decade', '1990'],
+        'cli movstats year': ['movstats', 'year', '--sort', 'name'],
+        'cli movdb version': ['movdb', 'version'],
+    }
+
+    def run(command):
+        return lambda: subprocess.run([sys.executable, CLI_PATH] + command, env=env, stdout=subprocess.DEVNULL,
+                                      check=True)
+    return {name: run(command) for name, command in commands.items()}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare the fastest time of every benchmark with the baseline.
+
+    Returns:
+        list: (name, baseline ms, current ms) for every benchmark that got slower by more than the tolerance.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        before, after = previous['min_ms'], result['min_ms']
+        if after > before * (1 + tolerance) and after - before > MIN_REGRESSION_MS:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every Movie and Genre method and CLI command on a catalog")
+    parser.add_argument('--database', help="Catalog to benchmark, e.g. from generate_catalog.py "
+                                           "(default: a generated catalog of --rows movies)")
+    parser.add_argument('--rows', type=int, default=10_000, help="Size of the generated catalog (default: 10000)")
+    parser.add_argument('--repeat', type=int, default=5, help="Samples per benchmark (default: 5)")
+    parser.add_argument('--only', help="Only run benchmarks whose name contains this text")
+    parser.add_argument('--skip-cli', action='store_true', help="Skip the end-to-end CLI benchmarks")
+    parser.add_argument('--skip-render', action='store_true', help="Skip the cover rendering benchmarks")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline results to compare against "
+                                                                     "(default: Benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed slowdown before a benchmark counts as a regression (default: "
+                             f"{DEFAULT_TOLERANCE:.0%})")
+    args = parser.parse_args()
+
+    # Every call has to run its query; a cache hit would only time the result cache.
+    configure_result_cache(enabled=False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database
+        if database is None:
+            database = os.path.join(directory, 'movies.db')
+            print(f"Generating a {args.rows:,} movie catalog...")
+            generate_catalog(database, args.rows)
+
+        manager = ConnectionManager(database)
+        bind_connection_manager(manager)
+        conn = manager.get_connection()
+        rows = conn.execute('SELECT COUNT(*) FROM Movies').fetchone()[0]
+
+        cases = model_cases(conn)
+        if not args.skip_render:
+            cases.update(render_cases())
+        if not args.skip_cli:
+            sample_id = conn.execute('SELECT MAX(id) / 2 FROM Movies').fetchone()[0]
+            cases.update(cli_cases(database, sample_id))
+
+        results = {}
+        for name, function in cases.items():
+            if args.only and args.only not in name:
+                continue
+            results[name] = time_call(function, args.repeat)
+            print(f"{name:<36} {results[name]['min_ms']:>10.3f} ms  (median {results[name]['median_ms']:.3f} ms)")
+        manager.close_all()
+
+    report = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'rows': rows,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.platform(),
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    failed = False
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Saved the baseline to {args.baseline}.")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['meta']['rows'] != rows:
+            print(f"Warning: the baseline was recorded on {baseline['meta']['rows']:,} movies, not {rows:,}.")
+        if baseline['meta']['machine'] != report['meta']['machine']:
+            print(f"Warning: the baseline was recorded on another machine ({baseline['meta']['machine']}); "
+                  f"record one here with --save-baseline for meaningful comparisons.")
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms ({after / before - 1:+.0%})")
+        print(f"{len(regressions)} regressions against {args.baseline}.")
+        failed = bool(regressions)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
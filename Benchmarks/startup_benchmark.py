@@ -0,0 +1,84 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI_PATH = os.path.join(PROJECT_DIR, 'movie_database_cli.py')
+
+# Commands that never touch covers, so they must not pay for the cover stack.
+COMMANDS = [
+    ['movlst', '--limit', '5'],
+    ['movdt', '1'],
+    ['movsrch', 'inception'],
+    ['movcat', 'liked'],
+    ['movfv', '1'],
+    ['movdb', 'version'],
+]
+
+COVER_MODULES = {'requests', 'PIL', 'colors'}
+
+DEFAULT_BUDGET_MS = 75.0
+
+# Run against the benchmark's own database, never the one MOVIE_DB_PATH points to.
+ENV = {name: value for name, value in os.environ.items() if name != 'MOVIE_DB_PATH'}
+
+
+def measure_imports(command, cwd):
+    """
+    Run one CLI command under `python -X importtime` and collect the import timings.
+
+    Args:
+        command (list): The CLI arguments.
+        cwd (str): The directory to run in, which holds the benchmark database.
+
+    Returns:
+        dict: Self import time in microseconds for every module imported.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', CLI_PATH] + command, cwd=cwd, env=ENV,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, module = line[len('import time:'):].split('|')
+        imports[module.strip()] = int(self_time)
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CLI cold-start import time against a budget")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum total import time per command (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per command; the fastest one counts")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as cwd:
+        subprocess.run([sys.executable, CLI_PATH, 'movadd', 'Inception', 'A dream heist', '2010-07-16',
+                        'Christopher Nolan', 'science fiction'], cwd=cwd, env=ENV, stdout=subprocess.DEVNULL,
+                       check=True)
+
+        for command in COMMANDS:
+            runs = [measure_imports(command, cwd) for _ in range(args.repeat)]
+            imports = min(runs, key=lambda run: sum(run.values()))
+            total_ms = sum(imports.values()) / 1000
+            cover_modules = sorted(COVER_MODULES.intersection(module.split('.')[0] for module in imports))
+            slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)[:3]
+
+            status = "OK"
+            if cover_modules:
+                status = f"FAIL (imports {', '.join(cover_modules)})"
+            elif total_ms > args.budget_ms:
+                status = f"FAIL (over {args.budget_ms:.0f} ms budget)"
+            failed = failed or status != "OK"
+
+            print(f"{' '.join(command):<24} {total_ms:7.1f} ms  {status}")
+            print(f"{'':<24} slowest: {', '.join(f'{name} {us / 1000:.1f} ms' for name, us in slowest)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
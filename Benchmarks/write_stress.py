@@ -0,0 +1,161 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from db_init import ConnectionManager, GroupCommitWriter, bind_connection_manager  # noqa: E402
+from generate_catalog import generate_catalog  # noqa: E402
+from Helpers.constants import GROUP_COMMIT_WINDOW  # noqa: E402
+from Models.Movie import Movie  # noqa: E402
+
+MODES = ['single', 'group']
+
+
+def like_movies(database, mode, movie_ids, writes, threads, window, seed, barrier, results):
+    """
+    Like random movies from one process and report how many likes each movie was promised.
+
+    In 'single' mode every thread commits each like in its own transaction on its own connection; in 'group'
+    mode the threads submit their likes to one GroupCommitWriter, as the server does.
+    """
+    manager = ConnectionManager(database)
+    bind_connection_manager(manager)
+    writer = GroupCommitWriter(window, manager=manager) if mode == 'group' else None
+    rng = random.Random(seed)
+    picks = [rng.choice(movie_ids) for _ in range(writes)]
+    applied = [Counter() for _ in range(threads)]
+    failures = []
+
+    def run(thread):
+        bind_connection_manager(manager)
+        for movie_id in picks[thread::threads]:
+            try:
+                if writer is None:
+                    liked = Movie.favourite_movies([movie_id])[movie_id]
+                else:
+                    liked = writer.submit(Movie.favourite_movies, [movie_id]).result()[movie_id]
+            except sqlite3.Error as e:
+                failures.append(str(e))
+                continue
+            if liked:
+                applied[thread][movie_id] += 1
+
+    workers = [threading.Thread(target=run, args=(thread,)) for thread in range(threads)]
+    barrier.wait()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    commits = writes - len(failures)
+    if writer is not None:
+        commits = writer.get_stats()['commits']
+        writer.close()
+    manager.close_all()
+    results.put((dict(sum(applied, Counter())), failures, commits))
+
+
+def read_likes(database, movie_ids):
+    conn = sqlite3.connect(database)
+    try:
+        placeholders = ', '.join('?' * len(movie_ids))
+        return dict(conn.execute(f'SELECT id, likes FROM Movies WHERE id IN ({placeholders})', movie_ids))
+    finally:
+        conn.close()
+
+
+def stress(database, mode, processes, threads, writes, movies, window, seed):
+    """
+    Run one round of concurrent likes and check the like counts against what the writers were told.
+
+    Returns:
+        dict: The likes, failures, commits, lost likes and writes per second of the round.
+    """
+    conn = sqlite3.connect(database)
+    movie_ids = [row[0] for row in conn.execute('SELECT id FROM Movies ORDER BY id LIMIT ?', (movies,))]
+    conn.close()
+    before = read_likes(database, movie_ids)
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=like_movies, args=(database, mode, movie_ids, writes, threads, window,
+                                                         seed + number, barrier, results))
+               for number in range(processes)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    started = time.perf_counter()
+    reports = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    after = read_likes(database, movie_ids)
+    promised = Counter()
+    for applied, _, _ in reports:
+        promised.update(applied)
+    lost = sum(abs(promised[movie_id] - (after[movie_id] - before[movie_id])) for movie_id in movie_ids)
+    likes = sum(promised.values())
+    return {
+        'likes': likes,
+        'failures': [failure for _, failures, _ in reports for failure in failures],
+        'commits': sum(commits for _, _, commits in reports),
+        'lost': lost,
+        'seconds': elapsed,
+        'writes_per_second': likes / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Like movies from many processes at once and check that no like "
+                                                 "is lost")
+    parser.add_argument('--database', help="Catalog to write to; its like counts are changed "
+                                           "(default: a generated catalog of --rows movies)")
+    parser.add_argument('--rows', type=int, default=10_000, help="Size of the generated catalog (default: 10000)")
+    parser.add_argument('--processes', type=int, default=4, help="Writer processes (default: 4)")
+    parser.add_argument('--threads', type=int, default=4, help="Writer threads per process (default: 4)")
+    parser.add_argument('--writes', type=int, default=2000, help="Likes per process (default: 2000)")
+    parser.add_argument('--movies', type=int, default=100,
+                        help="Number of movies the likes are spread over; fewer means more contention (default: 100)")
+    parser.add_argument('--mode', choices=MODES, action='append', dest='modes',
+                        help="'single' commits every like on its own, 'group' goes through a GroupCommitWriter "
+                             "in every process; repeat for both (default: both)")
+    parser.add_argument('--group-commit-ms', type=float, default=GROUP_COMMIT_WINDOW * 1000,
+                        help=f"Group commit window (default: {GROUP_COMMIT_WINDOW * 1000:g})")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the liked movies (default: 42)")
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database
+        if database is None:
+            database = os.path.join(directory, 'movies.db')
+            print(f"Generating a {args.rows:,} movie catalog...")
+            generate_catalog(database, args.rows)
+
+        for mode in args.modes or MODES:
+            result = stress(database, mode, args.processes, args.threads, args.writes, args.movies,
+                            args.group_commit_ms / 1000, args.seed)
+            print(f"{mode:<7} {result['likes']:,} likes from {args.processes} processes x {args.threads} threads "
+                  f"in {result['seconds']:.2f}s: {result['writes_per_second']:,.0f} writes/s, "
+                  f"{result['commits']:,} commits, {len(result['failures'])} failed, {result['lost']} lost")
+            for failure in sorted(set(result['failures'])):
+                print(f"  failed: {failure}")
+            failed = failed or result['lost'] > 0 or bool(result['failures'])
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import csv
+import json
+import os
+import time
+
+from db_init import transaction
+from Helpers.constants import (IMPORT_BATCH_SIZE, MAX_TITLE_LENGTH, MAX_DESCRIPTION_LENGTH, MAX_DIRECTOR_LENGTH,
+                               MAX_COVER_LENGTH)
+from Models.Genre import Genre
+from Models.Movie import Movie
+
+REQUIRED_FIELDS = ('title', 'description', 'release_date', 'director', 'genre')
+
+FIELD_LENGTH_LIMITS = {
+    'title': MAX_TITLE_LENGTH,
+    'description': MAX_DESCRIPTION_LENGTH,
+    'director': MAX_DIRECTOR_LENGTH,
+    'cover': MAX_COVER_LENGTH,
+}
+
+
+def detect_catalog_format(path):
+    """
+    Guess the catalog format from the file extension.
+
+    Args:
+        path (str): The path of the catalog file.
+
+    Returns:
+        str: 'jsonl' for .jsonl, .ndjson and .json files, otherwise 'csv'.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    return 'jsonl' if extension in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+def read_catalog(path, catalog_format):
+    """
+    Stream the rows of a CSV (with a header row) or JSONL catalog file one at a time.
+
+    Args:
+        path (str): The path of the catalog file.
+        catalog_format (str): Either 'csv' or 'jsonl'.
+
+    Bytes that are not valid UTF-8 are kept as lone surrogates (errors='surrogateescape'), so one bad line
+    does not abort the whole import; validate_row rejects the rows holding them.
+
+    Yields:
+        tuple: (line number, row dictionary), with None as the row for lines that cannot be parsed.
+    """
+    if catalog_format == 'csv':
+        with open(path, newline='', encoding='utf-8', errors='surrogateescape') as catalog_file:
+            reader = csv.DictReader(catalog_file)
+            for row in reader:
+                yield reader.line_num, row
+        return
+
+    with open(path, encoding='utf-8', errors='surrogateescape') as catalog_file:
+        for line_number, line in enumerate(catalog_file, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+
+def validate_row(row, resolve_genre_id):
+    """
+    Check a catalog row and turn it into the values inserted by Movie.add_batch.
+
+    Args:
+        row (dict or None): The parsed row.
+        resolve_genre_id (callable): Maps a genre name to its ID, falling back to the default genre.
+
+    Returns:
+        tuple: (values, None) for a valid row, otherwise (None, reason for rejecting it).
+    """
+    if row is None:
+        return None, "could not be parsed"
+
+    values = {}
+    for field in REQUIRED_FIELDS + ('cover',):
+        value = row.get(field)
+        value = str(value).strip() if value is not None else ''
+        if not value and field != 'cover':
+            return None, f"missing {field}"
+        try:
+            value.encode('utf-8')
+        except UnicodeEncodeError:
+            return None, f"{field} is not valid UTF-8"
+        if field in FIELD_LENGTH_LIMITS and len(value) > FIELD_LENGTH_LIMITS[field]:
+            return None, f"{field} longer than {FIELD_LENGTH_LIMITS[field]} characters"
+        values[field] = value
+
+    if Movie.validate_date(values['release_date'], verbose=False) is None:
+        return None, f"invalid release_date '{values['release_date']}', expected YYYY-MM-DD"
+
+    return (values['title'], values['description'], values['release_date'], values['director'],
+            resolve_genre_id(values['genre']), values['cover'] or None), None
+
+
+def import_catalog(path, catalog_format=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Stream a catalog file into the Movies table in executemany batches, one transaction per batch.
+
+    Only the current batch is held in memory, so memory use does not grow with the size of the file.
+    Movies that already exist are skipped.
+
+    Args:
+        path (str): The path of the catalog file.
+        catalog_format (str, optional): 'csv' or 'jsonl'. Detected from the extension if omitted.
+        batch_size (int, optional): Rows per batch. Defaults to IMPORT_BATCH_SIZE.
+
+    Yields:
+        dict: A report per batch with its number, row count, inserted and duplicate counts,
+            rejected rows as (line number, reason) pairs and elapsed seconds.
+    """
+    catalog_format = catalog_format or detect_catalog_format(path)
+
+    def resolve_genre_id(name):
+        return Genre.get_genre_id_or_default(name, verbose=False)
+
+    batch_number = 0
+    movies, rejected = [], []
+    started = time.perf_counter()
+
+    def flush():
+        inserted = 0
+        if movies:
+            with transaction():
+                inserted = Movie.add_batch(movies)
+        return {
+            'batch': batch_number,
+            'rows': len(movies) + len(rejected),
+            'inserted': inserted,
+            'duplicates': len(movies) - inserted,
+            'rejected': rejected,
+            'seconds': time.perf_counter() - started,
+        }
+
+    for line_number, row in read_catalog(path, catalog_format):
+        values, reason = validate_row(row, resolve_genre_id)
+        if reason:
+            rejected.append((line_number, reason))
+        else:
+            movies.append(values)
+
+        if len(movies) + len(rejected) >= batch_size:
+            batch_number += 1
+            yield flush()
+            movies, rejected = [], []
+            started = time.perf_counter()
+
+    if movies or rejected:
+        batch_number += 1
+        yield flush()
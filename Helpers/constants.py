@@ -1,4 +1,25 @@
-DB_NAME = 'movies.db'
+import os
+
+DB_NAME = os.environ.get('MOVIE_DB_PATH', 'movies.db')
+
+DB_BUSY_TIMEOUT = 5.0
+DB_CACHED_STATEMENTS = 256
+DB_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+# BEGIN IMMEDIATE is retried with jittered exponential backoff when the busy timeout runs out.
+DB_WRITE_RETRIES = 6
+DB_WRITE_RETRY_DELAY = 0.05
+DB_WRITE_RETRY_MAX_DELAY = 2.0
+# A GroupCommitWriter commits the writes that arrive within this many seconds of the first waiting one together.
+# With WAL and synchronous=NORMAL a commit is cheap, so by default it only gathers the writes that queued up
+# during the previous transaction; a window pays off when commits are slow, e.g. with synchronous=FULL.
+GROUP_COMMIT_WINDOW = 0.0
+GROUP_COMMIT_MAX_CALLS = 500
 
 PREDEFINED_GENRES = [
     'action', 'adventure', 'animation', 'biography', 'comedy',
@@ -10,3 +31,61 @@ PREDEFINED_GENRES = [
 ]
 
 UNKNOWN_GENRE = "unknown"
+
+MAX_TITLE_LENGTH = 100
+MAX_DESCRIPTION_LENGTH = 500
+MAX_DIRECTOR_LENGTH = 50
+MAX_COVER_LENGTH = 500
+
+CATALOG_FORMATS = ['csv', 'jsonl']
+IMPORT_BATCH_SIZE = 5000
+MOVIE_PAGE_SIZE = 500
+LIKE_LOOKUP_CHUNK_SIZE = 500
+LEADERBOARD_SIZE = 100
+CATEGORY_LIMIT = 5
+RELEASE_RANGE_LIMIT = 20
+
+COVER_CACHE_DIR_NAME = 'movie-database'
+COVER_CACHE_MAX_BYTES = int(os.environ.get('MOVIE_DB_COVER_CACHE_BYTES', 100 * 1024 * 1024))
+COVER_CACHE_TTL = 7 * 24 * 60 * 60
+COVER_REQUEST_TIMEOUT = 10
+COVER_RETRY_BACKOFF = 0.5
+COVER_PREFETCH_WORKERS = 8
+# Downloads are streamed and abandoned past COVER_MAX_BYTES; images are refused when decoding them would
+# take more than COVER_MAX_IMAGE_PIXELS pixels, after JPEG draft scaling.
+COVER_MAX_BYTES = 20 * 1024 * 1024
+COVER_MAX_IMAGE_PIXELS = 64_000_000
+COVER_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8080
+SERVER_READERS = 4
+SERVER_KEEP_ALIVE_TIMEOUT = 15
+SERVER_MAX_BODY_BYTES = 64 * 1024
+
+BATCH_GROUP_SIZE = 1000
+
+PROFILE_SLOW_QUERY_MS = 50.0
+PROFILE_PROGRESS_INTERVAL = 1000
+
+OUTPUT_FORMATS = ['text', 'json', 'ndjson', 'tsv', 'csv']
+OUTPUT_BUFFER_ROWS = 1000
+
+FUZZY_RESULT_LIMIT = 10
+FUZZY_CANDIDATES = 200
+FUZZY_MAX_POSTINGS = 5000
+FUZZY_MIN_LOOKUPS = 3
+FUZZY_MIN_SIMILARITY = 0.2
+
+RESULT_CACHE_MAX_ROWS = 20000
+RESULT_CACHE_MAX_ENTRY_ROWS = 1000
+RESULT_CACHE_DISK = os.environ.get('MOVIE_DB_RESULT_CACHE_DISK', '') not in ('', '0')
+RESULT_CACHE_DISK_MAX_BYTES = 32 * 1024 * 1024
+
+SIMILARITY_RESULT_LIMIT = 10
+SIMILARITY_INDEX_SUFFIX = '.simidx'
+SIMILARITY_MAX_POSTINGS = 300_000
+SIMILARITY_CANDIDATES = 3000
+SIMILARITY_MAX_DF = 0.5
+SIMILARITY_TITLE_WEIGHT = 2
+SIMILARITY_DELTA_LIMIT = 50_000
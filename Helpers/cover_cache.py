@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import threading
+import time
+
+from Helpers.constants import COVER_CACHE_DIR_NAME, COVER_CACHE_MAX_BYTES
+
+COVER_CACHE_FILE_NAME = 'covers.db'
+
+
+def get_cache_dir():
+    """
+    Locate the per-user cache directory for movie covers.
+
+    Returns:
+        str: $XDG_CACHE_HOME (or %LOCALAPPDATA% on Windows, ~/.cache otherwise) joined with the cover cache folder.
+    """
+    base_dir = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, COVER_CACHE_DIR_NAME)
+
+
+def image_key(url):
+    return f'image:{url}'
+
+
+# Bumped whenever the rendered output of the same image changes, so older renderings are never served.
+RENDER_VERSION = 2
+
+
+def render_key(url, width, colorize):
+    return f'render:v{RENDER_VERSION}:{width}:{int(bool(colorize))}:{url}'
+
+
+class CoverCache:
+    """
+    A size-bounded, least-recently-used store for downloaded cover images and their rendered ASCII art.
+
+    Entries live in a small SQLite database under the user cache directory, so they survive across
+    CLI runs. Downloaded images keep their ETag and Last-Modified headers for revalidation.
+    """
+
+    def __init__(self, directory=None, max_bytes=COVER_CACHE_MAX_BYTES):
+        self.directory = directory or get_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, COVER_CACHE_FILE_NAME), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS Entries (
+                                    key TEXT PRIMARY KEY,
+                                    url TEXT NOT NULL,
+                                    data BLOB NOT NULL,
+                                    size INTEGER NOT NULL,
+                                    etag TEXT,
+                                    last_modified TEXT,
+                                    fetched_at REAL NOT NULL,
+                                    accessed_at REAL NOT NULL
+                                )''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_url ON Entries (url)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON Entries (accessed_at)')
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key (str): The cache key, built with image_key or render_key.
+
+        Returns:
+            sqlite3.Row or None: The entry with its data, headers and fetch time, or None on a miss.
+        """
+        with self._lock, self._conn:
+            entry = self._conn.execute('SELECT * FROM Entries WHERE key = ?', (key,)).fetchone()
+            if entry is not None:
+                self._conn.execute('UPDATE Entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            return entry
+
+    def put(self, key, url, data, etag=None, last_modified=None, fetched_at=None):
+        """
+        Store an entry, then evict the least recently used entries while the cache is over its byte budget.
+
+        Args:
+            key (str): The cache key, built with image_key or render_key.
+            url (str): The cover URL the entry belongs to.
+            data (bytes): The image bytes or the encoded rendered output.
+            etag (str, optional): The ETag header of the download.
+            last_modified (str, optional): The Last-Modified header of the download.
+            fetched_at (float, optional): When the data was fetched. Defaults to now.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO Entries (key, url, data, size, etag, last_modified, fetched_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, data, len(data), etag, last_modified, fetched_at or now, now)
+            )
+            self._evict()
+
+    def mark_fetched(self, url):
+        """
+        Record that every entry of a URL was just revalidated against the server.
+
+        Args:
+            url (str): The cover URL.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE Entries SET fetched_at = ? WHERE url = ?', (time.time(), url))
+
+    def invalidate(self, url):
+        """
+        Remove the downloaded image and every rendering of a URL.
+
+        Args:
+            url (str): The cover URL.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM Entries WHERE url = ?', (url,))
+
+    def _evict(self):
+        total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM Entries').fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        for entry in self._conn.execute('SELECT key, size FROM Entries ORDER BY accessed_at').fetchall():
+            self._conn.execute('DELETE FROM Entries WHERE key = ?', (entry['key'],))
+            total_bytes -= entry['size']
+            if total_bytes <= self.max_bytes:
+                break
+
+    def close(self):
+        self._conn.close()
+
+
+_cover_cache = None
+_cover_cache_lock = threading.Lock()
+
+
+def get_cover_cache():
+    """
+    Return the cover cache shared by the whole process, opening it on first use.
+
+    Returns:
+        CoverCache: The shared cache.
+    """
+    global _cover_cache
+    with _cover_cache_lock:
+        if _cover_cache is None:
+            _cover_cache = CoverCache()
+        return _cover_cache
+
+
+def invalidate_cover(url):
+    """
+    Drop the cached image and renderings of a URL, without creating the cache if it does not exist yet.
+
+    Args:
+        url (str): The cover URL.
+    """
+    if _cover_cache is None and not os.path.exists(os.path.join(get_cache_dir(), COVER_CACHE_FILE_NAME)):
+        return
+    get_cover_cache().invalidate(url)
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Helpers.constants import COVER_PREFETCH_WORKERS, COVER_REQUEST_TIMEOUT
+from Helpers.cover_cache import get_cover_cache
+from Helpers.movie_cover import get_movie_cover_from_url
+
+
+def prefetch_covers(covers, workers=COVER_PREFETCH_WORKERS, timeout=COVER_REQUEST_TIMEOUT, retries=2,
+                    width=120, colorize=True, on_progress=None):
+    """
+    Download and render many covers concurrently so they land in the cover cache.
+
+    Each worker thread keeps its own keep-alive requests.Session. At most a few tasks per worker are
+    queued at a time, so the input can be a lazy cursor over the whole catalog. A URL that is already being
+    fetched is skipped, and one that comes up again after its fetch finished is served from the cover cache
+    without a request. Only the URLs in flight are remembered, so memory stays flat however long the input
+    is; pass each URL once (as Movie.get_covers does) to have every one counted once.
+
+    Args:
+        covers (iterable): (movie ID, cover URL) pairs.
+        workers (int, optional): Number of worker threads. Defaults to COVER_PREFETCH_WORKERS.
+        timeout (float, optional): Seconds to wait for each request. Defaults to COVER_REQUEST_TIMEOUT.
+        retries (int, optional): Extra attempts per cover after a failure, with exponential backoff. Defaults to 2.
+        width (int, optional): The rendered width in characters. Defaults to 120.
+        colorize (bool, optional): Whether to render with ANSI colors. Defaults to True.
+        on_progress (callable, optional): Called with the running summary after every finished cover.
+
+    Returns:
+        dict: The number of covers 'done', 'succeeded' and 'failed', the IDs of 'failed_ids' and 'seconds' taken.
+    """
+    cache = get_cover_cache()
+    sessions = threading.local()
+
+    def get_session():
+        if not hasattr(sessions, 'session'):
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_maxsize=1))
+            session.mount('https://', HTTPAdapter(pool_maxsize=1))
+            sessions.session = session
+        return sessions.session
+
+    def prefetch(movie_id, url):
+        cover = get_movie_cover_from_url(url, width, colorize, cache, get_session(), timeout, retries)
+        return movie_id, cover is not None
+
+    summary = {'done': 0, 'succeeded': 0, 'failed': 0, 'failed_ids': [], 'seconds': 0.0}
+    started = time.perf_counter()
+
+    in_flight = {}
+
+    def collect(finished):
+        for future in finished:
+            del in_flight[future]
+            movie_id, succeeded = future.result()
+            summary['done'] += 1
+            summary['succeeded' if succeeded else 'failed'] += 1
+            if not succeeded:
+                summary['failed_ids'].append(movie_id)
+            summary['seconds'] = time.perf_counter() - started
+            if on_progress:
+                on_progress(summary)
+
+    pending = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for movie_id, url in covers:
+            if any(in_flight_url == url and not future.done() for future, in_flight_url in in_flight.items()):
+                continue
+
+            future = executor.submit(prefetch, movie_id, url)
+            in_flight[future] = url
+            pending.add(future)
+            if len(pending) >= workers * 4:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+        finished, _ = wait(pending)
+        collect(finished)
+
+    return summary
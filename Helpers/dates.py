@@ -0,0 +1,37 @@
+import datetime
+
+# Release dates are also stored as the number of days since 1970-01-01, which an index can range-scan and sort.
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+MIN_RELEASE_DAY = datetime.date.min.toordinal() - EPOCH_ORDINAL
+MAX_RELEASE_DAY = datetime.date.max.toordinal() - EPOCH_ORDINAL
+
+
+def release_day(date_text):
+    """
+    Convert a release date to the day number stored in Movies.release_day.
+
+    Args:
+        date_text (str): The date in 'YYYY-MM-DD' format.
+
+    Returns:
+        int or None: The number of days since 1970-01-01, or None if the date is not valid.
+    """
+    try:
+        return datetime.datetime.strptime(date_text, '%Y-%m-%d').toordinal() - EPOCH_ORDINAL
+    except (TypeError, ValueError):
+        return None
+
+
+def year_dates(year):
+    """
+    Return the first and last day of a year as 'YYYY-MM-DD' dates.
+    """
+    return f'{year:04d}-01-01', f'{year:04d}-12-31'
+
+
+def decade_dates(decade):
+    """
+    Return the first and last day of the decade a year belongs to, e.g. 1990-01-01 and 1999-12-31 for 1994.
+    """
+    first_year = decade - decade % 10
+    return year_dates(first_year)[0], year_dates(first_year + 9)[1]
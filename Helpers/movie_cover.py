@@ -1,28 +1,207 @@
+import time
+
 import requests
 from io import BytesIO
 from PIL import Image, ImageEnhance
 from colors import color
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Helpers.constants import (COVER_CACHE_TTL, COVER_DOWNLOAD_CHUNK_SIZE, COVER_MAX_BYTES, COVER_MAX_IMAGE_PIXELS,
+                               COVER_REQUEST_TIMEOUT, COVER_RETRY_BACKOFF)
+from Helpers.cover_cache import get_cover_cache, image_key, render_key
+from Helpers.profiler import profile_section
+
 
-def get_movie_cover_from_url(url):
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CoverTooLargeError(requests.RequestException):
     """
-    Fetch an image from the specified URL and render it in ASCII format.
+    Raised when a cover download grows past its byte limit.
+    """
+
+
+def _read_body(response, max_bytes):
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit() and int(length) > max_bytes:
+        raise CoverTooLargeError(f"The cover is {int(length):,} bytes, over the limit of {max_bytes:,}")
+    body = bytearray()
+    for chunk in response.iter_content(COVER_DOWNLOAD_CHUNK_SIZE):
+        body += chunk
+        # Checked on the decoded bytes, so a compressed response cannot expand past the limit either.
+        if len(body) > max_bytes:
+            raise CoverTooLargeError(f"The cover is over the limit of {max_bytes:,} bytes")
+    return bytes(body)
+
+
+def _get_with_retries(url, headers, session, timeout, retries, backoff, max_bytes):
+    http = session or requests
+    for attempt in range(retries + 1):
+        try:
+            with http.get(url, headers=headers, timeout=timeout, stream=True) as response:
+                if response.status_code == 200:
+                    return response, _read_body(response, max_bytes)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                    return response, None
+        except CoverTooLargeError:
+            raise
+        except requests.RequestException:
+            if attempt == retries:
+                raise
+        time.sleep(backoff * 2 ** attempt)
+
+
+def fetch_cover_image(url, cache, session=None, timeout=COVER_REQUEST_TIMEOUT, retries=0,
+                      backoff=COVER_RETRY_BACKOFF, max_bytes=COVER_MAX_BYTES):
+    """
+    Get the bytes of a cover image through the cover cache, downloading or revalidating only when needed.
+
+    Within COVER_CACHE_TTL the cached image is returned without any network access; after that it is
+    revalidated with its ETag/Last-Modified headers. If the server cannot be reached, a stale copy is used.
+    The body is streamed, and the download is abandoned as soon as it grows past max_bytes.
 
     Args:
         url (str): The URL of the image to be fetched.
+        cache (CoverCache): The cache to use.
+        session (requests.Session, optional): A session to reuse keep-alive connections. Defaults to none.
+        timeout (float, optional): Seconds to wait for the server. Defaults to COVER_REQUEST_TIMEOUT.
+        retries (int, optional): Extra attempts after a network error or a 429/5xx response. Defaults to 0.
+        backoff (float, optional): Seconds before the first retry, doubled on every further one.
+        max_bytes (int, optional): The largest image to download. Defaults to COVER_MAX_BYTES.
 
     Returns:
-        str: The ASCII representation of the image if successful, otherwise None.
+        tuple: (image bytes or None if the server refused, whether the bytes changed since they were cached).
+
+    Raises:
+        requests.RequestException: If the image could not be downloaded, or was too large, and nothing is cached.
+            A download over max_bytes raises CoverTooLargeError.
     """
+    image_entry = cache.get(image_key(url))
+    if image_entry is not None and time.time() - image_entry['fetched_at'] < COVER_CACHE_TTL:
+        return image_entry['data'], False
+
+    headers = {}
+    if image_entry is not None:
+        if image_entry['etag']:
+            headers['If-None-Match'] = image_entry['etag']
+        if image_entry['last_modified']:
+            headers['If-Modified-Since'] = image_entry['last_modified']
 
-    response = requests.get(url)
+    try:
+        with profile_section('cover_http'):
+            response, content = _get_with_retries(url, headers, session, timeout, retries, backoff, max_bytes)
+    except requests.RequestException:
+        # Offline or unreachable: a stale copy is better than nothing.
+        if image_entry is not None:
+            return image_entry['data'], False
+        raise
 
+    if response.status_code == 304 and image_entry is not None:
+        cache.mark_fetched(url)
+        return image_entry['data'], False
     if response.status_code == 200:
-        image_data = BytesIO(response.content)
-        image = Image.open(image_data)
-        return render(image)
-    else:
+        cache.invalidate(url)
+        cache.put(image_key(url), url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return content, True
+    return None, False
+
+
+def get_movie_cover_from_url(url, width=120, colorize=True, cache=None, session=None,
+                             timeout=COVER_REQUEST_TIMEOUT, retries=0):
+    """
+    Fetch an image from the specified URL and render it in ASCII format.
+
+    Both the downloaded image and the rendered output are kept in the cover cache, so a repeat view
+    needs no network access and no image decoding.
+
+    Args:
+        url (str): The URL of the image to be fetched.
+        width (int, optional): The output width in characters. Defaults to 120.
+        colorize (bool, optional): Whether to use ANSI colors. Defaults to True.
+        cache (CoverCache, optional): The cache to use. Defaults to the shared cover cache.
+        session (requests.Session, optional): A session to reuse keep-alive connections. Defaults to none.
+        timeout (float, optional): Seconds to wait for the server. Defaults to COVER_REQUEST_TIMEOUT.
+        retries (int, optional): Extra download attempts after a failure. Defaults to 0.
+
+    Returns:
+        str: The ASCII representation of the image if successful, otherwise None.
+    """
+    cache = cache or get_cover_cache()
+    rendered = cache.get(render_key(url, width, colorize))
+    try:
+        image_data, changed = fetch_cover_image(url, cache, session, timeout, retries)
+    except requests.RequestException:
+        image_data, changed = None, False
+    if rendered is not None and not changed:
+        return rendered['data'].decode('utf-8')
+    if image_data is None:
+        return None
+
+    try:
+        with profile_section('render'):
+            image = open_cover_image(image_data, width)
+            ascii_image = render_vectorized(image, width, colorize=colorize)
+    except (OSError, Image.DecompressionBombError):
         return None
+    cache.put(render_key(url, width, colorize), url, ascii_image.encode('utf-8'))
+    return ascii_image
+
+
+def open_cover_image(data, width=120, height_scale=0.55, max_pixels=COVER_MAX_IMAGE_PIXELS):
+    """
+    Decode a cover image at the smallest size that still renders well at the given width.
+
+    JPEGs are decoded straight to 1/2, 1/4 or 1/8 of their size (draft mode), and other images are
+    box-reduced by a whole factor right after decoding. Either way the image stays at least as large as
+    the rendered output, which render() still resizes to. The size is checked before any pixel is decoded,
+    so a small file that claims to be a huge image is refused instead of exhausting memory.
+
+    Args:
+        data (bytes): The encoded image.
+        width (int, optional): The output width in characters it will be rendered at. Defaults to 120.
+        height_scale (float, optional): The scale factor for the height. Defaults to 0.55.
+        max_pixels (int, optional): The most pixels to decode. Defaults to COVER_MAX_IMAGE_PIXELS.
+
+    Returns:
+        PIL.Image.Image: The decoded image.
+
+    Raises:
+        OSError: If the data is not an image Pillow can read.
+        PIL.Image.DecompressionBombError: If decoding it would take more than max_pixels pixels.
+    """
+    image = Image.open(BytesIO(data))
+    target_size = (width, max(1, int(image.height / image.width * width * height_scale)))
+    image.draft(None, target_size)
+    if image.width * image.height > max_pixels:
+        raise Image.DecompressionBombError(f"The cover is {image.width}x{image.height} pixels, over the limit of "
+                                           f"{max_pixels:,}")
+
+    factor = min(image.width // target_size[0], image.height // target_size[1])
+    # Reducing averages the raw values, so palette and bilevel images are left to render()'s resize.
+    if factor >= 2 and image.mode in ('L', 'LA', 'RGB', 'RGBA'):
+        image = image.reduce(factor)
+    return image
+
+
+ASCII_CHARS = ["B", "S", "#", "&", "@", "$", "%", "*", "!", ".", " "]
+
+ANSI_RESET = '\x1b[0m'
+ANSI_256_CODES = [f'\x1b[38;5;{index}m' for index in range(256)]
+
+PALETTES = ['truecolor', '256']
+
+
+def _prepare_image(image, width, height_scale):
+    org_width, orig_height = image.size
+    aspect_ratio = orig_height / org_width
+    new_height = aspect_ratio * width * height_scale
+    image = image.resize((width, int(new_height)))
+    image = image.convert('RGBA')
+    return ImageEnhance.Sharpness(image).enhance(2.0)
 
 
 def render(image, width=120, height_scale=0.55, colorize=True):
@@ -39,18 +218,13 @@ def render(image, width=120, height_scale=0.55, colorize=True):
         str: The ASCII representation of the image.
     """
 
-    org_width, orig_height = image.size
-    aspect_ratio = orig_height / org_width
-    new_height = aspect_ratio * width * height_scale
-    image = image.resize((width, int(new_height)))
-    image = image.convert('RGBA')
-    image = ImageEnhance.Sharpness(image).enhance(2.0)
+    image = _prepare_image(image, width, height_scale)
     pixels = image.getdata()
 
     def mapto(r, g, b, alpha):
         if alpha == 0.:
             return ' '
-        chars = ["B", "S", "#", "&", "@", "$", "%", "*", "!", ".", " "]
+        chars = ASCII_CHARS
         pixel = (r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16
         if colorize:
             return color(chars[pixel // 25], (r, g, b))
@@ -62,3 +236,66 @@ def render(image, width=120, height_scale=0.55, colorize=True):
     ascii_image = [''.join(new_pixels[index:index + width]) for index in range(0, new_pixels_count, width)]
     ascii_image = "\n".join(ascii_image)
     return ascii_image
+
+
+def render_vectorized(image, width=120, height_scale=0.55, colorize=True, palette='truecolor', merge_runs=False):
+    """
+    Convert an image to an ASCII representation with NumPy, computing every pixel at once.
+
+    With the default palette and merge_runs=False the output is byte-identical to render(). The 256-color
+    palette and merged runs of equal colors produce shorter output that looks the same in a terminal.
+    Falls back to render() when NumPy is not installed.
+
+    Args:
+        image (PIL.Image.Image): The image to be converted.
+        width (int, optional): The output width in characters. Defaults to 120.
+        height_scale (float, optional): The scale factor for the height. Defaults to 0.55.
+        colorize (bool, optional): Whether to use ANSI colors. Defaults to True.
+        palette (str, optional): 'truecolor' for 24-bit colors or '256' for the xterm palette. Defaults to 'truecolor'.
+        merge_runs (bool, optional): Emit one color code per run of equally colored characters. Defaults to False.
+
+    Returns:
+        str: The ASCII representation of the image.
+    """
+    if numpy is None:
+        return render(image, width, height_scale, colorize)
+
+    image = _prepare_image(image, width, height_scale)
+    pixels = numpy.asarray(image, dtype=numpy.uint32)
+    red, green, blue, alpha = pixels[..., 0], pixels[..., 1], pixels[..., 2], pixels[..., 3]
+    transparent = alpha == 0
+
+    luminance = (red * 19595 + green * 38470 + blue * 7471 + 0x8000) >> 16
+    glyphs = numpy.array(ASCII_CHARS, dtype=object)[luminance // 25]
+    glyphs[transparent] = ' '
+    if not colorize:
+        return '\n'.join(''.join(row) for row in glyphs.tolist())
+
+    if palette == '256':
+        levels = [(channel * 5 + 127) // 255 for channel in (red, green, blue)]
+        color_keys = 16 + 36 * levels[0] + 6 * levels[1] + levels[2]
+        unique_keys, inverse = numpy.unique(color_keys, return_inverse=True)
+        codes = numpy.array([ANSI_256_CODES[key] for key in unique_keys.tolist()], dtype=object)
+    else:
+        color_keys = (red << 16) | (green << 8) | blue
+        unique_keys, inverse = numpy.unique(color_keys, return_inverse=True)
+        codes = numpy.array([f'\x1b[38;2;{key >> 16};{(key >> 8) & 255};{key & 255}m'
+                             for key in unique_keys.tolist()], dtype=object)
+    prefixes = codes[inverse.reshape(color_keys.shape)]
+
+    if not merge_runs:
+        cells = prefixes + glyphs + ANSI_RESET
+        cells[transparent] = ' '
+        return '\n'.join(''.join(row) for row in cells.tolist())
+
+    # Transparent cells get a key of their own so they always start a new, uncolored run.
+    run_keys = numpy.where(transparent, -1, color_keys.astype(numpy.int64))
+    rows = []
+    for row_keys, row_prefixes, row_glyphs in zip(run_keys, prefixes.tolist(), glyphs.tolist()):
+        run_starts = numpy.flatnonzero(numpy.diff(row_keys, prepend=-2)).tolist() + [len(row_keys)]
+        parts = []
+        for start, end in zip(run_starts, run_starts[1:]):
+            text = ''.join(row_glyphs[start:end])
+            parts.append(text if row_keys[start] == -1 else row_prefixes[start] + text + ANSI_RESET)
+        rows.append(''.join(parts))
+    return '\n'.join(rows)
@@ -0,0 +1,313 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from db_init import ConnectionManager, PooledConnection
+from Helpers.constants import PROFILE_PROGRESS_INTERVAL, PROFILE_SLOW_QUERY_MS
+from Helpers.result_cache import get_result_cache_stats
+
+TIMER_LABELS = {
+    'cover_http': 'Cover HTTP',
+    'render': 'Render',
+}
+
+
+class Profiler:
+    """
+    Collect where the time of one command went: every SQL statement with its time and row count,
+    the connections opened, and named timers such as cover downloads and rendering.
+
+    Statements slower than the threshold are kept with their EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, slow_ms=PROFILE_SLOW_QUERY_MS):
+        self.slow_ms = slow_ms
+        self.started = time.perf_counter()
+        self.statements = {}
+        self.slow_queries = []
+        self.connections_opened = 0
+        self.traced_statements = 0
+        self.progress_calls = 0
+        self.timers = {}
+        self._lock = threading.Lock()
+
+    def on_connection_opened(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def on_trace(self, statement):
+        # SQLite also traces the statements run by triggers and by the FTS5 module, so this
+        # exceeds the executed statements when a command does work behind the scenes.
+        with self._lock:
+            self.traced_statements += 1
+
+    def on_progress(self):
+        self.progress_calls += 1
+        return 0
+
+    def record(self, sql, seconds, rows=0, executions=0):
+        """
+        Add time, rows and executions to the totals of a statement.
+
+        Returns:
+            dict: The running totals of the statement.
+        """
+        with self._lock:
+            totals = self.statements.get(sql)
+            if totals is None:
+                totals = self.statements[sql] = {'sql': sql, 'executions': 0, 'seconds': 0.0, 'rows': 0}
+            totals['executions'] += executions
+            totals['seconds'] += seconds
+            totals['rows'] += rows
+            return totals
+
+    def record_slow_query(self, conn, sql, parameters):
+        """
+        Keep a statement that crossed the slow query threshold, with its query plan.
+
+        Returns:
+            dict: The slow query entry, which the caller keeps updating while rows are fetched.
+        """
+        try:
+            plan = [row[3] for row in sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', parameters)]
+        except (sqlite3.Error, ValueError):
+            plan = []
+        entry = {'sql': sql, 'parameters': repr(parameters), 'seconds': 0.0, 'rows': 0, 'plan': plan}
+        with self._lock:
+            self.slow_queries.append(entry)
+        return entry
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                count, seconds = self.timers.get(name, (0, 0.0))
+                self.timers[name] = (count + 1, seconds + elapsed)
+
+    def summary(self, command=None):
+        """
+        Summarize everything recorded so far.
+
+        Args:
+            command (str, optional): The command that was profiled.
+
+        Returns:
+            dict: Totals, the statements sorted by time, the slow queries, the timers in milliseconds
+                and the result cache statistics.
+        """
+        with self._lock:
+            statements = sorted(self.statements.values(), key=lambda totals: totals['seconds'], reverse=True)
+            return {
+                'command': command,
+                'total_ms': (time.perf_counter() - self.started) * 1000,
+                'sql_ms': sum(totals['seconds'] for totals in statements) * 1000,
+                'statements': sum(totals['executions'] for totals in statements),
+                'traced_statements': self.traced_statements,
+                'rows': sum(totals['rows'] for totals in statements),
+                'vm_steps': self.progress_calls * PROFILE_PROGRESS_INTERVAL,
+                'connections_opened': self.connections_opened,
+                'timers': {name: {'count': count, 'ms': seconds * 1000}
+                           for name, (count, seconds) in self.timers.items()},
+                'result_cache': get_result_cache_stats(),
+                'slow_query_ms': self.slow_ms,
+                'slow_queries': [dict(entry, ms=entry['seconds'] * 1000) for entry in self.slow_queries],
+                'by_statement': [{'sql': totals['sql'], 'executions': totals['executions'],
+                                  'ms': totals['seconds'] * 1000, 'rows': totals['rows']} for totals in statements],
+            }
+
+
+def _one_line(sql, width=90):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= width else sql[:width - 3] + '...'
+
+
+def format_summary(summary, top=5):
+    """
+    Render a profile summary as a short human-readable report.
+
+    Args:
+        summary (dict): The output of Profiler.summary.
+        top (int, optional): How many of the most expensive statements to list. Defaults to 5.
+
+    Returns:
+        str: The report.
+    """
+    lines = [f"Profile of {summary['command'] or 'command'}: {summary['total_ms']:.1f} ms total",
+             f"  SQL:          {summary['sql_ms']:.1f} ms in {summary['statements']} statements, "
+             f"{summary['rows']} rows, ~{summary['vm_steps']:,} VM steps "
+             f"({summary['traced_statements']} traced, including trigger and FTS sub-statements)",
+             f"  Connections:  {summary['connections_opened']} opened"]
+    cache = summary['result_cache']
+    if cache is not None:
+        lines.append(f"  Result cache: {cache['hits']} hits, {cache['disk_hits']} from disk, {cache['misses']} misses, "
+                     f"{cache['stale']} stale, {cache['entries']} entries")
+    for name, timer in summary['timers'].items():
+        label = f"{TIMER_LABELS.get(name, name)}:"
+        lines.append(f"  {label:<13} {timer['ms']:.1f} ms in {timer['count']} calls")
+
+    if summary['by_statement']:
+        lines.append("  Most expensive statements:")
+        for totals in summary['by_statement'][:top]:
+            lines.append(f"    {totals['ms']:8.2f} ms  x{totals['executions']:<5} {totals['rows']:>7} rows  "
+                         f"{_one_line(totals['sql'])}")
+    if summary['slow_queries']:
+        lines.append(f"  Slow queries (over {summary['slow_query_ms']:g} ms):")
+        for entry in summary['slow_queries']:
+            lines.append(f"    {entry['ms']:8.2f} ms  {entry['rows']:>7} rows  {_one_line(entry['sql'])}")
+            for step in entry['plan']:
+                lines.append(f"        plan: {step}")
+    return '\n'.join(lines)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    A cursor that reports the time spent executing its statement and fetching its rows.
+    """
+
+    _profiler = None
+
+    def _start(self, sql, parameters, executions):
+        self._sql = sql
+        self._parameters = parameters
+        self._seconds = 0.0
+        self._rows = 0
+        self._slow_entry = None
+        self._add(0.0, 0, executions)
+
+    def _add(self, seconds, rows, executions=0):
+        self._profiler.record(self._sql, seconds, rows, executions)
+        self._seconds += seconds
+        self._rows += rows
+        if self._slow_entry is None and self._seconds * 1000 >= self._profiler.slow_ms:
+            parameters = self._parameters if isinstance(self._parameters, (tuple, list, dict)) else ()
+            self._slow_entry = self._profiler.record_slow_query(self.connection, self._sql, parameters)
+        if self._slow_entry is not None:
+            self._slow_entry['seconds'] = self._seconds
+            self._slow_entry['rows'] = self._rows
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._start(sql, parameters, 1)
+            self._add(time.perf_counter() - started, max(self.rowcount, 0) if self.description is None else 0)
+
+    def executemany(self, sql, parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            self._start(sql, None, 1)
+            self._add(time.perf_counter() - started, max(self.rowcount, 0))
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._add(time.perf_counter() - started, 0)
+            raise
+        self._add(time.perf_counter() - started, 1)
+        return row
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._add(time.perf_counter() - started, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._add(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._add(time.perf_counter() - started, len(rows))
+        return rows
+
+
+class ProfiledConnection(PooledConnection):
+    """
+    A pooled connection whose statements all run on ProfiledCursors, with SQLite's trace callback
+    and progress handler reporting to the active profiler.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        profiler = _active_profiler
+        profiler.on_connection_opened()
+        self.set_trace_callback(profiler.on_trace)
+        self.set_progress_handler(profiler.on_progress, PROFILE_PROGRESS_INTERVAL)
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+
+_active_profiler = None
+
+
+def enable_profiling(slow_ms=PROFILE_SLOW_QUERY_MS):
+    """
+    Start profiling the process. Only connections opened from now on are instrumented, so call this before init_db().
+
+    Args:
+        slow_ms (float, optional): Statements slower than this are logged with their query plan.
+            Defaults to PROFILE_SLOW_QUERY_MS.
+
+    Returns:
+        Profiler: The active profiler.
+    """
+    global _active_profiler
+    _active_profiler = Profiler(slow_ms)
+    ProfiledCursor._profiler = _active_profiler
+    ConnectionManager.connection_factory = ProfiledConnection
+    return _active_profiler
+
+
+def profile_section(name):
+    """
+    Time a block under a named timer of the active profiler, or do nothing when profiling is off.
+
+    Args:
+        name (str): The timer name, e.g. 'cover_http' or 'render'.
+
+    Returns:
+        A context manager.
+    """
+    profiler = _active_profiler
+    return profiler.timer(name) if profiler is not None else nullcontext()
+
+
+def print_profile(profiler, command=None, output_format='text', file=None):
+    """
+    Print the profile summary, to stderr by default so it never mixes with the command output.
+
+    Args:
+        profiler (Profiler): The profiler to report.
+        command (str, optional): The profiled command.
+        output_format (str, optional): 'text' or 'json'. Defaults to 'text'.
+        file (file, optional): Where to print. Defaults to sys.stderr.
+    """
+    summary = profiler.summary(command)
+    file = file or sys.stderr
+    if output_format == 'json':
+        print(json.dumps(summary, indent=2), file=file)
+    else:
+        print(format_summary(summary), file=file)
@@ -0,0 +1,320 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain, islice
+
+from db_init import get_db_connection
+from Helpers.constants import (RESULT_CACHE_DISK, RESULT_CACHE_DISK_MAX_BYTES, RESULT_CACHE_MAX_ENTRY_ROWS,
+                               RESULT_CACHE_MAX_ROWS)
+
+RESULT_CACHE_FILE_NAME = 'results.db'
+
+
+def catalog_version(conn):
+    """
+    Return the identity and write counter of the catalog, as kept by the CatalogVersion table.
+    The identity combines the random catalog ID with the path of the database file.
+
+    Outside transactions, the table is only read again when PRAGMA data_version says another connection
+    committed, or the connection's own total_changes says it wrote, since the last call on the same connection.
+
+    Args:
+        conn (sqlite3.Connection): The connection to check.
+
+    Returns:
+        tuple or None: (identity, version), or None if the database has no CatalogVersion table yet.
+    """
+    data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    state = getattr(conn, 'catalog_state', None)
+    if state is not None and state[0] == data_version and state[1] == conn.total_changes:
+        return state[2]
+
+    try:
+        row = conn.execute('SELECT catalog, version FROM CatalogVersion WHERE id = 1').fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    version = None
+    if row is not None:
+        # A copy of the database file keeps the catalog ID, so the path is part of the identity too.
+        path = conn.execute('PRAGMA database_list').fetchone()[2]
+        version = (f'{row[0]}:{path}', row[1])
+    # A rollback changes neither counter, so a version read inside a transaction is never reused.
+    conn.catalog_state = None if conn.in_transaction else (data_version, conn.total_changes, version)
+    return version
+
+
+class DiskResultCache:
+    """
+    A size-bounded, least-recently-used store for query results shared by every process on the machine.
+
+    Results are pickled into a small SQLite database under the user cache directory, next to the cover
+    cache, and tagged with the catalog identity and version they were read at.
+    """
+
+    def __init__(self, directory=None, max_bytes=RESULT_CACHE_DISK_MAX_BYTES):
+        from Helpers.cover_cache import get_cache_dir
+
+        self.directory = directory or get_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, RESULT_CACHE_FILE_NAME), check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('''CREATE TABLE IF NOT EXISTS Results (
+                                    catalog TEXT NOT NULL,
+                                    key TEXT NOT NULL,
+                                    version INTEGER NOT NULL,
+                                    data BLOB NOT NULL,
+                                    size INTEGER NOT NULL,
+                                    accessed_at REAL NOT NULL,
+                                    PRIMARY KEY (catalog, key)
+                                )''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_results_accessed_at ON Results (accessed_at)')
+
+    def get(self, catalog, key, version):
+        """
+        Look up a result read at the given catalog version, dropping it if it is from an older version.
+
+        Returns:
+            tuple: (found, result).
+        """
+        with self._lock, self._conn:
+            entry = self._conn.execute('SELECT version, data FROM Results WHERE catalog = ? AND key = ?',
+                                       (catalog, key)).fetchone()
+            if entry is None:
+                return False, None
+            if entry[0] != version:
+                self._conn.execute('DELETE FROM Results WHERE catalog = ? AND key = ?', (catalog, key))
+                return False, None
+            self._conn.execute('UPDATE Results SET accessed_at = ? WHERE catalog = ? AND key = ?',
+                               (time.time(), catalog, key))
+        import pickle
+
+        return True, pickle.loads(entry[1])
+
+    def put(self, catalog, key, version, result):
+        """
+        Store a result, then evict the least recently used ones while the cache is over its byte budget.
+        """
+        import pickle
+
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO Results (catalog, key, version, data, size, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (catalog, key, version, data, len(data), time.time())
+            )
+            total_bytes = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM Results').fetchone()[0]
+            if total_bytes > self.max_bytes:
+                for entry in self._conn.execute('SELECT catalog, key, size FROM Results '
+                                                'ORDER BY accessed_at').fetchall():
+                    self._conn.execute('DELETE FROM Results WHERE catalog = ? AND key = ?', entry[:2])
+                    total_bytes -= entry[2]
+                    if total_bytes <= self.max_bytes:
+                        break
+
+    def close(self):
+        self._conn.close()
+
+
+class ResultCache:
+    """
+    An in-memory, least-recently-used cache of read results, keyed by method and arguments.
+
+    Every entry remembers the catalog version it was read at and only counts as a hit while the catalog
+    is still at that version, so any committed write invalidates the whole cache at the cost of one
+    PRAGMA per lookup. The cache holds at most max_rows rows in total, and results of more than
+    max_entry_rows rows are streamed through without being cached.
+    """
+
+    def __init__(self, max_rows=RESULT_CACHE_MAX_ROWS, max_entry_rows=RESULT_CACHE_MAX_ENTRY_ROWS, disk=None):
+        self.max_rows = max_rows
+        self.max_entry_rows = max_entry_rows
+        self.disk = disk
+        self.rows = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.uncacheable = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, conn, name, arguments, compute):
+        """
+        Return the cached result of a read, or compute and cache it.
+
+        Args:
+            conn (sqlite3.Connection): The connection the read runs on.
+            name (str): The qualified name of the read method.
+            arguments (tuple): The method arguments, with defaults applied.
+            compute (callable): Runs the read.
+
+        Returns:
+            The result. Iterators such as cursors come back as lists when they are cached.
+        """
+        version = catalog_version(conn)
+        if version is None:
+            return compute()
+        catalog, number = version
+        key = (catalog, name, arguments)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == number:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(entry[1])
+                self.stale += 1
+                self._remove(key)
+
+        disk_key = repr((name, arguments))
+        if self.disk is not None:
+            found, result = self.disk.get(catalog, disk_key, number)
+            if found:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, number, result)
+                return _copy(result)
+
+        with self._lock:
+            self.misses += 1
+        result = compute()
+        if hasattr(result, '__next__'):
+            rows = list(islice(result, self.max_entry_rows + 1))
+            if len(rows) > self.max_entry_rows:
+                with self._lock:
+                    self.uncacheable += 1
+                return chain(rows, result)
+            result = rows
+        elif isinstance(result, list) and len(result) > self.max_entry_rows:
+            with self._lock:
+                self.uncacheable += 1
+            return result
+
+        # Anything read inside a write transaction may include writes that are later rolled back.
+        if not conn.in_transaction:
+            with self._lock:
+                self._store(key, number, result)
+            if self.disk is not None:
+                self.disk.put(catalog, disk_key, number, result)
+        return _copy(result)
+
+    def _store(self, key, number, result):
+        size = len(result) if isinstance(result, list) else 1
+        self._remove(key)
+        self._entries[key] = (number, result, size)
+        self.rows += size
+        while self.rows > self.max_rows:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.rows -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.rows = 0
+
+    def stats(self):
+        """
+        Report how well the cache is doing.
+
+        Returns:
+            dict: Hits (from memory and from disk), misses, stale entries dropped, evictions,
+                results too large to cache, and the current number of entries and rows.
+        """
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'stale': self.stale,
+                    'evictions': self.evictions, 'uncacheable': self.uncacheable,
+                    'entries': len(self._entries), 'rows': self.rows}
+
+
+def _copy(result):
+    # Callers get their own list and records, so sorting the list or changing a Movie or dict in it cannot
+    # change the cached ones. Numbers, strings and None have no copy() and are immutable anyway.
+    if isinstance(result, list):
+        return [item.copy() if hasattr(item, 'copy') else item for item in result]
+    return result.copy() if hasattr(result, 'copy') else result
+
+
+_result_cache = ResultCache()
+_disk_enabled = RESULT_CACHE_DISK
+
+
+def configure_result_cache(enabled=True, disk=RESULT_CACHE_DISK):
+    """
+    Turn the result cache and its shared on-disk tier on or off for the whole process.
+
+    Args:
+        enabled (bool, optional): Cache read results at all. Defaults to True.
+        disk (bool, optional): Also share them with other processes through the user cache directory.
+            Defaults to RESULT_CACHE_DISK, i.e. the MOVIE_DB_RESULT_CACHE_DISK environment variable.
+    """
+    global _result_cache, _disk_enabled
+    if _result_cache is not None and _result_cache.disk is not None:
+        _result_cache.disk.close()
+    _disk_enabled = disk
+    _result_cache = ResultCache() if enabled else None
+
+
+def get_result_cache():
+    """
+    Return the result cache of the process, or None when caching is off.
+
+    The on-disk tier is only opened on the first cached read, so commands that never read pay nothing for it.
+    """
+    cache = _result_cache
+    if cache is not None and _disk_enabled and cache.disk is None:
+        with cache._lock:
+            if cache.disk is None:
+                cache.disk = DiskResultCache()
+    return cache
+
+
+def get_result_cache_stats():
+    """
+    Report the statistics of the result cache without opening its on-disk tier.
+
+    Returns:
+        dict or None: The output of ResultCache.stats, or None when caching is off.
+    """
+    cache = _result_cache
+    if cache is None:
+        return None
+    return dict(cache.stats(), disk=_disk_enabled)
+
+
+def cached_read(method):
+    """
+    Decorate a read method of a model so its results are served from the result cache.
+
+    Arguments are matched to the parameter names with defaults filled in, so get_newest() and
+    get_newest(5) share an entry. Put it under @staticmethod.
+    """
+    code = method.__code__
+    names = code.co_varnames[:code.co_argcount]
+    defaults = dict(zip(names[len(names) - len(method.__defaults__ or ()):], method.__defaults__ or ()))
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        cache = get_result_cache()
+        if cache is None:
+            return method(*args, **kwargs)
+        arguments = args + tuple(kwargs[parameter] if parameter in kwargs else defaults[parameter]
+                                 for parameter in names[len(args):])
+        return cache.lookup(get_db_connection(), name, arguments, lambda: method(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,96 @@
+import re
+
+SEARCH_FIELDS = ['title', 'description', 'director']
+SEARCH_FIELD_CHOICES = SEARCH_FIELDS + ['all']
+
+# Column weights for bm25(), in the same order as the MoviesFts columns.
+SEARCH_FIELD_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_match_expression(query, field='title'):
+    """
+    Translate a user search query into an FTS5 MATCH expression.
+
+    Double-quoted parts of the query are matched as exact phrases and every other word as a prefix,
+    so "dark kni" finds "The Dark Knight". All terms must match.
+
+    Args:
+        query (str): The search query as typed by the user.
+        field (str, optional): The column to search, or 'all' for every column. Defaults to 'title'.
+
+    Returns:
+        str or None: The MATCH expression, or None if the query holds no searchable terms.
+    """
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(query):
+        if phrase:
+            if any(char.isalnum() for char in phrase):
+                terms.append(_quote(phrase))
+        else:
+            word = word.rstrip('*')
+            if any(char.isalnum() for char in word):
+                terms.append(_quote(word) + '*')
+
+    if not terms:
+        return None
+
+    expression = ' AND '.join(terms)
+    if field == 'all':
+        return expression
+    return f'{field} : ({expression})'
+
+
+def title_trigrams(text, lower=True):
+    """
+    Split text into the trigrams the MoviesTitleTrigrams index matches on: every run of three characters,
+    spaces included, case-insensitively, after collapsing runs of whitespace into one space.
+
+    Args:
+        text (str): A title or a fuzzy search query.
+        lower (bool, optional): Lower-case the trigrams (default is True). Pass False to fold them in SQL
+            instead, e.g. with lower() like the MoviesTitleTrigramCounts triggers.
+
+    Returns:
+        set: The distinct trigrams; empty for text shorter than three characters.
+    """
+    text = ' '.join((text.lower() if lower else text).split())
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_trigram_match(trigram):
+    """
+    Quote a single trigram as an FTS5 MATCH expression for the trigram index.
+    """
+    return _quote(trigram)
+
+
+def trigram_similarity(first, second):
+    """
+    The Jaccard similarity of two trigram sets, from 0.0 (nothing shared) to 1.0 (identical).
+    """
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+def edit_distance(a, b):
+    """
+    The Levenshtein distance between two strings: the fewest single-character insertions,
+    deletions and substitutions that turn one into the other.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
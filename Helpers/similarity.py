@@ -0,0 +1,481 @@
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+
+from Helpers.constants import (SIMILARITY_CANDIDATES, SIMILARITY_DELTA_LIMIT, SIMILARITY_INDEX_SUFFIX,
+                               SIMILARITY_MAX_DF, SIMILARITY_MAX_POSTINGS, SIMILARITY_RESULT_LIMIT,
+                               SIMILARITY_TITLE_WEIGHT)
+
+# numpy is only imported by the functions that load, build or search an index, so adding a movie
+# to the delta of an existing index stays cheap.
+SIMILARITY_INDEX_MAGIC = b'MOVSIM1\n'
+SIMILARITY_INDEX_FORMAT = 1
+SIMILARITY_DELTA_SUFFIX = '-delta'
+ARRAY_ALIGNMENT = 64
+
+_WORD_PATTERN = re.compile(r'[^\W_]{2,}')
+
+MOVIE_TERMS_SQL = '''
+    SELECT m.id, m.title, m.description, m.director, g.name
+    FROM Movies m
+    LEFT JOIN Genres g ON m.genre_id = g.id
+'''
+
+
+def movie_terms(title, description, director, genre):
+    """
+    Count the terms a movie is compared by.
+
+    Words of the description and title count once per occurrence, title words SIMILARITY_TITLE_WEIGHT
+    times. The director and the genre are single terms, so 'director:christopher nolan' only matches
+    the same director.
+
+    Returns:
+        Counter: The term frequencies.
+    """
+    terms = Counter(_WORD_PATTERN.findall((description or '').lower()))
+    for word in _WORD_PATTERN.findall((title or '').lower()):
+        terms[word] += SIMILARITY_TITLE_WEIGHT
+    if director:
+        terms['director:' + ' '.join(director.lower().split())] += 1
+    if genre:
+        terms['genre:' + genre.lower()] += 1
+    return terms
+
+
+def get_index_path(conn):
+    """
+    Locate the similarity index of the database a connection is open on.
+
+    Returns:
+        str or None: The database file name with SIMILARITY_INDEX_SUFFIX, or None for an in-memory database.
+    """
+    database = conn.execute('PRAGMA database_list').fetchone()[2]
+    return database + SIMILARITY_INDEX_SUFFIX if database else None
+
+
+def _get_catalog_id(conn):
+    return conn.execute('SELECT catalog FROM CatalogVersion WHERE id = 1').fetchone()[0]
+
+
+def _align(offset):
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def _write_index_file(path, header, arrays):
+    # A JSON header describing every array, followed by the raw arrays at aligned offsets, so a single
+    # read-only memory map of the file serves all of them. The file is replaced atomically.
+    layout = {}
+    offset = 0
+    for name, values in arrays.items():
+        offset = _align(offset)
+        layout[name] = {'dtype': values.dtype.str, 'shape': list(values.shape), 'offset': offset}
+        offset += values.nbytes
+    header_bytes = json.dumps(dict(header, arrays=layout)).encode('utf-8')
+    data_start = _align(len(SIMILARITY_INDEX_MAGIC) + 8 + len(header_bytes))
+
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as index_file:
+        index_file.write(SIMILARITY_INDEX_MAGIC + len(header_bytes).to_bytes(8, 'little') + header_bytes)
+        for name, values in arrays.items():
+            index_file.seek(data_start + layout[name]['offset'])
+            index_file.write(values.tobytes())
+        index_file.truncate(data_start + offset)
+    os.replace(temporary_path, path)
+
+
+def _read_index_file(path):
+    import numpy
+
+    with open(path, 'rb') as index_file:
+        if index_file.read(len(SIMILARITY_INDEX_MAGIC)) != SIMILARITY_INDEX_MAGIC:
+            return None, None
+        header_length = int.from_bytes(index_file.read(8), 'little')
+        header = json.loads(index_file.read(header_length))
+    data_start = _align(len(SIMILARITY_INDEX_MAGIC) + 8 + header_length)
+
+    # Plain arrays over one read-only map of the file; the operating system pages them in on demand
+    # and shares them between processes.
+    with open(path, 'rb') as index_file:
+        data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    for name, spec in header.pop('arrays').items():
+        arrays[name] = numpy.frombuffer(data, dtype=spec['dtype'], count=math.prod(spec['shape']),
+                                        offset=data_start + spec['offset']).reshape(spec['shape'])
+    return header, arrays
+
+
+def build_index(conn, on_progress=None):
+    """
+    Build the TF-IDF similarity index of every movie and write it next to the database.
+
+    Movie vectors are weighted by (1 + log tf) * idf and normalized to unit length, so the dot product
+    of two vectors is their cosine similarity. Terms used by more than SIMILARITY_MAX_DF of the movies
+    say little about them and are left out. The index is stored as postings per term, ordered by weight,
+    so a search can read just the strongest postings of a common term. Any delta is dropped.
+
+    Args:
+        conn (sqlite3.Connection): A connection to the database to index.
+        on_progress (callable, optional): Called with the number of movies read so far, every 100,000 movies.
+
+    Returns:
+        dict: The number of 'movies' and 'terms' indexed, the index 'bytes' and the 'seconds' taken.
+    """
+    import numpy
+
+    started = time.perf_counter()
+    path = get_index_path(conn)
+    catalog = _get_catalog_id(conn)
+    vocabulary = {}
+    add_term = vocabulary.setdefault
+    term_ids = array('i')
+    frequencies = array('f')
+    lengths = array('i')
+    movie_ids = array('q')
+
+    for movie_id, title, description, director, genre in conn.execute(MOVIE_TERMS_SQL + ' ORDER BY m.id'):
+        terms = movie_terms(title, description, director, genre)
+        term_ids.extend([add_term(term, len(vocabulary)) for term in terms])
+        frequencies.extend(terms.values())
+        lengths.append(len(terms))
+        movie_ids.append(movie_id)
+        if on_progress and len(movie_ids) % 100_000 == 0:
+            on_progress(len(movie_ids))
+
+    movies = len(movie_ids)
+    term_ids = numpy.frombuffer(term_ids, dtype=numpy.int32)
+    documents = numpy.repeat(numpy.arange(movies, dtype=numpy.int32), numpy.frombuffer(lengths, dtype=numpy.int32))
+    document_frequency = numpy.bincount(term_ids, minlength=len(vocabulary))
+    idf = (numpy.log((1 + movies) / (1 + document_frequency)) + 1).astype(numpy.float32)
+    kept = document_frequency <= max(1, SIMILARITY_MAX_DF * movies)
+
+    mask = kept[term_ids]
+    term_ids, documents = term_ids[mask], documents[mask]
+    weights = (1 + numpy.log(numpy.frombuffer(frequencies, dtype=numpy.float32)[mask])) * idf[term_ids]
+    norms = numpy.sqrt(numpy.bincount(documents, weights * weights, minlength=movies)).astype(numpy.float32)
+    weights /= norms[documents]
+
+    # Terms are stored sorted, so a term is found with a binary search of the memory-mapped array.
+    terms = sorted(term for term, term_id in vocabulary.items() if kept[term_id])
+    old_ids = numpy.array([vocabulary[term] for term in terms], dtype=numpy.int64)
+    new_ids = numpy.zeros(len(vocabulary), dtype=numpy.int32)
+    new_ids[old_ids] = numpy.arange(len(terms), dtype=numpy.int32)
+    term_ids = new_ids[term_ids]
+
+    order = numpy.lexsort((-weights, term_ids))
+    offsets = numpy.zeros(len(terms) + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+    # The vectors are also kept per movie, in catalog order, to score search candidates exactly.
+    document_offsets = numpy.zeros(movies + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(documents, minlength=movies), out=document_offsets[1:])
+    arrays = {
+        'terms': _term_array(terms),
+        'common_terms': _term_array(sorted(term for term, term_id in vocabulary.items() if not kept[term_id])),
+        'idf': idf[old_ids],
+        'offsets': offsets,
+        'postings': documents[order],
+        'weights': weights[order],
+        'movie_ids': numpy.frombuffer(movie_ids, dtype=numpy.int64),
+        'document_offsets': document_offsets,
+        'document_terms': term_ids,
+        'document_weights': weights,
+    }
+    header = {'format': SIMILARITY_INDEX_FORMAT, 'catalog': catalog, 'movies': movies,
+              'max_movie_id': movie_ids[-1] if movies else 0}
+    _write_index_file(path, header, arrays)
+    if os.path.exists(path + SIMILARITY_DELTA_SUFFIX):
+        os.remove(path + SIMILARITY_DELTA_SUFFIX)
+
+    return {'movies': movies, 'terms': len(terms), 'bytes': os.path.getsize(path),
+            'seconds': time.perf_counter() - started}
+
+
+def _delta_line(movie_id, title, description, director, genre):
+    return json.dumps({'id': movie_id, 'terms': movie_terms(title, description, director, genre)},
+                      ensure_ascii=False) + '\n'
+
+
+def _delta_header(scanned_id):
+    # The first line of the delta: every movie up to scanned_id is in the index or the delta. It is padded
+    # to a fixed width, so it can be rewritten in place as the catch-up scans move on.
+    return f'{{"scanned_id": {scanned_id:<20}}}\n'
+
+
+def _append_delta(path, lines):
+    with open(path, 'a', encoding='utf-8') as delta_file:
+        if delta_file.tell() == 0:
+            delta_file.write(_delta_header(0))
+        delta_file.write(''.join(lines))
+
+
+def _mark_delta(path, scanned_id):
+    # A header written by another process that has scanned further is left alone.
+    with open(path, 'r+b') as delta_file:
+        header = delta_file.readline()
+        if len(header) != len(_delta_header(0)) or json.loads(header).get('scanned_id', scanned_id) >= scanned_id:
+            return
+        delta_file.seek(0)
+        delta_file.write(_delta_header(scanned_id).encode('utf-8'))
+
+
+def index_new_movie(conn, movie_id, title, description, director, genre):
+    """
+    Append a newly added movie to the delta of the similarity index, if the database has an index.
+
+    The delta is an append-only JSON lines file of raw term counts next to the index, weighted with the
+    index's idf when it is loaded, so adding a movie needs neither numpy nor a rebuild. Its first line is a
+    header with the highest movie ID the catch-up scans of SimilarityIndex.refresh_delta have checked.
+
+    Args:
+        conn (sqlite3.Connection): The connection the movie was committed on.
+        movie_id (int): The ID of the new movie.
+        title (str): The title of the movie.
+        description (str): The description of the movie.
+        director (str): The director of the movie.
+        genre (str): The genre name of the movie.
+    """
+    path = get_index_path(conn)
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with _indexes_lock:
+            _append_delta(path + SIMILARITY_DELTA_SUFFIX, [_delta_line(movie_id, title, description, director, genre)])
+    except OSError:
+        # The movie is committed either way, and the next search adds whatever the delta is missing.
+        pass
+
+
+def _find_term(terms, term):
+    # Terms are stored sorted as UTF-8 bytes, whose order matches the order of the strings.
+    encoded = term.encode('utf-8')
+    position = int(terms.searchsorted(encoded)) if len(terms) else 0
+    return position if position < len(terms) and terms[position] == encoded else -1
+
+
+def _term_array(terms):
+    import numpy
+
+    return numpy.array([term.encode('utf-8') for term in terms], dtype=bytes) if terms else numpy.zeros(0, 'S1')
+
+
+class SimilarityIndex:
+    """
+    A memory-mapped TF-IDF index of the catalog, plus the delta of movies added since it was built.
+    """
+
+    def __init__(self, path, header, arrays):
+        self.path = path
+        self.catalog = header['catalog']
+        self.movies = header['movies']
+        self.max_movie_id = header['max_movie_id']
+        self.terms = arrays['terms']
+        self.common_terms = arrays['common_terms']
+        self.idf = arrays['idf']
+        self.offsets = arrays['offsets']
+        self.postings = arrays['postings']
+        self.weights = arrays['weights']
+        self.movie_ids = arrays['movie_ids']
+        self.document_offsets = arrays['document_offsets']
+        self.document_terms = arrays['document_terms']
+        self.document_weights = arrays['document_weights']
+        self.modified = os.stat(path).st_mtime_ns
+        self.delta = {}
+        self._delta_offset = 0
+        # The highest movie ID the catch-up scans have checked, kept apart from the delta, whose IDs
+        # say nothing about the movies inserted before them without a delta line. Raised to the one in
+        # the header of the delta file when it is read.
+        self._scanned_id = self.max_movie_id
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map the index at path.
+
+        Returns:
+            SimilarityIndex or None: The index, or None if the file is missing or in another format.
+        """
+        try:
+            header, arrays = _read_index_file(path)
+        except (OSError, ValueError):
+            return None
+        if header is None or header.get('format') != SIMILARITY_INDEX_FORMAT:
+            return None
+        return cls(path, header, arrays)
+
+    def vectorize(self, terms):
+        """
+        Weight term counts like the indexed movies. Terms left out of the index as too common are dropped,
+        and terms the index has never seen get the idf of a term used by a single movie.
+
+        Returns:
+            dict: Unit-length weights by term.
+        """
+        rare_idf = math.log((1 + self.movies) / 2) + 1
+        vector = {}
+        for term, count in terms.items():
+            term_id = _find_term(self.terms, term)
+            if term_id < 0 and _find_term(self.common_terms, term) >= 0:
+                continue
+            vector[term] = (1 + math.log(count)) * (float(self.idf[term_id]) if term_id >= 0 else rare_idf)
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def refresh_delta(self, conn):
+        """
+        Read the movies appended to the delta file since the last call, then add any newer movies the index
+        and the delta are both missing, e.g. ones inserted by movimport or Movie.add_batch, which write no
+        delta lines. Those are appended to the delta file, for other processes, and loaded at once.
+
+        Only movies above the highest ID any process has scanned, as recorded in the header of the delta
+        file, are read, so the scan does not read the whole delta again in every process.
+        """
+        with self._lock:
+            delta_path = self.path + SIMILARITY_DELTA_SUFFIX
+            try:
+                with open(delta_path, 'rb') as delta_file:
+                    delta_file.seek(self._delta_offset)
+                    data = delta_file.read()
+            except FileNotFoundError:
+                data = b''
+            # Only complete lines are consumed; a line still being written is read on the next call.
+            data = data[:data.rfind(b'\n') + 1]
+            self._delta_offset += len(data)
+            for line in data.splitlines():
+                entry = json.loads(line)
+                if 'id' in entry:
+                    self.delta[entry['id']] = self.vectorize(entry['terms'])
+                else:
+                    # The header, or a second one appended by a process that created the file at the same time.
+                    self._scanned_id = max(self._scanned_id, entry['scanned_id'])
+
+            # Rows of an open write transaction may still be rolled back, and their IDs reused.
+            if conn.in_transaction:
+                return
+            rows = conn.execute(MOVIE_TERMS_SQL + ' WHERE m.id > ? ORDER BY m.id', (self._scanned_id,)).fetchall()
+            if not rows:
+                return
+            self._scanned_id = rows[-1][0]
+            missing = [row for row in rows if row[0] not in self.delta]
+            try:
+                # Lines another process appends for the same movies later are harmless: they hold the same
+                # terms. The header only moves on once the lines are written.
+                if missing:
+                    _append_delta(delta_path, [_delta_line(*row) for row in missing])
+                _mark_delta(delta_path, self._scanned_id)
+            except OSError:
+                # This process still searches the movies; others scan for them again.
+                pass
+            for movie_id, title, description, director, genre in missing:
+                self.delta[movie_id] = self.vectorize(movie_terms(title, description, director, genre))
+
+    def search(self, terms, limit=SIMILARITY_RESULT_LIMIT, exclude=None):
+        """
+        Find the movies whose vectors have the largest dot product with the given terms.
+
+        Candidates are gathered from the postings of the query terms, read in order of weight: rare terms
+        are read in full, and the common ones share what is left of SIMILARITY_MAX_POSTINGS, so a query
+        costs about the same whatever the size of the catalog. The SIMILARITY_CANDIDATES best candidates
+        are then scored exactly from their stored vectors. A movie that only shares common terms with
+        the query can be missed, so the result is approximate.
+
+        Args:
+            terms (Counter): The term counts to compare with, e.g. from movie_terms().
+            limit (int, optional): The number of movies to return. Defaults to SIMILARITY_RESULT_LIMIT.
+            exclude (int, optional): A movie ID to leave out, usually the movie the terms came from.
+
+        Returns:
+            list: (score, movie ID) pairs, best first.
+        """
+        import numpy
+
+        vector = self.vectorize(terms)
+        query = numpy.zeros(len(self.terms), dtype=numpy.float32)
+        lookups = []
+        for term, weight in vector.items():
+            term_id = _find_term(self.terms, term)
+            if term_id >= 0:
+                query[term_id] = weight
+                start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+                lookups.append((end - start, start, weight))
+        lookups.sort()
+
+        documents, contributions = [], []
+        budget = SIMILARITY_MAX_POSTINGS
+        for position, (length, start, weight) in enumerate(lookups):
+            take = min(length, budget // (len(lookups) - position))
+            budget -= take
+            documents.append(self.postings[start:start + take])
+            contributions.append(self.weights[start:start + take] * weight)
+
+        candidates = []
+        if documents:
+            # Summing into a dense array is cheaper than grouping the postings, but only the movies that
+            # were touched are ranked.
+            partial_scores = numpy.bincount(numpy.concatenate(documents), numpy.concatenate(contributions),
+                                            minlength=self.movies)
+            touched = numpy.flatnonzero(partial_scores > 0)
+            count = min(SIMILARITY_CANDIDATES, len(touched))
+            touched = touched[numpy.argpartition(partial_scores[touched], -count)[-count:]]
+
+            # Gather the stored vectors of the candidates into one flat array to score them all at once.
+            starts = self.document_offsets[touched]
+            lengths = self.document_offsets[touched + 1] - starts
+            positions = numpy.repeat(starts - (numpy.cumsum(lengths) - lengths), lengths) + numpy.arange(lengths.sum())
+            scores = numpy.bincount(numpy.repeat(numpy.arange(count), lengths),
+                                    query[self.document_terms[positions]] * self.document_weights[positions],
+                                    minlength=count)
+            best = numpy.argpartition(scores, -min(limit + 1, count))[-(limit + 1):]
+            candidates = [(float(scores[index]), int(self.movie_ids[touched[index]])) for index in best]
+
+        for movie_id, other in self.delta.items():
+            score = sum(weight * other.get(term, 0.0) for term, weight in vector.items())
+            if score > 0:
+                candidates.append((score, movie_id))
+
+        ranked = sorted((-score, movie_id) for score, movie_id in candidates if movie_id != exclude and score > 0)
+        return [(-score, movie_id) for score, movie_id in ranked[:limit]]
+
+
+_indexes = {}
+_indexes_lock = threading.RLock()
+
+
+def get_similarity_index(conn, rebuild=False):
+    """
+    Return the similarity index of the connection's database, building it first if it is missing,
+    was built from another catalog, or a rebuild is asked for.
+
+    The index is loaded once per process and loaded again when another process rebuilds it.
+    """
+    path = get_index_path(conn)
+    if path is None:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(path)
+        try:
+            current = index is not None and index.modified == os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            current = False
+        if not current or rebuild:
+            index = None if rebuild else SimilarityIndex.load(path)
+            if index is None or index.catalog != _get_catalog_id(conn):
+                print("Building the similarity index...", file=sys.stderr)
+                summary = build_index(conn)
+                print(f"Indexed {summary['movies']:,} movies and {summary['terms']:,} terms in "
+                      f"{summary['seconds']:.1f}s ({summary['bytes'] / 1024 / 1024:.1f} MB).", file=sys.stderr)
+                index = SimilarityIndex.load(path)
+            _indexes[path] = index
+
+    index.refresh_delta(conn)
+    if len(index.delta) > SIMILARITY_DELTA_LIMIT:
+        print(f"{len(index.delta):,} movies were added since the similarity index was built; "
+              f"run 'movsim --rebuild' to fold them in.", file=sys.stderr)
+    return index
@@ -1,17 +1,121 @@
+import csv
+import json
+import sys
+from operator import attrgetter
+
+from Helpers.constants import OUTPUT_BUFFER_ROWS
+
+# The fields shown for every movie, in display order.
+OUTPUT_FIELDS = ('id', 'title', 'description', 'release_date', 'director', 'genre_name', 'likes')
+
+get_output_values = attrgetter(*OUTPUT_FIELDS)
+encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+# Tabs, newlines and backslashes inside TSV fields are written as backslash escapes.
+TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def format_movie_details(movie):
+    return (f"ID: {movie.id}\n"
+            f"Title: {movie.title}\n"
+            f"Description: {movie.description}\n"
+            f"Release Date: {movie.release_date}\n"
+            f"Director: {movie.director}\n"
+            f"Genre: {movie.genre_name}\n"
+            f"Likes: {movie.likes}\n")
+
+
 def print_movie_details(movie):
     if movie:
-        print(f"ID: {movie['id']}")
-        print(f"Title: {movie['title']}")
-        print(f"Description: {movie['description']}")
-        print(f"Release Date: {movie['release_date']}")
-        print(f"Director: {movie['director']}")
-        print(f"Genre: {movie['genre_name']}")
-        print(f"Likes: {movie['likes']}")
+        print(format_movie_details(movie), end='')
     else:
         print("Movie not found.")
 
 
-def print_movie_list(movies):
+def format_stats_table(stats, by, totals):
+    """
+    Lay out the output of Movie.get_stats as a table with a total row.
+
+    Args:
+        stats (list): The group dicts returned by Movie.get_stats.
+        by (str): The grouping, i.e. the key of the group in every dict.
+        totals (dict): The catalog totals returned by Movie.get_stats_totals.
+
+    Returns:
+        str: The table, one line per group.
+    """
+    names = [str(group[by]) for group in stats]
+    width = max([len(by), len('Total')] + [len(name) for name in names])
+    lines = [f"{by.capitalize():<{width}}  {'Movies':>10}  {'Likes':>12}"]
+    lines.extend(f"{name:<{width}}  {group['movies']:>10,}  {group['likes']:>12,}" for name, group in zip(names, stats))
+    lines.append(f"{'Total':<{width}}  {totals['movies']:>10,}  {totals['likes']:>12,}")
+    return '\n'.join(lines) + '\n'
+
+
+class _ChunkWriter:
+    """
+    A file-like target for csv.writer that collects the formatted lines in a list.
+    """
+
+    def __init__(self, chunks):
+        self.write = chunks.append
+
+
+def _tsv_field(value):
+    return '' if value is None else str(value).translate(TSV_ESCAPES)
+
+
+def write_movie_list(movies, output_format='text', out=None):
+    """
+    Stream movies to the output in one of the OUTPUT_FORMATS, as the cursor produces them.
+
+    Rows are formatted into a buffer that is written out every OUTPUT_BUFFER_ROWS movies, so a large
+    export costs one write per chunk instead of several print() calls per movie, and never holds
+    the whole result set in memory.
+
+    Args:
+        movies (iterable): The Movie records to write.
+        output_format (str, optional): 'text', 'json', 'ndjson', 'tsv' or 'csv'. Defaults to 'text'.
+        out (file, optional): Where to write. Defaults to sys.stdout.
+
+    Returns:
+        int: The number of movies written.
+    """
+    out = out or sys.stdout
+    buffer = []
+    count = 0
+
+    if output_format == 'csv':
+        writer = csv.writer(_ChunkWriter(buffer))
+        writer.writerow(OUTPUT_FIELDS)
+    elif output_format == 'tsv':
+        buffer.append('\t'.join(OUTPUT_FIELDS) + '\n')
+    elif output_format == 'json':
+        buffer.append('[')
+
     for movie in movies:
-        print_movie_details(movie)
-        print()
+        if output_format == 'text':
+            buffer.append(format_movie_details(movie) + '\n')
+        elif output_format == 'ndjson':
+            buffer.append(encode_json(movie.as_dict(OUTPUT_FIELDS)) + '\n')
+        elif output_format == 'json':
+            buffer.append((',\n' if count else '\n') + encode_json(movie.as_dict(OUTPUT_FIELDS)))
+        elif output_format == 'tsv':
+            buffer.append('\t'.join([_tsv_field(value) for value in get_output_values(movie)]) + '\n')
+        else:
+            writer.writerow(get_output_values(movie))
+        count += 1
+
+        if len(buffer) >= OUTPUT_BUFFER_ROWS:
+            out.write(''.join(buffer))
+            buffer.clear()
+
+    if output_format == 'json':
+        buffer.append('\n]\n' if count else ']\n')
+    out.write(''.join(buffer))
+    out.flush()
+    return count
+
+
+def print_movie_list(movies):
+    return write_movie_list(movies)
@@ -1,12 +1,71 @@
+import threading
+
 from Helpers.constants import PREDEFINED_GENRES, UNKNOWN_GENRE
-from db_init import get_db_connection
+from db_init import get_db_connection, transaction
 
 
 class Genre:
+    __slots__ = ('id', 'name')
+
+    # The Genres table is small and genres are only ever added, so it is loaded into memory once and a
+    # hit needs no query at all. A miss, or a listing of every genre, first checks the Genres counter in
+    # CatalogVersion, which only Genres triggers bump, and reloads the map if another process added one.
+    # Anything that writes to Genres should still call Genre.invalidate_cache() so the next lookup reloads at once.
+    _cache = None
+    _cache_lock = threading.Lock()
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
 
+    def __repr__(self):
+        return f"Genre(id={self.id!r}, name={self.name!r})"
+
+    @staticmethod
+    def _get_cache(refresh=False):
+        conn = get_db_connection()
+
+        def is_usable(cache):
+            # A map loaded inside a write transaction may hold genres that are rolled back, so it is only
+            # trusted until that transaction ends.
+            return cache is not None and (not cache[1] or conn.in_transaction)
+
+        cache = Genre._cache
+        if is_usable(cache) and not refresh:
+            return cache[2:]
+        with Genre._cache_lock:
+            version = conn.execute('SELECT genres FROM CatalogVersion WHERE id = 1').fetchone()[0]
+            cache = Genre._cache
+            if not is_usable(cache) or cache[0] != version:
+                rows = conn.execute('SELECT id, name FROM Genres ORDER BY id').fetchall()
+                cache = Genre._cache = (version, conn.in_transaction, {row['name']: row['id'] for row in rows},
+                                        {row['id']: row['name'] for row in rows})
+        return cache[2:]
+
+    @staticmethod
+    def invalidate_cache():
+        """
+        Drop the in-memory genre map so the next lookup reloads it from the database.
+        """
+        Genre._cache = None
+
+    @staticmethod
+    def add(name):
+        """
+        Add a new genre to the database, or return the existing one with the same name.
+
+        Args:
+            name (str): The name of the genre to add.
+
+        Returns:
+            int: The ID of the genre.
+        """
+        name = name.lower()
+        with transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO Genres (name) VALUES (?)', (name,))
+        Genre.invalidate_cache()
+        return Genre.get_id_by_name(name)
+
     @staticmethod
     def get_id_by_name(name):
         """
@@ -18,9 +77,11 @@ class Genre:
         Returns:
             int or None: The ID of the genre if found, otherwise None.
         """
-        with get_db_connection() as conn:
-            name = name.lower()
-            return conn.execute('SELECT id FROM Genres WHERE name = ?', (name,)).fetchone()['id']
+        name = name.lower()
+        ids_by_name, _ = Genre._get_cache()
+        if name not in ids_by_name:
+            ids_by_name, _ = Genre._get_cache(refresh=True)
+        return ids_by_name.get(name)
 
     @staticmethod
     def get_name_by_id(genre_id):
@@ -33,8 +94,10 @@ class Genre:
         Returns:
             str or None: The name of the genre if found, otherwise None.
         """
-        with get_db_connection() as conn:
-            return conn.execute('SELECT name FROM Genres WHERE id = ?', (genre_id,)).fetchone()['name']
+        _, names_by_id = Genre._get_cache()
+        if genre_id not in names_by_id:
+            _, names_by_id = Genre._get_cache(refresh=True)
+        return names_by_id.get(genre_id)
 
     @staticmethod
     def get_all():
@@ -42,18 +105,19 @@ class Genre:
         Retrieve all genres from the database.
 
         Returns:
-            list: A list of dictionaries representing all genres, each dictionary containing genre details.
+            list: Genre records for all genres, in ID order.
         """
-        with get_db_connection() as conn:
-            return conn.execute('SELECT * FROM Genres').fetchall()
+        _, names_by_id = Genre._get_cache(refresh=True)
+        return [Genre(genre_id, name) for genre_id, name in names_by_id.items()]
 
     @staticmethod
-    def get_genre_id_or_default(genre):
+    def get_genre_id_or_default(genre, verbose=True):
         """
         Retrieve the ID of a genre by its name or default to a predefined genre if not found.
 
         Args:
             genre (str): The name of the genre to retrieve.
+            verbose (bool, optional): Whether to explain the fallback to the default genre. Defaults to True.
 
         Returns:
             int: The ID of the genre found or the ID of the default genre ('unknown') if not found.
@@ -64,9 +128,10 @@ class Genre:
         if genre_id and genre != UNKNOWN_GENRE:
             return genre_id
         else:
-            print(
-                f"Genre '{genre}' not found in predefined genres. Predefined genres are: {', '.join(PREDEFINED_GENRES)}.")
-            print(f"Defaulting to '{UNKNOWN_GENRE}'.")
+            if verbose:
+                print(f"Genre '{genre}' not found in predefined genres. "
+                      f"Predefined genres are: {', '.join(PREDEFINED_GENRES)}.")
+                print(f"Defaulting to '{UNKNOWN_GENRE}'.")
 
             genre_id = Genre.get_id_by_name(UNKNOWN_GENRE)
             return genre_id
@@ -1,13 +1,73 @@
+import heapq
 import sqlite3
+from collections import Counter
 
-from db_init import get_db_connection
+from db_init import call_after_commit, get_db_connection, transaction
 from Models.Genre import Genre
-from Helpers.movie_cover import get_movie_cover_from_url
+from Helpers.constants import (FUZZY_CANDIDATES, FUZZY_MAX_POSTINGS, FUZZY_MIN_LOOKUPS, FUZZY_MIN_SIMILARITY,
+                               FUZZY_RESULT_LIMIT, LEADERBOARD_SIZE, LIKE_LOOKUP_CHUNK_SIZE, MOVIE_PAGE_SIZE,
+                               RELEASE_RANGE_LIMIT, SIMILARITY_RESULT_LIMIT)
+from Helpers.dates import MAX_RELEASE_DAY, MIN_RELEASE_DAY, release_day
+from Helpers.result_cache import cached_read
+from Helpers.search import (build_match_expression, build_trigram_match, edit_distance, title_trigrams,
+                            trigram_similarity, SEARCH_FIELD_WEIGHTS)
 import datetime
 
 
+# Queries select the record fields in __slots__ order, so rows map onto Movie(*row) positionally.
+# Summary queries leave out the description and cover, which list views of many movies don't need.
+DETAIL_COLUMNS = 'm.id, m.title, m.description, m.release_date, m.director, m.genre_id, m.likes, m.cover, g.name'
+SUMMARY_COLUMNS = 'm.id, m.title, NULL, m.release_date, m.director, m.genre_id, m.likes, NULL, g.name'
+
+# The trigger-maintained summary table behind every grouping of Movie.get_stats.
+STATS_QUERIES = {
+    'genre': 'SELECT g.name AS genre, s.movies, s.likes FROM GenreStats s LEFT JOIN Genres g ON g.id = s.genre_id',
+    'year': 'SELECT year, movies, likes FROM YearStats',
+    'director': 'SELECT director, movies, likes FROM DirectorStats',
+}
+STATS_SORTS = ['movies', 'likes', 'name']
+
+
+def _movie_record(cursor, row):
+    return Movie(*row)
+
+
+def _query_movies(conn, sql, parameters, summary=False):
+    cursor = conn.cursor()
+    cursor.row_factory = _movie_record
+    return cursor.execute(sql.format(columns=SUMMARY_COLUMNS if summary else DETAIL_COLUMNS), parameters)
+
+
+def _page_movies(conn, after_id, limit, page_size, summary):
+    # Keyset pagination on the ID, one query per page; see Movie.get_all.
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        fetched = 0
+        for movie in _query_movies(conn, '''
+            SELECT {columns}
+            FROM Movies m
+            LEFT JOIN Genres g ON m.genre_id = g.id
+            WHERE m.id > ?
+            ORDER BY m.id
+            LIMIT ?
+        ''', (after_id, size), summary):
+            fetched += 1
+            after_id = movie.id
+            yield movie
+
+        if fetched < size:
+            return
+        if remaining is not None:
+            remaining -= fetched
+
+
 class Movie:
-    def __init__(self, id, title, description, release_date, director, genre_id, likes, cover):
+    __slots__ = ('id', 'title', 'description', 'release_date', 'director', 'genre_id', 'likes', 'cover', 'genre_name')
+
+    SUMMARY_FIELDS = ('id', 'title', 'release_date', 'director', 'genre_id', 'likes', 'genre_name')
+
+    def __init__(self, id, title, description, release_date, director, genre_id, likes, cover, genre_name=None):
         self.id = id
         self.title = title
         self.description = description
@@ -16,14 +76,40 @@ class Movie:
         self.genre_id = genre_id
         self.likes = likes
         self.cover = cover
+        self.genre_name = genre_name
+
+    def __repr__(self):
+        return f"Movie(id={self.id!r}, title={self.title!r})"
+
+    def copy(self):
+        """
+        Return a new record with the same field values, e.g. to hand out a cached one.
+
+        Returns:
+            Movie: The copy.
+        """
+        return Movie(*(getattr(self, field) for field in self.__slots__))
+
+    def as_dict(self, fields=__slots__):
+        """
+        Convert the record to a plain dictionary, e.g. for JSON output.
+
+        Args:
+            fields (tuple, optional): The fields to include. Defaults to every field.
+
+        Returns:
+            dict: The field values by name.
+        """
+        return {field: getattr(self, field) for field in fields}
 
     @staticmethod
-    def validate_date(date_text):
+    def validate_date(date_text, verbose=True):
         """
         Validate the format of the given date string.
 
         Args:
             date_text (str): The date string to be validated.
+            verbose (bool, optional): Whether to print a hint when the format is wrong. Defaults to True.
 
         Returns:
             str or None: The validated date string in 'YYYY-MM-DD' format if valid, otherwise None.
@@ -32,7 +118,8 @@ class Movie:
             datetime.datetime.strptime(date_text, '%Y-%m-%d')
             return date_text
         except ValueError:
-            print("Incorrect date format, try again with the following one: YYYY-MM-DD")
+            if verbose:
+                print("Incorrect date format, try again with the following one: YYYY-MM-DD")
             return None
 
     @staticmethod
@@ -59,19 +146,27 @@ class Movie:
             return None
 
         try:
-            if Movie.movie_exists(title, release_date, director):
-                print("Movie already exists in the database.")
-                return None
+            # The duplicate check runs under the write lock, so two processes cannot both pass it.
+            with transaction() as conn:
+                if Movie.movie_exists(title, release_date, director):
+                    print("Movie already exists in the database.")
+                    return None
 
-            with get_db_connection() as conn:
                 conn.execute(
-                    'INSERT INTO Movies (title, description, release_date, director, genre_id, likes) VALUES (?, ?, '
-                    '?, ?,'
-                    '?, 0)',
-                    (title, description, release_date, director, genre_id)
+                    'INSERT INTO Movies (title, description, release_date, release_day, director, genre_id, likes) '
+                    'VALUES (?, ?, ?, ?, ?, ?, 0)',
+                    (title, description, release_date, release_day(release_date), director, genre_id)
                 )
                 movie_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
-                return movie_id
+
+                # Inside a batch or a group commit the insert may still be rolled back, so the movie only
+                # goes into the similarity index once the outermost transaction has committed.
+                from Helpers.similarity import index_new_movie
+
+                genre_name = Genre.get_name_by_id(genre_id)
+                call_after_commit(conn, lambda: index_new_movie(conn, movie_id, title, description, director,
+                                                                genre_name))
+            return movie_id
         except sqlite3.IntegrityError as e:
             print(f"IntegrityError occurred: {e}")
             return None
@@ -79,6 +174,27 @@ class Movie:
             print(f"An error occurred: {e}")
             return None
 
+    @staticmethod
+    def add_batch(movies):
+        """
+        Insert many movies with a single executemany, skipping ones that already exist.
+
+        The caller is expected to have validated the rows and to run this inside a transaction.
+
+        Args:
+            movies (list): Tuples of (title, description, release_date, director, genre_id, cover).
+
+        Returns:
+            int: The number of movies actually inserted.
+        """
+        conn = get_db_connection()
+        cursor = conn.executemany(
+            'INSERT OR IGNORE INTO Movies (title, description, release_date, director, genre_id, likes, cover, '
+            'release_day) VALUES (?, ?, ?, ?, ?, 0, ?, ?)',
+            [(*movie, release_day(movie[2])) for movie in movies]
+        )
+        return cursor.rowcount
+
     @staticmethod
     def movie_exists(title, release_date, director):
         """
@@ -107,29 +223,72 @@ class Movie:
 
         Args:
             movie_id (int): The ID of the movie to mark as favorite.
+
+        Returns:
+            bool: True if the movie exists and was liked, otherwise False.
         """
-        if not Movie.get_by_id(movie_id):
+        if not Movie.favourite_movies([movie_id])[movie_id]:
             print(f"Movie with ID {movie_id} does not exist.")
-            return
-        with get_db_connection() as conn:
-            conn.execute('UPDATE Movies SET likes = likes + 1 WHERE id = ?', (movie_id,))
+            return False
+        return True
 
     @staticmethod
-    def get_all():
+    def favourite_movies(movie_ids):
         """
-        Retrieve all movies from the database.
+        Apply a burst of likes in one transaction, combining repeated IDs into a single increment per movie.
+
+        Existence is checked with chunked IN queries and the increments are applied with one executemany,
+        so the cost does not depend on how often each ID repeats.
+
+        Args:
+            movie_ids (iterable): The IDs of the liked movies, with one entry per like.
 
         Returns:
-            list: A list of dictionaries representing all movies, each dictionary containing movie details.
+            dict: Maps every distinct movie ID to True if it was liked, or False if it does not exist.
         """
-        with get_db_connection() as conn:
-            return conn.execute('''
-                SELECT m.*, g.name as genre_name
-                FROM Movies m
-                LEFT JOIN Genres g ON m.genre_id = g.id
-            ''').fetchall()
+        likes = Counter(movie_ids)
+        distinct_ids = list(likes)
+        existing_ids = set()
+        with transaction() as conn:
+            for start in range(0, len(distinct_ids), LIKE_LOOKUP_CHUNK_SIZE):
+                chunk = distinct_ids[start:start + LIKE_LOOKUP_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                existing_ids.update(row['id'] for row in conn.execute(
+                    f'SELECT id FROM Movies WHERE id IN ({placeholders})', chunk))
+
+            conn.executemany('UPDATE Movies SET likes = likes + ? WHERE id = ?',
+                             [(likes[movie_id], movie_id) for movie_id in distinct_ids if movie_id in existing_ids])
+
+        return {movie_id: movie_id in existing_ids for movie_id in distinct_ids}
 
     @staticmethod
+    def get_all(after_id=0, limit=None, page_size=MOVIE_PAGE_SIZE, summary=False):
+        """
+        Iterate over all movies in ID order, fetching them lazily one page at a time.
+
+        Pages are selected with keyset pagination on the ID, so every page costs the same no matter
+        how deep into the table it is.
+
+        Args:
+            after_id (int, optional): Only return movies with a greater ID (default is 0, from the start).
+            limit (int, optional): Maximum number of movies to retrieve (default is no limit).
+            page_size (int, optional): Number of movies fetched per query (default is MOVIE_PAGE_SIZE).
+            summary (bool, optional): Leave out the description and cover (default is False).
+
+        Returns:
+            iterator: The Movie records, read lazily.
+
+        Raises:
+            ValueError: If page_size is below 1 or limit is negative.
+        """
+        if page_size < 1:
+            raise ValueError(f"page_size must be at least 1, not {page_size}")
+        if limit is not None and limit < 0:
+            raise ValueError(f"limit must be 0 or more, not {limit}")
+        return _page_movies(get_db_connection(), after_id, limit, page_size, summary)
+
+    @staticmethod
+    @cached_read
     def get_by_id(movie_id):
         """
         Retrieve a movie from the database by its ID.
@@ -138,97 +297,295 @@ class Movie:
             movie_id (int): The ID of the movie to retrieve.
 
         Returns:
-            dict or None: A dictionary containing movie details if found, otherwise None.
+            Movie or None: The movie record with all its details if found, otherwise None.
         """
         with get_db_connection() as conn:
-            return conn.execute('''
-                SELECT m.*, g.name as genre_name
+            return _query_movies(conn, '''
+                SELECT {columns}
                 FROM Movies m
                 LEFT JOIN Genres g ON m.genre_id = g.id
                 WHERE m.id = ?
             ''', (movie_id,)).fetchone()
 
     @staticmethod
-    def search_by_title(query):
+    @cached_read
+    def search_by_title(query, field='title', limit=None, summary=False):
         """
-        Search movies in the database by title.
+        Search movies in the database using the full-text index, best matches first.
 
         Args:
-            query (str): The search query for movie titles.
+            query (str): The search query; quoted parts match as phrases, other words as prefixes.
+            field (str, optional): The field to search in, or 'all' (default is 'title').
+            limit (int, optional): Maximum number of movies to retrieve (default is no limit).
+            summary (bool, optional): Leave out the description and cover (default is False).
 
         Returns:
-            list: A list of dictionaries representing movies that match the search query.
+            sqlite3.Cursor: A lazy iterator over Movie records of movies that match the search query,
+                or an empty list if the query holds no searchable terms.
         """
+        match_expression = build_match_expression(query, field)
+        if match_expression is None:
+            return []
+
         with get_db_connection() as conn:
-            return conn.execute('''
-                SELECT m.*, g.name as genre_name
+            return _query_movies(conn, f'''
+                SELECT {{columns}}
+                FROM MoviesFts
+                JOIN Movies m ON m.id = MoviesFts.rowid
+                LEFT JOIN Genres g ON m.genre_id = g.id
+                WHERE MoviesFts MATCH ?
+                ORDER BY bm25(MoviesFts, {', '.join(map(str, SEARCH_FIELD_WEIGHTS))})
+                LIMIT ?
+            ''', (match_expression, -1 if limit is None else limit), summary)
+
+    @staticmethod
+    @cached_read
+    def fuzzy_search_by_title(query, limit=FUZZY_RESULT_LIMIT, summary=False):
+        """
+        Search movie titles tolerantly of typos, most similar titles first.
+
+        Candidates come from the MoviesTitleTrigrams index: the query's rarest trigrams, going by
+        MoviesTitleTrigramCounts, are looked up until about FUZZY_MAX_POSTINGS index entries are read,
+        and the FUZZY_CANDIDATES titles sharing the most of them are ranked by trigram similarity to the
+        whole query, ties broken by edit distance. Only the returned movies are read in full. The cost
+        depends on FUZZY_MAX_POSTINGS, not on the size of the catalog.
+
+        Args:
+            query (str): The title as typed by the user, typos included.
+            limit (int, optional): Maximum number of movies to retrieve (default is FUZZY_RESULT_LIMIT).
+            summary (bool, optional): Leave out the description and cover (default is False).
+
+        Returns:
+            list: Movie records with a similarity of at least FUZZY_MIN_SIMILARITY, or an empty list
+                if the query is shorter than three characters.
+        """
+        query_trigrams = title_trigrams(query)
+        if not query_trigrams:
+            return []
+
+        with get_db_connection() as conn:
+            # The counts are keyed by SQL lower(), which only folds ASCII, so the query is folded the same way
+            # to look them up. The index matches the keys case-insensitively either way.
+            count_keys = title_trigrams(query, lower=False)
+            placeholders = ', '.join(['lower(?)'] * len(count_keys))
+            frequencies = conn.execute(f'''SELECT trigram, movies FROM MoviesTitleTrigramCounts
+                                          WHERE trigram IN ({placeholders}) AND movies > 0''',
+                                       list(count_keys)).fetchall()
+
+            # Rare trigrams narrow the candidates the most for the least work, but a few are always looked up
+            # so a trigram that only the typo produced cannot decide the candidates on its own.
+            lookups = []
+            postings = 0
+            for trigram, movies in sorted(frequencies, key=lambda frequency: frequency[1]):
+                if len(lookups) >= FUZZY_MIN_LOOKUPS and postings + movies > FUZZY_MAX_POSTINGS:
+                    break
+                lookups.append(trigram)
+                postings += movies
+            if not lookups:
+                return []
+
+            matches = ' UNION ALL '.join(
+                ['SELECT movie_id FROM (SELECT rowid AS movie_id FROM MoviesTitleTrigrams '
+                 'WHERE MoviesTitleTrigrams MATCH ? LIMIT ?)'] * len(lookups))
+            # Past the budget, which only happens to reach FUZZY_MIN_LOOKUPS with common trigrams, every
+            # lookup reads just its share of it.
+            share = FUZZY_MAX_POSTINGS if postings <= FUZZY_MAX_POSTINGS else FUZZY_MAX_POSTINGS // len(lookups)
+            parameters = []
+            for trigram in lookups:
+                parameters += [build_trigram_match(trigram), share]
+            candidates = conn.execute(f'''
+                SELECT m.id, m.title
+                FROM (SELECT movie_id FROM ({matches}) GROUP BY movie_id ORDER BY COUNT(*) DESC LIMIT ?) c
+                JOIN Movies m ON m.id = c.movie_id
+            ''', parameters + [FUZZY_CANDIDATES]).fetchall()
+
+            scored = []
+            for movie_id, title in candidates:
+                similarity = trigram_similarity(query_trigrams, title_trigrams(title))
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    scored.append((similarity, movie_id, title))
+
+            # Edit distance is only computed to order the few best titles, where it is cheap.
+            best = heapq.nlargest(limit, scored, key=lambda entry: entry[0])
+            query_text = ' '.join(query.lower().split())
+            best.sort(key=lambda entry: (-entry[0], edit_distance(query_text, entry[2].lower()), entry[1]))
+            if not best:
+                return []
+
+            movies = {movie.id: movie for movie in _query_movies(conn, f'''
+                SELECT {{columns}}
                 FROM Movies m
                 LEFT JOIN Genres g ON m.genre_id = g.id
-                WHERE m.title LIKE ?
-            ''', ('%' + query + '%',)).fetchall()
+                WHERE m.id IN ({', '.join('?' * len(best))})
+            ''', [movie_id for _, movie_id, _ in best], summary)}
+            return [movies[movie_id] for _, movie_id, _ in best]
 
     @staticmethod
-    def get_top_liked(limit=5):
+    @cached_read
+    def get_top_liked(limit=5, summary=False):
         """
         Retrieve top movies by likes from the database.
 
+        Up to LEADERBOARD_SIZE movies are read from the trigger-maintained TopLikedMovies leaderboard
+        instead of sorting the Movies table.
+
         Args:
             limit (int): Maximum number of movies to retrieve (default is 5).
+            summary (bool, optional): Leave out the description and cover (default is False).
 
         Returns:
-            list: A list of dictionaries representing top liked movies.
+            sqlite3.Cursor: A lazy iterator over Movie records of top liked movies.
         """
         with get_db_connection() as conn:
-            return conn.execute('''
-                SELECT m.*, g.name as genre_name
+            if limit <= LEADERBOARD_SIZE:
+                return _query_movies(conn, '''
+                    SELECT {columns}
+                    FROM TopLikedMovies t
+                    JOIN Movies m ON m.id = t.movie_id
+                    LEFT JOIN Genres g ON m.genre_id = g.id
+                    ORDER BY t.likes DESC, t.movie_id
+                    LIMIT ?
+                ''', (limit,), summary)
+            return _query_movies(conn, '''
+                SELECT {columns}
                 FROM Movies m
                 LEFT JOIN Genres g ON m.genre_id = g.id
-                ORDER BY m.likes DESC
+                ORDER BY m.likes DESC, m.id
                 LIMIT ?
-            ''', (limit,)).fetchall()
+            ''', (limit,), summary)
 
     @staticmethod
-    def get_newest(limit=5):
+    @cached_read
+    def get_newest(limit=5, summary=False):
         """
         Retrieve newest movies from the database.
 
         Args:
             limit (int): Maximum number of movies to retrieve (default is 5).
+            summary (bool, optional): Leave out the description and cover (default is False).
 
         Returns:
-            list: A list of dictionaries representing newest movies.
+            sqlite3.Cursor: A lazy iterator over Movie records of newest movies.
         """
         with get_db_connection() as conn:
-            return conn.execute('''
-                SELECT m.*, g.name as genre_name
+            return _query_movies(conn, '''
+                SELECT {columns}
                 FROM Movies m
                 LEFT JOIN Genres g ON m.genre_id = g.id
-                ORDER BY date(m.release_date) DESC
+                ORDER BY m.release_day DESC, m.id DESC
                 LIMIT ?
-            ''', (limit,)).fetchall()
+            ''', (limit,), summary)
 
     @staticmethod
-    def get_by_genre(genre_name, limit=5):
+    @cached_read
+    def get_by_release_date(start_date=None, end_date=None, limit=RELEASE_RANGE_LIMIT, summary=False):
         """
-        Retrieve movies by genre from the database.
+        Retrieve the movies released between two dates, oldest first.
+
+        The dates are converted to day numbers, so the query is a range scan of the release_day index.
+
+        Args:
+            start_date (str, optional): The first release date to include, in 'YYYY-MM-DD' format.
+                Defaults to no lower bound.
+            end_date (str, optional): The last release date to include, in 'YYYY-MM-DD' format.
+                Defaults to no upper bound.
+            limit (int): Maximum number of movies to retrieve (default is RELEASE_RANGE_LIMIT).
+            summary (bool, optional): Leave out the description and cover (default is False).
+
+        Returns:
+            sqlite3.Cursor or list: A lazy iterator over Movie records, or an empty list if a date is not valid.
+        """
+        first_day = MIN_RELEASE_DAY if start_date is None else release_day(Movie.validate_date(start_date))
+        last_day = MAX_RELEASE_DAY if end_date is None else release_day(Movie.validate_date(end_date))
+        if first_day is None or last_day is None:
+            return []
+
+        with get_db_connection() as conn:
+            return _query_movies(conn, '''
+                SELECT {columns}
+                FROM Movies m
+                LEFT JOIN Genres g ON m.genre_id = g.id
+                WHERE m.release_day BETWEEN ? AND ?
+                ORDER BY m.release_day, m.id
+                LIMIT ?
+            ''', (first_day, last_day, limit), summary)
+
+    @staticmethod
+    @cached_read
+    def get_by_genre(genre_name, limit=5, summary=False):
+        """
+        Retrieve the most liked movies of a genre from the database.
+
+        Up to LEADERBOARD_SIZE movies are read from the trigger-maintained GenreTopLikedMovies leaderboard.
 
         Args:
             genre_name (str): The name of the genre to filter movies.
             limit (int): Maximum number of movies to retrieve (default is 5).
+            summary (bool, optional): Leave out the description and cover (default is False).
 
         Returns:
-            list: A list of dictionaries representing movies of the specified genre.
+            sqlite3.Cursor: A lazy iterator over Movie records of movies of the specified genre.
         """
+        genre_id = Genre.get_id_by_name(genre_name)
+        if genre_id is None:
+            return []
+
         with get_db_connection() as conn:
-            genre_name = genre_name.lower()
-            return conn.execute('''
-                SELECT m.*, g.name as genre_name
+            if limit <= LEADERBOARD_SIZE:
+                return _query_movies(conn, '''
+                    SELECT {columns}
+                    FROM GenreTopLikedMovies t
+                    JOIN Movies m ON m.id = t.movie_id
+                    LEFT JOIN Genres g ON m.genre_id = g.id
+                    WHERE t.genre_id = ?
+                    ORDER BY t.likes DESC, t.movie_id
+                    LIMIT ?
+                ''', (genre_id, limit), summary)
+            return _query_movies(conn, '''
+                SELECT {columns}
                 FROM Movies m
                 LEFT JOIN Genres g ON m.genre_id = g.id
-                WHERE g.name = ?
-                ORDER BY m.likes DESC
+                WHERE m.genre_id = ?
+                ORDER BY m.likes DESC, m.id
                 LIMIT ?
-            ''', (genre_name, limit)).fetchall()
+            ''', (genre_id, limit), summary)
+
+    @staticmethod
+    def get_similar(movie_id, limit=SIMILARITY_RESULT_LIMIT, summary=False):
+        """
+        Retrieve the movies most similar to a movie by description, title, director and genre.
+
+        Movies are compared by the cosine similarity of their TF-IDF vectors, read from the similarity
+        index next to the database. The index is built on first use and needs numpy.
+
+        Args:
+            movie_id (int): The ID of the movie to compare with.
+            limit (int): Maximum number of movies to retrieve (default is SIMILARITY_RESULT_LIMIT).
+            summary (bool, optional): Leave out the description and cover (default is False).
+
+        Returns:
+            list or None: Movie records, most similar first, or None if the movie does not exist.
+        """
+        from Helpers.similarity import MOVIE_TERMS_SQL, get_similarity_index, movie_terms
+
+        conn = get_db_connection()
+        row = conn.execute(MOVIE_TERMS_SQL + ' WHERE m.id = ?', (movie_id,)).fetchone()
+        if row is None:
+            return None
+        index = get_similarity_index(conn)
+        if index is None:
+            return []
+
+        ranked = index.search(movie_terms(*row[1:]), limit, exclude=movie_id)
+        if not ranked:
+            return []
+        movies = {movie.id: movie for movie in _query_movies(conn, f'''
+            SELECT {{columns}}
+            FROM Movies m
+            LEFT JOIN Genres g ON m.genre_id = g.id
+            WHERE m.id IN ({', '.join('?' * len(ranked))})
+        ''', [movie_id for _, movie_id in ranked], summary)}
+        return [movies[movie_id] for _, movie_id in ranked if movie_id in movies]
 
     @staticmethod
     def add_movie_cover_url(movie_id, image_url):
@@ -243,11 +600,16 @@ class Movie:
             bool: True if the cover image was successfully updated, otherwise False.
         """
         try:
-            with get_db_connection() as conn:
+            with transaction() as conn:
+                previous = conn.execute('SELECT cover FROM Movies WHERE id = ?', (movie_id,)).fetchone()
                 result = conn.execute('UPDATE Movies SET cover = ? WHERE id = ?', (image_url, movie_id))
                 if result.rowcount == 0:
                     return False
-                return True
+
+            if previous['cover'] and previous['cover'] != image_url:
+                from Helpers.cover_cache import invalidate_cover
+                invalidate_cover(previous['cover'])
+            return True
         except sqlite3.IntegrityError as e:
             print(f"IntegrityError occurred: {e}")
             return None
@@ -255,6 +617,73 @@ class Movie:
             print(f"An error occurred: {e}")
             return False
 
+    @staticmethod
+    def get_covers():
+        """
+        Retrieve every distinct cover URL, with the ID of the first movie that uses it.
+
+        SQLite groups the URLs, so callers need not remember the ones they have seen.
+
+        Returns:
+            sqlite3.Cursor: A lazy iterator over (id, cover) rows, one per URL.
+        """
+        conn = get_db_connection()
+        return conn.execute('SELECT MIN(id), cover FROM Movies WHERE cover IS NOT NULL GROUP BY cover')
+
+    @staticmethod
+    @cached_read
+    def count_covers():
+        """
+        Count the distinct cover URLs, which is how many downloads a prefetch of every cover makes.
+
+        Returns:
+            int: The number of distinct cover URLs.
+        """
+        conn = get_db_connection()
+        return conn.execute('SELECT COUNT(DISTINCT cover) FROM Movies').fetchone()[0]
+
+    @staticmethod
+    @cached_read
+    def get_stats(by='genre', sort='movies', limit=None):
+        """
+        Read the number of movies and the total likes of every genre, release year or director.
+
+        The counts come from summary tables that triggers keep up to date, so this reads one row per group
+        instead of scanning the Movies table.
+
+        Args:
+            by (str, optional): 'genre', 'year' or 'director'. Defaults to 'genre'.
+            sort (str, optional): 'movies' or 'likes' for the largest groups first, or 'name' to sort by the
+                group itself. Defaults to 'movies'.
+            limit (int, optional): The maximum number of groups to return. Defaults to all of them.
+
+        Returns:
+            list: One dict per group, with the group under the `by` key, e.g.
+                {'genre': 'drama', 'movies': 1856, 'likes': 91587}.
+        """
+        if by not in STATS_QUERIES or sort not in STATS_SORTS:
+            raise ValueError(f"Unknown statistics: {by} by {sort}")
+        order = by if sort == 'name' else f'{sort} DESC, {by}'
+        conn = get_db_connection()
+        if limit is None:
+            rows = conn.execute(f'{STATS_QUERIES[by]} ORDER BY {order}')
+        else:
+            rows = conn.execute(f'{STATS_QUERIES[by]} ORDER BY {order} LIMIT ?', (limit,))
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    @cached_read
+    def get_stats_totals():
+        """
+        Count all movies and likes in the catalog from the genre statistics.
+
+        Returns:
+            dict: The total 'movies' and 'likes'.
+        """
+        row = get_db_connection().execute('SELECT COALESCE(SUM(movies), 0), COALESCE(SUM(likes), 0) '
+                                          'FROM GenreStats').fetchone()
+        return {'movies': row[0], 'likes': row[1]}
+
     @staticmethod
     def get_movie_cover(movie_id):
         """
@@ -272,6 +701,8 @@ class Movie:
                 print(f"Movie with ID {movie_id} does not exist.")
                 return None
             if result['cover']:
+                # The cover stack pulls in requests and Pillow, so only load it when a cover is viewed.
+                from Helpers.movie_cover import get_movie_cover_from_url
                 return get_movie_cover_from_url(result['cover'])
             else:
                 return None
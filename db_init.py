@@ -1,34 +1,337 @@
+import atexit
+import os
+import queue
+import random
 import sqlite3
-from Helpers.constants import DB_NAME, PREDEFINED_GENRES
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from db_migrations import migrate
+from Helpers.constants import (DB_NAME, DB_BUSY_TIMEOUT, DB_CACHED_STATEMENTS, DB_PRAGMAS, DB_WRITE_RETRIES,
+                               DB_WRITE_RETRY_DELAY, DB_WRITE_RETRY_MAX_DELAY, GROUP_COMMIT_MAX_CALLS,
+                               GROUP_COMMIT_WINDOW)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    A connection that can hold one long write transaction across many model calls.
+
+    While a transaction() is open on it, `with conn:` blocks become savepoints instead of committing,
+    so a batch of commands is written in a single commit. Callbacks queued with call_after_commit()
+    run once that commit happens, and are dropped with the savepoint or transaction they were queued in.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transaction_depth = 0
+        self.after_commit = []
+        self._block_marks = []
+
+    def __enter__(self):
+        if self.transaction_depth:
+            self.execute('SAVEPOINT block')
+            self._block_marks.append(len(self.after_commit))
+        return super().__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.transaction_depth:
+            return super().__exit__(exc_type, exc_value, traceback)
+        mark = self._block_marks.pop()
+        if exc_type is not None:
+            self.execute('ROLLBACK TO block')
+            del self.after_commit[mark:]
+        self.execute('RELEASE block')
+        return False
+
+
+class ConnectionManager:
+    """
+    Hand out one tuned SQLite connection per thread and process and reuse it across model calls.
+
+    A read-only manager opens its connections with mode=ro, so they can never take the write lock.
+    """
+
+    # Swapped for an instrumented subclass of PooledConnection while profiling.
+    connection_factory = PooledConnection
+
+    def __init__(self, database=DB_NAME, read_only=False):
+        self.database = database
+        self.read_only = read_only
+        self.opened = 0
+        self.reused = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def get_connection(self):
+        """
+        Return the connection owned by the calling thread, opening it on first use.
+
+        Returns:
+            sqlite3.Connection: A connection with the tuning pragmas already applied.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            with self._lock:
+                self.reused += 1
+            return conn
+
+        conn = self._open()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _open(self):
+        if self.read_only:
+            conn = sqlite3.connect(f'file:{self.database}?mode=ro', uri=True, timeout=DB_BUSY_TIMEOUT,
+                                   cached_statements=DB_CACHED_STATEMENTS, check_same_thread=False,
+                                   factory=self.connection_factory)
+        else:
+            conn = sqlite3.connect(self.database, timeout=DB_BUSY_TIMEOUT, cached_statements=DB_CACHED_STATEMENTS,
+                                   check_same_thread=False, factory=self.connection_factory)
+        conn.row_factory = sqlite3.Row
+        for pragma, value in DB_PRAGMAS.items():
+            # The journal mode is stored in the database file, so only a writer can change it.
+            if not (self.read_only and pragma == 'journal_mode'):
+                conn.execute(f'PRAGMA {pragma} = {value}')
+
+        with self._lock:
+            self.opened += 1
+            self._connections.append(conn)
+        return conn
+
+    def get_stats(self):
+        """
+        Report how often connections were opened versus handed out again.
+
+        Returns:
+            dict: The 'opened' and 'reused' counters.
+        """
+        with self._lock:
+            return {'opened': self.opened, 'reused': self.reused}
+
+    def close_all(self):
+        """
+        Close every connection opened by this process and forget the per-thread ones.
+        """
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+connection_manager = ConnectionManager()
+atexit.register(connection_manager.close_all)
+
+_thread_binding = threading.local()
+
+
+def bind_connection_manager(manager):
+    """
+    Make get_db_connection() on the calling thread use another manager, e.g. a read-only one on server workers.
+
+    Args:
+        manager (ConnectionManager or None): The manager to use, or None for the default one.
+    """
+    _thread_binding.manager = manager
 
 
 def get_db_connection():
-    db_connection = sqlite3.connect(DB_NAME)
-    db_connection.row_factory = sqlite3.Row
-    return db_connection
+    manager = getattr(_thread_binding, 'manager', None) or connection_manager
+    return manager.get_connection()
 
 
-def init_db():
+def begin_immediate(conn, retries=DB_WRITE_RETRIES):
+    """
+    Take the write lock on a connection, retrying while other processes hold it.
+
+    SQLite's busy timeout already waits inside every attempt, but it gives up early in some cases, e.g.
+    while another connection recovers the WAL, and many processes that time out together would all
+    retry at once. Failed attempts are therefore retried after a random delay (full jitter) that doubles
+    up to DB_WRITE_RETRY_MAX_DELAY.
+
+    Args:
+        conn (sqlite3.Connection): A connection with no open transaction.
+        retries (int, optional): How many attempts to make. Defaults to DB_WRITE_RETRIES.
+
+    Raises:
+        sqlite3.OperationalError: If the database is still locked after the last attempt.
+    """
+    delay = DB_WRITE_RETRY_DELAY
+    for attempt in range(retries):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            return
+        except sqlite3.OperationalError as e:
+            if 'database is locked' not in str(e) or attempt == retries - 1:
+                raise
+        time.sleep(random.uniform(0, delay))
+        delay = min(delay * 2, DB_WRITE_RETRY_MAX_DELAY)
+
+
+@contextmanager
+def transaction():
+    """
+    Run the enclosed block in one explicit write transaction on the calling thread's connection.
+
+    The write lock is taken up front (BEGIN IMMEDIATE, see begin_immediate), so a block that reads
+    before it writes cannot fail halfway when another connection commits in between. Nested calls open
+    a savepoint inside the outer transaction, which only commits when the outermost block ends.
+
+    Yields:
+        sqlite3.Connection: The connection the transaction is open on.
+    """
     conn = get_db_connection()
-    conn.execute('''CREATE TABLE IF NOT EXISTS Movies (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL CHECK(LENGTH(title) <= 100),
-                        description TEXT NOT NULL CHECK(LENGTH(description) <= 500),
-                        release_date DATE NOT NULL,
-                        director TEXT NOT NULL CHECK(LENGTH(director) <= 50),
-                        genre_id INTEGER NOT NULL,
-                        likes INTEGER DEFAULT 0,
-                        cover TEXT CHECK(LENGTH(cover) <= 500),
-                        FOREIGN KEY (genre_id) REFERENCES Genres(id)
-                    )''')
-    conn.execute('''CREATE TABLE IF NOT EXISTS Genres (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL UNIQUE CHECK(LENGTH(name) <= 50)
-                    )''')
-
-    for genre in PREDEFINED_GENRES:
-        lowercase_genre = genre.lower()
-        conn.execute('INSERT OR IGNORE INTO Genres (name) VALUES (?)', (lowercase_genre,))
-
-    conn.commit()
-    conn.close()
+    mark = len(conn.after_commit)
+    if conn.transaction_depth:
+        conn.execute('SAVEPOINT nested')
+    else:
+        begin_immediate(conn)
+    conn.transaction_depth += 1
+    try:
+        yield conn
+    except BaseException:
+        conn.transaction_depth -= 1
+        del conn.after_commit[mark:]
+        if conn.transaction_depth:
+            conn.execute('ROLLBACK TO nested')
+            conn.execute('RELEASE nested')
+        else:
+            conn.rollback()
+        raise
+    else:
+        conn.transaction_depth -= 1
+        if conn.transaction_depth:
+            conn.execute('RELEASE nested')
+        else:
+            conn.commit()
+            callbacks, conn.after_commit = conn.after_commit, []
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    # The block's writes are committed by now, so the failure must not surface as if they
+                    # were not, e.g. on the futures of a GroupCommitWriter, nor stop the callbacks after it.
+                    print(f"An after-commit callback failed: {e}", file=sys.stderr)
+
+
+def call_after_commit(conn, callback):
+    """
+    Run a callback once the transaction() open on a connection commits, e.g. to update a file kept next to
+    the database. If the enclosing savepoint or transaction is rolled back instead, the callback is dropped.
+
+    Callbacks run after the commit, when the write they follow is already durable, so transaction() reports a
+    callback that raises on stderr instead of raising it.
+
+    Args:
+        conn (sqlite3.Connection): The connection the write was made on.
+        callback (callable): Called with no arguments; at once if no transaction() is open on conn.
+    """
+    if conn.transaction_depth:
+        conn.after_commit.append(callback)
+    else:
+        callback()
+
+
+class GroupCommitWriter:
+    """
+    Run write calls on one thread and commit the calls that arrive close together in a single transaction.
+
+    Once a call is waiting, the writer keeps collecting calls for up to `window` seconds (or until it has
+    `max_calls`), then runs them all inside one transaction, each in its own savepoint: a call that raises
+    is rolled back on its own while the others still commit. Results are only handed back after the
+    commit, so a caller never sees a write that could still be rolled back. With a window of 0, the calls
+    that queued up while the previous transaction ran are still committed together.
+    """
+
+    def __init__(self, window=GROUP_COMMIT_WINDOW, max_calls=GROUP_COMMIT_MAX_CALLS, manager=None):
+        self.window = window
+        self.max_calls = max_calls
+        self.manager = manager
+        self.calls = 0
+        self.commits = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, function, *args):
+        """
+        Queue a write call.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the call's result once its transaction has committed.
+        """
+        from concurrent.futures import Future
+
+        future = Future()
+        self._queue.put((future, function, args))
+        return future
+
+    def _run(self):
+        bind_connection_manager(self.manager)
+        stopping = False
+        while not stopping:
+            call = self._queue.get()
+            if call is None:
+                break
+            calls = [call]
+            deadline = time.monotonic() + self.window
+            while len(calls) < self.max_calls:
+                try:
+                    call = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if call is None:
+                    stopping = True
+                    break
+                calls.append(call)
+            self._commit([call for call in calls if call[0].set_running_or_notify_cancel()])
+
+    def _commit(self, calls):
+        if not calls:
+            return
+        outcomes = []
+        try:
+            with transaction():
+                for future, function, args in calls:
+                    try:
+                        with transaction():
+                            outcomes.append((future, function(*args), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:
+            for future, _, _ in calls:
+                future.set_exception(e)
+            return
+
+        self.calls += len(calls)
+        self.commits += 1
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def get_stats(self):
+        """
+        Report how many calls were committed in how many transactions.
+
+        Returns:
+            dict: The 'calls' and 'commits' counters.
+        """
+        return {'calls': self.calls, 'commits': self.commits}
+
+    def close(self):
+        """
+        Commit the calls already queued, then stop the writer thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+
+def init_db():
+    # Genres are seeded by a migration, so an up-to-date database costs a single PRAGMA read here.
+    migrate(get_db_connection())
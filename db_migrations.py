@@ -0,0 +1,631 @@
+import sys
+
+from Helpers.constants import LEADERBOARD_SIZE, MAX_TITLE_LENGTH, PREDEFINED_GENRES
+from Helpers.dates import release_day
+
+
+def create_base_schema(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS Movies (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        title TEXT NOT NULL CHECK(LENGTH(title) <= 100),
+                        description TEXT NOT NULL CHECK(LENGTH(description) <= 500),
+                        release_date DATE NOT NULL,
+                        director TEXT NOT NULL CHECK(LENGTH(director) <= 50),
+                        genre_id INTEGER NOT NULL,
+                        likes INTEGER DEFAULT 0,
+                        cover TEXT CHECK(LENGTH(cover) <= 500),
+                        FOREIGN KEY (genre_id) REFERENCES Genres(id)
+                    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS Genres (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT NOT NULL UNIQUE CHECK(LENGTH(name) <= 50)
+                    )''')
+
+
+def _same_movie(alias):
+    return (f'{alias}.title = Movies.title AND {alias}.release_date = Movies.release_date '
+            f'AND {alias}.director = Movies.director AND {alias}.id > Movies.id')
+
+
+def add_query_indexes(conn):
+    # Older databases relied on Movie.movie_exists alone, so fold any duplicates into the oldest row
+    # before the UNIQUE index is created. The oldest row keeps its own description and cover, and takes
+    # the first one its duplicates have where it has none.
+    conn.execute(f'''
+        UPDATE Movies SET
+            likes = likes + (SELECT COALESCE(SUM(d.likes), 0) FROM Movies d WHERE {_same_movie('d')}),
+            description = COALESCE(NULLIF(description, ''), (
+                SELECT d.description FROM Movies d WHERE {_same_movie('d')} AND d.description != ''
+                ORDER BY d.id LIMIT 1
+            ), description),
+            cover = COALESCE(cover, (
+                SELECT d.cover FROM Movies d WHERE {_same_movie('d')} AND d.cover IS NOT NULL ORDER BY d.id LIMIT 1
+            ))
+        WHERE id IN (
+            SELECT MIN(id) FROM Movies GROUP BY title, release_date, director HAVING COUNT(*) > 1
+        )
+    ''')
+    removed = conn.execute('''
+        DELETE FROM Movies
+        WHERE id NOT IN (SELECT MIN(id) FROM Movies GROUP BY title, release_date, director)
+    ''').rowcount
+    if removed:
+        # On stderr, so the output of the command that triggered the upgrade stays parseable.
+        print(f"Merged {removed} duplicate movie(s) into their oldest entry.", file=sys.stderr)
+
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS idx_movies_title_release_director
+                    ON Movies (title, release_date, director)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_movies_likes ON Movies (likes DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_movies_genre_likes ON Movies (genre_id, likes DESC)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_movies_release_date ON Movies (release_date DESC)')
+
+
+def add_full_text_search(conn):
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS MoviesFts USING fts5(
+                        title, description, director, content='Movies', content_rowid='id'
+                    )''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON Movies BEGIN
+                        INSERT INTO MoviesFts (rowid, title, description, director)
+                        VALUES (new.id, new.title, new.description, new.director);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON Movies BEGIN
+                        INSERT INTO MoviesFts (MoviesFts, rowid, title, description, director)
+                        VALUES ('delete', old.id, old.title, old.description, old.director);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS movies_fts_update
+                    AFTER UPDATE OF title, description, director ON Movies BEGIN
+                        INSERT INTO MoviesFts (MoviesFts, rowid, title, description, director)
+                        VALUES ('delete', old.id, old.title, old.description, old.director);
+                        INSERT INTO MoviesFts (rowid, title, description, director)
+                        VALUES (new.id, new.title, new.description, new.director);
+                    END''')
+    rebuild_full_text_index(conn)
+
+
+# Titles with a character outside ASCII, the only ones the trigram tokenizer and lower() can fold differently.
+NON_ASCII_GLOB = '*[^\x01-\x7f]*'
+
+
+def _count_title_trigrams(title, change):
+    # Splits a title into its distinct lower-case trigrams with the TitleTrigramPositions numbers table,
+    # since trigger bodies cannot use a recursive CTE. lower() only folds ASCII, which is fine for counts
+    # that only decide which trigrams a fuzzy search looks up first, as long as every path keys them the same.
+    return f'''
+        INSERT INTO MoviesTitleTrigramCounts (trigram, movies)
+        SELECT DISTINCT lower(substr({title}, position, 3)), {change} FROM TitleTrigramPositions
+        WHERE position <= length({title}) - 2
+        ON CONFLICT (trigram) DO UPDATE SET movies = movies + {change};
+    '''
+
+
+def _create_title_trigram_triggers(conn):
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS movies_title_trigrams_insert AFTER INSERT ON Movies BEGIN
+                        INSERT INTO MoviesTitleTrigrams (rowid, title) VALUES (new.id, new.title);
+                        {_count_title_trigrams('new.title', 1)}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS movies_title_trigrams_delete AFTER DELETE ON Movies BEGIN
+                        INSERT INTO MoviesTitleTrigrams (MoviesTitleTrigrams, rowid, title)
+                        VALUES ('delete', old.id, old.title);
+                        {_count_title_trigrams('old.title', -1)}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS movies_title_trigrams_update AFTER UPDATE OF title ON Movies BEGIN
+                        INSERT INTO MoviesTitleTrigrams (MoviesTitleTrigrams, rowid, title)
+                        VALUES ('delete', old.id, old.title);
+                        INSERT INTO MoviesTitleTrigrams (rowid, title) VALUES (new.id, new.title);
+                        {_count_title_trigrams('old.title', -1)}
+                        {_count_title_trigrams('new.title', 1)}
+                    END''')
+
+
+def add_title_trigram_index(conn):
+    # detail='none' keeps only which titles hold a trigram, which is all the fuzzy search looks up,
+    # at a fraction of the size of a full positional index.
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS MoviesTitleTrigrams USING fts5(
+                        title, content='Movies', content_rowid='id', tokenize='trigram', detail='none'
+                    )''')
+    # The number of titles holding every trigram, so a search can start from the rarest ones without
+    # walking the doclists of the common ones.
+    conn.execute('''CREATE TABLE IF NOT EXISTS MoviesTitleTrigramCounts (
+                        trigram TEXT PRIMARY KEY,
+                        movies INTEGER NOT NULL
+                    ) WITHOUT ROWID''')
+    conn.execute('CREATE TABLE IF NOT EXISTS TitleTrigramPositions (position INTEGER PRIMARY KEY)')
+    conn.executemany('INSERT OR IGNORE INTO TitleTrigramPositions (position) VALUES (?)',
+                     [(position,) for position in range(1, MAX_TITLE_LENGTH - 1)])
+    _create_title_trigram_triggers(conn)
+    rebuild_title_trigram_index(conn)
+
+
+def recount_title_trigrams(conn):
+    # The first rebuild keyed the counts by the index's terms, which the tokenizer folds for all of Unicode,
+    # while the triggers fold with lower(), so titles with non-ASCII capitals were counted under two keys.
+    for event in ('insert', 'delete', 'update'):
+        conn.execute(f'DROP TRIGGER IF EXISTS movies_title_trigrams_{event}')
+    _create_title_trigram_triggers(conn)
+    _rebuild_title_trigram_counts(conn)
+
+
+def seed_genres(conn):
+    # Changes to PREDEFINED_GENRES ship as a new migration that calls this again.
+    conn.executemany('INSERT OR IGNORE INTO Genres (name) VALUES (?)',
+                     [(genre.lower(),) for genre in PREDEFINED_GENRES])
+
+
+def _offer_to_leaderboards():
+    # Likes only ever grow through movfv, so a new or liked movie can only enter a board or move up in it:
+    # add it if it beats the current last entry, then drop the one entry that fell off.
+    return f'''
+        INSERT OR REPLACE INTO TopLikedMovies (movie_id, likes)
+        SELECT new.id, new.likes
+        WHERE (SELECT COUNT(*) FROM TopLikedMovies) < {LEADERBOARD_SIZE}
+            OR new.likes >= (SELECT MIN(likes) FROM TopLikedMovies);
+        DELETE FROM TopLikedMovies
+        WHERE (SELECT COUNT(*) FROM TopLikedMovies) > {LEADERBOARD_SIZE}
+            AND movie_id = (SELECT movie_id FROM TopLikedMovies ORDER BY likes, movie_id DESC LIMIT 1);
+        INSERT OR REPLACE INTO GenreTopLikedMovies (genre_id, movie_id, likes)
+        SELECT new.genre_id, new.id, new.likes
+        WHERE (SELECT COUNT(*) FROM GenreTopLikedMovies WHERE genre_id = new.genre_id) < {LEADERBOARD_SIZE}
+            OR new.likes >= (SELECT MIN(likes) FROM GenreTopLikedMovies WHERE genre_id = new.genre_id);
+        DELETE FROM GenreTopLikedMovies
+        WHERE genre_id = new.genre_id
+            AND (SELECT COUNT(*) FROM GenreTopLikedMovies WHERE genre_id = new.genre_id) > {LEADERBOARD_SIZE}
+            AND movie_id = (SELECT movie_id FROM GenreTopLikedMovies WHERE genre_id = new.genre_id
+                            ORDER BY likes, movie_id DESC LIMIT 1);
+    '''
+
+
+def _recompute_global_leaderboard():
+    return f'''
+        DELETE FROM TopLikedMovies;
+        INSERT INTO TopLikedMovies (movie_id, likes)
+        SELECT id, likes FROM Movies ORDER BY likes DESC, id LIMIT {LEADERBOARD_SIZE};
+    '''
+
+
+def _recompute_genre_leaderboard(genre_id):
+    return f'''
+        DELETE FROM GenreTopLikedMovies WHERE genre_id = {genre_id};
+        INSERT INTO GenreTopLikedMovies (genre_id, movie_id, likes)
+        SELECT genre_id, id, likes FROM Movies WHERE genre_id = {genre_id}
+        ORDER BY likes DESC, id LIMIT {LEADERBOARD_SIZE};
+    '''
+
+
+def add_leaderboards(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS TopLikedMovies (
+                        movie_id INTEGER PRIMARY KEY,
+                        likes INTEGER
+                    )''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_top_liked_movies_likes
+                    ON TopLikedMovies (likes DESC, movie_id)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS GenreTopLikedMovies (
+                        genre_id INTEGER NOT NULL,
+                        movie_id INTEGER NOT NULL,
+                        likes INTEGER,
+                        PRIMARY KEY (genre_id, movie_id)
+                    ) WITHOUT ROWID''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_genre_top_liked_movies_likes
+                    ON GenreTopLikedMovies (genre_id, likes DESC, movie_id)''')
+
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_insert AFTER INSERT ON Movies BEGIN
+                        {_offer_to_leaderboards()}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_like
+                    AFTER UPDATE OF likes ON Movies WHEN new.likes >= old.likes BEGIN
+                        {_offer_to_leaderboards()}
+                    END''')
+    # Anything that can push a listed movie down (fewer likes, a genre change or a delete) refills the
+    # affected boards from the likes indexes, which reads at most LEADERBOARD_SIZE rows per board.
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_unlike_global
+                    AFTER UPDATE OF likes ON Movies
+                    WHEN new.likes < old.likes AND old.id IN (SELECT movie_id FROM TopLikedMovies) BEGIN
+                        {_recompute_global_leaderboard()}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_unlike_genre
+                    AFTER UPDATE OF likes ON Movies
+                    WHEN new.likes < old.likes AND new.genre_id = old.genre_id
+                        AND old.id IN (SELECT movie_id FROM GenreTopLikedMovies WHERE genre_id = old.genre_id) BEGIN
+                        {_recompute_genre_leaderboard('old.genre_id')}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_genre_change
+                    AFTER UPDATE OF genre_id ON Movies WHEN new.genre_id IS NOT old.genre_id BEGIN
+                        {_recompute_genre_leaderboard('old.genre_id')}
+                        {_recompute_genre_leaderboard('new.genre_id')}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_delete_global
+                    AFTER DELETE ON Movies WHEN old.id IN (SELECT movie_id FROM TopLikedMovies) BEGIN
+                        {_recompute_global_leaderboard()}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS leaderboards_delete_genre
+                    AFTER DELETE ON Movies
+                    WHEN old.id IN (SELECT movie_id FROM GenreTopLikedMovies WHERE genre_id = old.genre_id) BEGIN
+                        {_recompute_genre_leaderboard('old.genre_id')}
+                    END''')
+    rebuild_leaderboards(conn)
+
+
+def add_catalog_version(conn):
+    # A random catalog ID tells databases apart in the shared on-disk result cache, and the version
+    # counts every row written to Movies or Genres, by any connection or process.
+    conn.execute('''CREATE TABLE IF NOT EXISTS CatalogVersion (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        catalog TEXT NOT NULL,
+                        version INTEGER NOT NULL
+                    )''')
+    conn.execute("INSERT OR IGNORE INTO CatalogVersion (id, catalog, version) VALUES (1, lower(hex(randomblob(8))), 0)")
+    for table in ('Movies', 'Genres'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            conn.execute(f'''CREATE TRIGGER IF NOT EXISTS {table.lower()}_catalog_version_{event.lower()}
+                            AFTER {event} ON {table} BEGIN
+                                UPDATE CatalogVersion SET version = version + 1 WHERE id = 1;
+                            END''')
+
+
+def _release_day_sql(date):
+    # The day number of a canonical 'YYYY-MM-DD' date in SQL, which is several times faster than calling into
+    # Python for every row, or NULL for anything else; release_day() in Helpers/dates.py handles those.
+    return f'''CASE WHEN date(julianday({date})) = {date}
+                  THEN CAST(julianday({date}) - 2440587.5 AS INTEGER) END'''
+
+
+def _backfill_release_days(conn, where=''):
+    conn.create_function('to_release_day', 1, release_day, deterministic=True)
+    conn.execute(f'''UPDATE Movies SET release_day = COALESCE({_release_day_sql('release_date')},
+                                                         to_release_day(release_date)) {where}''')
+
+
+def add_release_day(conn):
+    # The text release_date stays the source of truth; release_day holds the same date as days since
+    # 1970-01-01 so sorting by date and date ranges are served by an index. Movie.add and Movie.add_batch
+    # fill it in.
+    conn.execute('ALTER TABLE Movies ADD COLUMN release_day INTEGER')
+    _backfill_release_days(conn)
+    conn.execute('DROP INDEX IF EXISTS idx_movies_release_date')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_movies_release_day ON Movies (release_day)')
+
+
+def add_release_day_triggers(conn):
+    # Movie.add and Movie.add_batch still fill release_day in, which also covers dates Python accepts but
+    # SQL does not, such as 2000-1-5. The triggers fill it in for other clients: on insert when it was left
+    # out, and on an update of release_date that did not set it too. Movies they missed until now are
+    # backfilled.
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS movies_release_day_insert
+                    AFTER INSERT ON Movies WHEN new.release_day IS NULL BEGIN
+                        UPDATE Movies SET release_day = {_release_day_sql('new.release_date')} WHERE id = new.id;
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS movies_release_day_update
+                    AFTER UPDATE OF release_date ON Movies
+                    WHEN new.release_date IS NOT old.release_date AND new.release_day IS old.release_day BEGIN
+                        UPDATE Movies SET release_day = {_release_day_sql('new.release_date')} WHERE id = new.id;
+                    END''')
+    _backfill_release_days(conn, 'WHERE release_day IS NULL')
+
+
+def add_genres_version(conn):
+    # A counter of its own for the Genres table, so the in-memory genre map is not reloaded after every
+    # write to Movies, which bumps the catalog version.
+    conn.execute('ALTER TABLE CatalogVersion ADD COLUMN genres INTEGER NOT NULL DEFAULT 0')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS genres_version_{event.lower()} AFTER {event} ON Genres BEGIN
+                            UPDATE CatalogVersion SET genres = genres + 1 WHERE id = 1;
+                        END''')
+
+
+# The summary tables of movstats: (table, group column, column type, the group of a Movies row as SQL
+# with {row} standing for new or old).
+CATALOG_STATS_GROUPS = [
+    ('GenreStats', 'genre_id', 'INTEGER', '{row}.genre_id'),
+    ('YearStats', 'year', 'INTEGER', 'CAST(substr({row}.release_date, 1, 4) AS INTEGER)'),
+    ('DirectorStats', 'director', 'TEXT', '{row}.director'),
+]
+
+
+def _add_to_catalog_stats(row):
+    return '\n'.join(f'''INSERT INTO {table} ({column}, movies, likes)
+                         VALUES ({group.format(row=row)}, 1, COALESCE({row}.likes, 0))
+                         ON CONFLICT ({column}) DO UPDATE SET movies = movies + 1, likes = likes + excluded.likes;'''
+                     for table, column, _, group in CATALOG_STATS_GROUPS)
+
+
+def _remove_from_catalog_stats(row):
+    return '\n'.join(f'''UPDATE {table} SET movies = movies - 1, likes = likes - COALESCE({row}.likes, 0)
+                         WHERE {column} = {group.format(row=row)};
+                         DELETE FROM {table} WHERE {column} = {group.format(row=row)} AND movies <= 0;'''
+                     for table, column, _, group in CATALOG_STATS_GROUPS)
+
+
+def add_catalog_stats(conn):
+    # Movie counts and like totals per genre, release year and director, kept current by triggers so
+    # movstats reads one row per group instead of scanning Movies.
+    for table, column, column_type, _ in CATALOG_STATS_GROUPS:
+        conn.execute(f'''CREATE TABLE IF NOT EXISTS {table} (
+                            {column} {column_type} PRIMARY KEY,
+                            movies INTEGER NOT NULL,
+                            likes INTEGER NOT NULL
+                        ) WITHOUT ROWID''')
+
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS catalog_stats_insert AFTER INSERT ON Movies BEGIN
+                        {_add_to_catalog_stats('new')}
+                    END''')
+    # A like only changes the totals of the groups the movie is already in: three primary key updates.
+    like_updates = '\n'.join(f'''UPDATE {table} SET likes = likes + COALESCE(new.likes, 0) - COALESCE(old.likes, 0)
+                                 WHERE {column} = {group.format(row='new')};'''
+                             for table, column, _, group in CATALOG_STATS_GROUPS)
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS catalog_stats_like
+                    AFTER UPDATE OF likes ON Movies
+                    WHEN new.likes IS NOT old.likes AND new.genre_id IS old.genre_id
+                        AND new.release_date IS old.release_date AND new.director IS old.director BEGIN
+                        {like_updates}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS catalog_stats_move
+                    AFTER UPDATE OF genre_id, release_date, director ON Movies
+                    WHEN new.genre_id IS NOT old.genre_id OR new.release_date IS NOT old.release_date
+                        OR new.director IS NOT old.director BEGIN
+                        {_remove_from_catalog_stats('old')}
+                        {_add_to_catalog_stats('new')}
+                    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS catalog_stats_delete AFTER DELETE ON Movies BEGIN
+                        {_remove_from_catalog_stats('old')}
+                    END''')
+    rebuild_catalog_stats(conn)
+
+
+# Every schema change is appended here with the next version number; PRAGMA user_version records
+# the last one applied, so existing movies.db files are upgraded in place on the next launch.
+MIGRATIONS = [
+    (1, "Create the Movies and Genres tables", create_base_schema),
+    (2, "Index the duplicate check, likes, genre and release date queries", add_query_indexes),
+    (3, "Add the MoviesFts full-text index for movsrch", add_full_text_search),
+    (4, "Seed the predefined genres", seed_genres),
+    (5, "Add the trigger-maintained top liked leaderboards", add_leaderboards),
+    (6, "Add the MoviesTitleTrigrams index for movsrch --fuzzy", add_title_trigram_index),
+    (7, "Add the trigger-maintained CatalogVersion counter for the result cache", add_catalog_version),
+    (8, "Store release dates as day numbers in the indexed release_day column", add_release_day),
+    (9, "Add the trigger-maintained genre, year and director statistics for movstats", add_catalog_stats),
+    (10, "Recount title trigrams with the same lower() case folding as the count triggers", recount_title_trigrams),
+    (11, "Add the trigger-maintained Genres counter for the in-memory genre map", add_genres_version),
+    (12, "Fill in release_day with triggers on writes that leave it out", add_release_day_triggers),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Which query each index exists for, with sample parameters for EXPLAIN QUERY PLAN.
+INDEXED_QUERIES = [
+    ('idx_movies_title_release_director', 'Movie.movie_exists',
+     'SELECT id FROM Movies WHERE title = ? AND release_date = ? AND director = ?',
+     ('Inception', '2010-07-16', 'Christopher Nolan')),
+    ('idx_movies_likes', 'TopLikedMovies refill and Movie.get_top_liked beyond the leaderboard',
+     '''SELECT m.*, g.name as genre_name FROM Movies m LEFT JOIN Genres g ON m.genre_id = g.id
+        ORDER BY m.likes DESC, m.id LIMIT ?''',
+     (5,)),
+    ('idx_movies_genre_likes', 'GenreTopLikedMovies refill and Movie.get_by_genre beyond the leaderboard',
+     '''SELECT m.*, g.name as genre_name FROM Movies m LEFT JOIN Genres g ON m.genre_id = g.id
+        WHERE m.genre_id = ? ORDER BY m.likes DESC, m.id LIMIT ?''',
+     (1, 5)),
+    ('idx_top_liked_movies_likes', 'Movie.get_top_liked',
+     '''SELECT m.*, g.name as genre_name FROM TopLikedMovies t JOIN Movies m ON m.id = t.movie_id
+        LEFT JOIN Genres g ON m.genre_id = g.id ORDER BY t.likes DESC, t.movie_id LIMIT ?''',
+     (5,)),
+    ('idx_genre_top_liked_movies_likes', 'Movie.get_by_genre',
+     '''SELECT m.*, g.name as genre_name FROM GenreTopLikedMovies t JOIN Movies m ON m.id = t.movie_id
+        LEFT JOIN Genres g ON m.genre_id = g.id WHERE t.genre_id = ? ORDER BY t.likes DESC, t.movie_id LIMIT ?''',
+     (1, 5)),
+    ('idx_movies_release_day', 'Movie.get_newest',
+     '''SELECT m.*, g.name as genre_name FROM Movies m LEFT JOIN Genres g ON m.genre_id = g.id
+        ORDER BY m.release_day DESC, m.id DESC LIMIT ?''',
+     (5,)),
+    ('idx_movies_release_day', 'Movie.get_by_release_date',
+     '''SELECT m.*, g.name as genre_name FROM Movies m LEFT JOIN Genres g ON m.genre_id = g.id
+        WHERE m.release_day BETWEEN ? AND ? ORDER BY m.release_day, m.id LIMIT ?''',
+     (14610, 14974, 20)),
+]
+
+
+def get_schema_version(conn):
+    """
+    Read the schema version stored in the database header.
+
+    Args:
+        conn (sqlite3.Connection): The connection to inspect.
+
+    Returns:
+        int: The version of the last migration applied, 0 for a new database.
+    """
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Apply every migration newer than the stored schema version, each in its own transaction.
+
+    Args:
+        conn (sqlite3.Connection): The connection to upgrade.
+
+    Returns:
+        int: The schema version after upgrading.
+    """
+    current_version = get_schema_version(conn)
+    if current_version >= SCHEMA_VERSION:
+        return current_version
+
+    for version, description, apply in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have applied it while we waited for the write lock.
+            if version > get_schema_version(conn):
+                apply(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    return get_schema_version(conn)
+
+
+def rebuild_full_text_index(conn):
+    """
+    Rebuild the MoviesFts index from the current contents of the Movies table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to rebuild the index on.
+    """
+    conn.execute("INSERT INTO MoviesFts (MoviesFts) VALUES ('rebuild')")
+
+
+def rebuild_title_trigram_index(conn):
+    """
+    Rebuild the MoviesTitleTrigrams index and the trigram counts from the current titles in the Movies table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to rebuild the index on.
+    """
+    conn.execute("INSERT INTO MoviesTitleTrigrams (MoviesTitleTrigrams) VALUES ('rebuild')")
+    _rebuild_title_trigram_counts(conn)
+
+
+def _rebuild_title_trigram_counts(conn):
+    # The index already knows how many titles hold every trigram, which is much faster to read back
+    # than splitting every title again. Its terms are folded by the tokenizer, for all of Unicode, so they
+    # only match the lower() keys of the triggers for ASCII titles: titles with other characters are moved
+    # from the keys of a scratch index over just them to the keys the triggers count them under.
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS temp.MoviesTitleTrigramsVocab
+                    USING fts5vocab(main, MoviesTitleTrigrams, row)''')
+    conn.execute('''CREATE VIRTUAL TABLE temp.NonAsciiTitleTrigrams USING fts5(
+                        title, tokenize='trigram', detail='none'
+                    )''')
+    conn.execute('''INSERT INTO temp.NonAsciiTitleTrigrams (rowid, title)
+                    SELECT id, title FROM Movies WHERE title GLOB ?''', (NON_ASCII_GLOB,))
+    conn.execute('''CREATE VIRTUAL TABLE temp.NonAsciiTitleTrigramsVocab
+                    USING fts5vocab(temp, NonAsciiTitleTrigrams, row)''')
+    conn.execute('DELETE FROM MoviesTitleTrigramCounts')
+    conn.execute('''INSERT INTO MoviesTitleTrigramCounts (trigram, movies)
+                    SELECT trigram, SUM(movies) FROM (
+                        SELECT term AS trigram, doc AS movies FROM temp.MoviesTitleTrigramsVocab
+                        UNION ALL
+                        SELECT term, -doc FROM temp.NonAsciiTitleTrigramsVocab
+                        UNION ALL
+                        SELECT lower(substr(t.title, p.position, 3)), COUNT(DISTINCT t.rowid)
+                        FROM temp.NonAsciiTitleTrigrams t
+                        JOIN TitleTrigramPositions p ON p.position <= length(t.title) - 2
+                        GROUP BY 1
+                    ) GROUP BY trigram HAVING SUM(movies) > 0''')
+    for table in ('MoviesTitleTrigramsVocab', 'NonAsciiTitleTrigramsVocab', 'NonAsciiTitleTrigrams'):
+        conn.execute(f'DROP TABLE temp.{table}')
+
+
+def rebuild_leaderboards(conn):
+    """
+    Recompute the global and per-genre top liked leaderboards from the Movies table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to rebuild the leaderboards on.
+    """
+    conn.execute('DELETE FROM TopLikedMovies')
+    conn.execute(f'''INSERT INTO TopLikedMovies (movie_id, likes)
+                     SELECT id, likes FROM Movies ORDER BY likes DESC, id LIMIT {LEADERBOARD_SIZE}''')
+    conn.execute('DELETE FROM GenreTopLikedMovies')
+    conn.execute(f'''INSERT INTO GenreTopLikedMovies (genre_id, movie_id, likes)
+                     SELECT genre_id, id, likes FROM (
+                         SELECT genre_id, id, likes,
+                                ROW_NUMBER() OVER (PARTITION BY genre_id ORDER BY likes DESC, id) AS position
+                         FROM Movies
+                     )
+                     WHERE position <= {LEADERBOARD_SIZE}''')
+
+
+def check_leaderboards(conn):
+    """
+    Compare the stored leaderboards with a full recompute from the Movies table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to check.
+
+    Returns:
+        list: A description of every board that differs from the recompute; empty if all match.
+    """
+    problems = []
+    stored = conn.execute('SELECT movie_id, likes FROM TopLikedMovies ORDER BY likes DESC, movie_id').fetchall()
+    expected = conn.execute(f'''SELECT id, likes FROM Movies
+                               ORDER BY likes DESC, id LIMIT {LEADERBOARD_SIZE}''').fetchall()
+    if [tuple(row) for row in stored] != [tuple(row) for row in expected]:
+        problems.append(f"Global leaderboard has {len(stored)} entries that differ from the "
+                        f"{len(expected)} expected")
+
+    stored_by_genre = {}
+    for row in conn.execute('''SELECT genre_id, movie_id, likes FROM GenreTopLikedMovies
+                               ORDER BY genre_id, likes DESC, movie_id'''):
+        stored_by_genre.setdefault(row['genre_id'], []).append((row['movie_id'], row['likes']))
+    expected_by_genre = {}
+    for row in conn.execute(f'''SELECT genre_id, id, likes FROM (
+                                    SELECT genre_id, id, likes,
+                                           ROW_NUMBER() OVER (PARTITION BY genre_id ORDER BY likes DESC, id) AS position
+                                    FROM Movies
+                                )
+                                WHERE position <= {LEADERBOARD_SIZE}
+                                ORDER BY genre_id, likes DESC, id'''):
+        expected_by_genre.setdefault(row['genre_id'], []).append((row['id'], row['likes']))
+
+    for genre_id in sorted(set(stored_by_genre) | set(expected_by_genre)):
+        if stored_by_genre.get(genre_id, []) != expected_by_genre.get(genre_id, []):
+            problems.append(f"Leaderboard of genre {genre_id} differs from the expected top "
+                            f"{len(expected_by_genre.get(genre_id, []))}")
+    return problems
+
+
+def _catalog_stats_query(group):
+    return f'''SELECT {group.format(row='Movies')}, COUNT(*), COALESCE(SUM(likes), 0) FROM Movies GROUP BY 1'''
+
+
+def rebuild_catalog_stats(conn):
+    """
+    Recompute the genre, year and director statistics from the Movies table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to rebuild the statistics on.
+    """
+    for table, column, _, group in CATALOG_STATS_GROUPS:
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(f'INSERT INTO {table} ({column}, movies, likes) {_catalog_stats_query(group)}')
+
+
+def check_catalog_stats(conn):
+    """
+    Compare the stored genre, year and director statistics with a full recompute from the Movies table.
+
+    Args:
+        conn (sqlite3.Connection): The connection to check.
+
+    Returns:
+        list: A description of every table that differs from the recompute; empty if all match.
+    """
+    problems = []
+    for table, column, _, group in CATALOG_STATS_GROUPS:
+        stored = {row[0]: tuple(row[1:]) for row in conn.execute(f'SELECT {column}, movies, likes FROM {table}')}
+        expected = {row[0]: tuple(row[1:]) for row in conn.execute(_catalog_stats_query(group))}
+        differing = [key for key in set(stored) | set(expected) if stored.get(key) != expected.get(key)]
+        if differing:
+            problems.append(f"{table} differs from the recompute in {len(differing)} of {len(expected)} groups, "
+                            f"e.g. {column} {sorted(differing, key=str)[0]!r}")
+    return problems
+
+
+def explain_indexed_queries(conn):
+    """
+    Run EXPLAIN QUERY PLAN for every entry in INDEXED_QUERIES.
+
+    Args:
+        conn (sqlite3.Connection): The connection to run the plans on.
+
+    Returns:
+        list: Tuples of (index name, caller, plan text, whether the plan uses the index).
+    """
+    results = []
+    for index_name, caller, query, params in INDEXED_QUERIES:
+        plan = conn.execute(f'EXPLAIN QUERY PLAN {query}', params).fetchall()
+        plan_text = '; '.join(row['detail'] for row in plan)
+        results.append((index_name, caller, plan_text, index_name in plan_text))
+    return results
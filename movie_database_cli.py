@@ -1,12 +1,66 @@
 import argparse
-from db_init import init_db
-from Models.Movie import Movie
-from Helpers.utils import print_movie_details, print_movie_list
+import json
+import shlex
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+from itertools import islice
+from db_init import init_db, get_db_connection, transaction
+from db_migrations import (get_schema_version, explain_indexed_queries, rebuild_full_text_index,
+                           rebuild_title_trigram_index, rebuild_leaderboards, check_leaderboards,
+                           rebuild_catalog_stats, check_catalog_stats)
+from Models.Movie import Movie, STATS_QUERIES, STATS_SORTS
+from Helpers.constants import (BATCH_GROUP_SIZE, CATALOG_FORMATS, CATEGORY_LIMIT, COVER_PREFETCH_WORKERS,
+                               COVER_REQUEST_TIMEOUT, FUZZY_RESULT_LIMIT, GROUP_COMMIT_WINDOW, IMPORT_BATCH_SIZE,
+                               MOVIE_PAGE_SIZE, OUTPUT_FORMATS, PROFILE_SLOW_QUERY_MS, RELEASE_RANGE_LIMIT,
+                               RESULT_CACHE_DISK, SERVER_HOST, SERVER_PORT, SERVER_READERS, SIMILARITY_RESULT_LIMIT)
+from Helpers.dates import decade_dates, year_dates
+from Helpers.result_cache import configure_result_cache
+from Helpers.search import SEARCH_FIELD_CHOICES
+from Helpers.utils import format_stats_table, print_movie_details, write_movie_list
+
+MOVCAT_CATEGORIES = ['liked', 'newest', 'genre', 'range']
+MOVSTATS_FORMATS = ['text', 'json']
+MOVDB_ACTIONS = ['version', 'explain', 'rebuild-fts', 'check-leaderboards', 'rebuild-leaderboards']
+# Commands that manage their own session and cannot be nested inside a batch or the REPL.
+SESSION_COMMANDS = ['batch', 'repl', 'serve']
+# Commands that always write to the database; see command_writes for the ones that only write with some arguments.
+WRITE_COMMANDS = ['movadd', 'movimport', 'movfv']
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+
+def non_negative_int(text):
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be 0 or more, not {value}")
+    return value
+
+
+def print_notice(args, message):
+    # Keep machine-readable output clean by sending hints and empty-result messages to stderr.
+    print(message, file=sys.stdout if args.format == 'text' else sys.stderr)
 
 
 def handle_movlst(args):
-    movies = Movie.get_all()
-    print_movie_list(movies)
+    last_id = None
+
+    def remember_last_id(movies):
+        nonlocal last_id
+        for movie in movies:
+            last_id = movie.id
+            yield movie
+
+    count = write_movie_list(remember_last_id(Movie.get_all(args.after_id, args.limit, args.page_size)), args.format)
+    # A full page only means there may be more; the hint is shown when at least one movie follows it.
+    if args.limit and count == args.limit and next(Movie.get_all(last_id, 1, summary=True), None) is not None:
+        print_notice(args, f"Showing {count} movies. Continue with: movlst --after-id {last_id} --limit {args.limit}")
 
 
 def handle_movdt(args):
@@ -18,11 +72,19 @@ def handle_movdt(args):
 
 
 def handle_movsrch(args):
-    movies = Movie.search_by_title(args.query)
-    if movies:
-        print_movie_list(movies)
-    else:
-        print(f"No movies found with title matching: {args.query}")
+    if args.fuzzy:
+        if args.field != 'title':
+            print("--fuzzy only searches titles.")
+            return
+        movies = Movie.fuzzy_search_by_title(args.query, args.limit or FUZZY_RESULT_LIMIT)
+        if not write_movie_list(movies, args.format):
+            print_notice(args, f"No movies found with a title similar to: {args.query}")
+        return
+
+    movies = Movie.search_by_title(args.query, args.field, args.limit)
+    if not write_movie_list(movies, args.format):
+        field = "any field" if args.field == 'all' else args.field
+        print_notice(args, f"No movies found with {field} matching: {args.query}")
 
 
 def handle_movadd(args):
@@ -33,35 +95,185 @@ def handle_movadd(args):
         print("Failed to add the movie.")
 
 
+def handle_movimport(args):
+    from Helpers.catalog_import import import_catalog
+
+    total_rows = total_inserted = total_duplicates = total_rejected = 0
+    started = time.perf_counter()
+    try:
+        for report in import_catalog(args.path, args.format, args.batch_size):
+            rejected = len(report['rejected'])
+            rate = report['rows'] / report['seconds'] if report['seconds'] else 0
+            print(f"Batch {report['batch']}: {report['rows']} rows in {report['seconds']:.2f}s ({rate:,.0f} rows/s) - "
+                  f"{report['inserted']} inserted, {report['duplicates']} duplicates, {rejected} rejected")
+            for line_number, reason in report['rejected']:
+                print(f"  line {line_number}: {reason}", file=sys.stderr)
+
+            total_rows += report['rows']
+            total_inserted += report['inserted']
+            total_duplicates += report['duplicates']
+            total_rejected += rejected
+    except OSError as e:
+        print(f"Could not read catalog: {e}")
+        return
+
+    elapsed = time.perf_counter() - started
+    rate = total_rows / elapsed if elapsed else 0
+    print(f"Imported {total_inserted} of {total_rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s): "
+          f"{total_duplicates} duplicates, {total_rejected} rejected.")
+
+
 def handle_movfv(args):
-    if Movie.get_by_id(args.movie_id):
-        Movie.favourite_movie(args.movie_id)
-        print(f"Movie with ID {args.movie_id} marked as favorite.")
-    else:
-        print(f"Movie with ID {args.movie_id} does not exist.")
+    movie_ids = list(args.movie_ids)
+    if args.stdin:
+        for token in sys.stdin.read().split():
+            try:
+                movie_ids.append(int(token))
+            except ValueError:
+                print(f"Skipping invalid movie ID: {token}")
+    if not movie_ids:
+        print("Usage: movfv <movie_id> [<movie_id> ...] or movfv --stdin")
+        return
+
+    likes = Counter(movie_ids)
+    for movie_id, liked in Movie.favourite_movies(movie_ids).items():
+        if not liked:
+            print(f"Movie with ID {movie_id} does not exist.")
+        elif likes[movie_id] == 1:
+            print(f"Movie with ID {movie_id} marked as favorite.")
+        else:
+            print(f"Movie with ID {movie_id} marked as favorite {likes[movie_id]} times.")
+
+
+def release_range(args):
+    """
+    Turn the --from/--to, --year or --decade options of movcat range into a pair of dates.
+
+    Returns:
+        tuple or None: (start date, end date), either of which may be None for an open range,
+            or None if the options are invalid.
+    """
+    if args.year is not None and args.decade is not None:
+        print("Use either --year or --decade, not both.")
+        return None
+    year = args.year if args.year is not None else args.decade
+    if year is None:
+        return args.start_date, args.end_date
+    if args.start_date or args.end_date:
+        print("--from and --to cannot be combined with --year or --decade.")
+        return None
+    if not 1 <= year <= 9999:
+        print("The year must be between 1 and 9999.")
+        return None
+    return year_dates(year) if args.year is not None else decade_dates(year)
 
 
 def handle_movcat(args):
+    default_limit = RELEASE_RANGE_LIMIT if args.category == 'range' else CATEGORY_LIMIT
+    limit = args.limit if args.limit is not None else default_limit
     if args.category == 'liked':
-        movies = Movie.get_top_liked()
+        movies = Movie.get_top_liked(limit)
     elif args.category == 'newest':
-        movies = Movie.get_newest()
+        movies = Movie.get_newest(limit)
     elif args.category == 'genre':
         if not args.genre_name:
             print("Usage: movcat genre <genre_name>")
             return
-        movies = Movie.get_by_genre(args.genre_name)
+        movies = Movie.get_by_genre(args.genre_name, limit)
+    elif args.category == 'range':
+        dates = release_range(args)
+        if dates is None:
+            return
+        movies = Movie.get_by_release_date(*dates, limit=limit)
     else:
-        print("Invalid category. Choose from [liked, newest, genre]")
+        print(f"Invalid category. Choose from [{', '.join(MOVCAT_CATEGORIES)}]")
         return
 
-    if movies:
-        print_movie_list(movies)
+    if not write_movie_list(movies, args.format):
+        print_notice(args, f"No movies found for category: {args.category}")
+
+
+def handle_movstats(args):
+    if args.verify or args.rebuild:
+        conn = get_db_connection()
+        if args.verify:
+            problems = check_catalog_stats(conn)
+            for problem in problems:
+                print(problem)
+            print("Catalog statistics are consistent." if not problems else
+                  "Catalog statistics are inconsistent. Run 'movstats --rebuild' to repair them.")
+        if args.rebuild:
+            with transaction():
+                rebuild_catalog_stats(conn)
+            print("Catalog statistics rebuilt.")
+        return
+
+    stats = Movie.get_stats(args.group, args.sort, args.limit)
+    totals = Movie.get_stats_totals()
+    if args.format == 'json':
+        print(json.dumps({'by': args.group, 'sort': args.sort, 'totals': totals, 'groups': stats}, indent=2,
+                         ensure_ascii=False))
+    elif not stats:
+        print("No movies in the catalog.")
     else:
-        print(f"No movies found for category: {args.category}")
+        sys.stdout.write(format_stats_table(stats, args.group, totals))
+
+
+def handle_movsim(args):
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("movsim needs numpy. Install it with: pip3 install numpy")
+        return
+
+    if args.rebuild:
+        from Helpers.similarity import build_index
+
+        summary = build_index(get_db_connection(), lambda movies: print(f"Read {movies:,} movies...",
+                                                                         file=sys.stderr))
+        print(f"Indexed {summary['movies']:,} movies and {summary['terms']:,} terms in {summary['seconds']:.1f}s "
+              f"({summary['bytes'] / 1024 / 1024:.1f} MB).")
+        if args.movie_id is None:
+            return
+    elif args.movie_id is None:
+        print("Usage: movsim <movie_id> or movsim --rebuild")
+        return
+
+    movies = Movie.get_similar(args.movie_id, args.limit)
+    if movies is None:
+        print(f"No movie found with ID: {args.movie_id}")
+    elif not write_movie_list(movies, args.format):
+        print_notice(args, f"No movies found similar to the movie with ID: {args.movie_id}")
+
+
+def handle_movcvr_prefetch(args):
+    from Helpers.cover_prefetch import prefetch_covers
+
+    total = Movie.count_covers()
+    print(f"Prefetching {total} distinct covers with {args.workers} workers...")
+
+    def report(summary):
+        if summary['done'] % 25 == 0 or summary['done'] == total:
+            rate = summary['done'] / summary['seconds'] if summary['seconds'] else 0
+            print(f"[{summary['done']}/{total}] {summary['succeeded']} cached, {summary['failed']} failed "
+                  f"({rate:.1f} covers/s)")
+
+    summary = prefetch_covers(Movie.get_covers(), args.workers, args.timeout, args.retries, on_progress=report)
+    rate = summary['done'] / summary['seconds'] if summary['seconds'] else 0
+    print(f"Prefetched {summary['succeeded']} of {summary['done']} distinct covers in {summary['seconds']:.2f}s "
+          f"({rate:.1f} covers/s).")
+    if summary['failed_ids']:
+        print(f"Failed for movie IDs: {', '.join(map(str, sorted(summary['failed_ids'])))}")
 
 
 def handle_movcvr(args):
+    if args.interaction == 'prefetch':
+        handle_movcvr_prefetch(args)
+        return
+    if args.movie_id is None:
+        print(f"Usage: movcvr {args.interaction} <movie_id>")
+        return
+
     if args.interaction == 'view':
         movie_cover = Movie.get_movie_cover(args.movie_id)
     elif args.interaction == 'add':
@@ -76,7 +288,7 @@ def handle_movcvr(args):
             print("Failed to add movie cover.")
         return
     else:
-        print("Invalid option. Choose from [view, add]")
+        print("Invalid option. Choose from [view, add, prefetch]")
         return
 
     if movie_cover:
@@ -85,8 +297,175 @@ def handle_movcvr(args):
         print(f"No cover found for movie with ID: {args.movie_id}. Add valid URL for the cover of your movie.")
 
 
+def handle_movdb(args):
+    conn = get_db_connection()
+    if args.action == 'version':
+        print(f"Schema version: {get_schema_version(conn)}")
+    elif args.action == 'explain':
+        for index_name, caller, plan, uses_index in explain_indexed_queries(conn):
+            status = "OK" if uses_index else "NOT USED"
+            print(f"{caller} -> {index_name}: {status}")
+            print(f"    {plan}")
+    elif args.action == 'rebuild-fts':
+        with conn:
+            rebuild_full_text_index(conn)
+            rebuild_title_trigram_index(conn)
+        print("Full-text and fuzzy title search indexes rebuilt.")
+    elif args.action == 'check-leaderboards':
+        problems = check_leaderboards(conn)
+        for problem in problems:
+            print(problem)
+        print("Leaderboards are consistent." if not problems else
+              "Leaderboards are inconsistent. Run 'movdb rebuild-leaderboards' to repair them.")
+    elif args.action == 'rebuild-leaderboards':
+        with conn:
+            rebuild_leaderboards(conn)
+        print("Leaderboards rebuilt.")
+    else:
+        print(f"Invalid action. Choose from [{', '.join(MOVDB_ACTIONS)}]")
+
+
+def handle_serve(args):
+    import asyncio
+    from movie_database_server import serve
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.readers, args.group_commit_ms / 1000))
+    except KeyboardInterrupt:
+        print("Server stopped.")
+
+
+def command_writes(args):
+    """
+    Tell whether a parsed command writes to the database.
+
+    Args:
+        args (argparse.Namespace): The arguments parsed by the parser built by setup_parser.
+
+    Returns:
+        bool: True for WRITE_COMMANDS, 'movcvr add', the 'movdb rebuild-*' actions and 'movstats --rebuild'.
+    """
+    if args.command in WRITE_COMMANDS:
+        return True
+    if args.command == 'movcvr':
+        return args.interaction == 'add'
+    if args.command == 'movdb':
+        return args.action.startswith('rebuild-')
+    if args.command == 'movstats':
+        return args.rebuild
+    return False
+
+
+def run_command_line(parser, line, before_write=None):
+    """
+    Parse one command line with the CLI parser and run its handler in the current process.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser built by setup_parser.
+        line (str): The command line, without the program name. Shell quoting and # comments are supported.
+        before_write (callable, optional): Called with no arguments before a command that writes to the
+            database, e.g. to open the batch's transaction. While a transaction is open, every command runs in
+            a savepoint of it, so a failed command only rolls back its own writes. Defaults to None.
+
+    Returns:
+        bool: Whether the command ran successfully. Blank and comment lines count as successful.
+    """
+    try:
+        argv = shlex.split(line, comments=True)
+    except ValueError as e:
+        print(f"Could not parse command: {e}", file=sys.stderr)
+        return False
+    if not argv:
+        return True
+    if argv[0] in SESSION_COMMANDS:
+        print(f"'{argv[0]}' cannot be run from a batch or the REPL.", file=sys.stderr)
+        return False
+
+    try:
+        args = parser.parse_args(argv)
+        if before_write is not None and command_writes(args):
+            before_write()
+        if before_write is not None and get_db_connection().transaction_depth:
+            with transaction():
+                args.func(args)
+        else:
+            args.func(args)
+    except SystemExit as e:
+        # argparse exits after --help (code 0) and after printing a usage error.
+        return e.code in (0, None)
+    except Exception as e:
+        print(f"An error occurred: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+def handle_batch(args):
+    parser = setup_parser()
+    source = sys.stdin if args.file == '-' else None
+    try:
+        source = source or open(args.file, encoding='utf-8')
+    except OSError as e:
+        print(f"Could not read batch file: {e}")
+        return
+
+    failed_lines = []
+    with source:
+        numbered_lines = enumerate(source, start=1)
+        while True:
+            group = list(islice(numbered_lines, args.group_size))
+            if not group:
+                break
+            # The write lock is only taken at the group's first write, so read-only commands never hold it.
+            with ExitStack() as group_transaction:
+                def open_transaction():
+                    if not get_db_connection().transaction_depth:
+                        group_transaction.enter_context(transaction())
+
+                for line_number, line in group:
+                    if not run_command_line(parser, line, before_write=open_transaction):
+                        failed_lines.append(line_number)
+            sys.stdout.flush()
+
+    if failed_lines:
+        print(f"Failed commands on lines: {', '.join(map(str, failed_lines))}", file=sys.stderr)
+        sys.exit(1)
+
+
+def handle_repl(args):
+    try:
+        import readline  # noqa: F401 - enables line editing and history for input()
+    except ImportError:
+        pass
+
+    parser = setup_parser()
+    print("Movie database REPL. Type a command such as 'movlst --limit 5', 'help' or 'exit'.")
+    while True:
+        try:
+            line = input(args.prompt)
+        except EOFError:
+            print()
+            break
+        except KeyboardInterrupt:
+            print()
+            continue
+
+        command = line.strip()
+        if command in ('exit', 'quit'):
+            break
+        if command == 'help':
+            parser.print_help()
+            continue
+        run_command_line(parser, line)
+
+
 def setup_movlst(subparsers):
-    subparsers.add_parser('movlst', help="List all movies").set_defaults(func=handle_movlst)
+    movlst_parser = subparsers.add_parser('movlst', help="List all movies")
+    movlst_parser.add_argument('--page-size', type=positive_int, default=MOVIE_PAGE_SIZE,
+                               help=f"Movies fetched from the database per query (default: {MOVIE_PAGE_SIZE})")
+    movlst_parser.add_argument('--after-id', type=int, default=0, help="Only list movies with a greater ID")
+    movlst_parser.add_argument('--limit', type=non_negative_int, help="Maximum number of movies to list")
+    movlst_parser.add_argument('--format', choices=OUTPUT_FORMATS, default='text', help="Output format (default: text)")
+    movlst_parser.set_defaults(func=handle_movlst)
 
 
 def setup_movdt(subparsers):
@@ -96,8 +475,16 @@ def setup_movdt(subparsers):
 
 
 def setup_movsrch(subparsers):
-    movsrch_parser = subparsers.add_parser('movsrch', help="Search movies by title")
-    movsrch_parser.add_argument('query', type=str, help="Search query for movie titles")
+    movsrch_parser = subparsers.add_parser('movsrch', help="Full-text search of movies, by title by default")
+    movsrch_parser.add_argument('query', type=str,
+                                help='Search query; words match as prefixes, "quoted text" as a phrase')
+    movsrch_parser.add_argument('--field', choices=SEARCH_FIELD_CHOICES, default='title',
+                                help="Field to search in (default: title)")
+    movsrch_parser.add_argument('--limit', type=int, help="Maximum number of results")
+    movsrch_parser.add_argument('--fuzzy', action='store_true',
+                                help=f"Find titles similar to the query, typos included "
+                                     f"(at most {FUZZY_RESULT_LIMIT} results unless --limit is given)")
+    movsrch_parser.add_argument('--format', choices=OUTPUT_FORMATS, default='text', help="Output format (default: text)")
     movsrch_parser.set_defaults(func=handle_movsrch)
 
 
@@ -111,29 +498,126 @@ def setup_movadd(subparsers):
     movadd_parser.set_defaults(func=handle_movadd)
 
 
+def setup_movimport(subparsers):
+    movimport_parser = subparsers.add_parser('movimport', help="Bulk import movies from a CSV or JSONL catalog")
+    movimport_parser.add_argument('path', type=str, help="Path of the catalog file")
+    movimport_parser.add_argument('--format', choices=CATALOG_FORMATS,
+                                  help="Catalog format (default: detected from the file extension)")
+    movimport_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                                  help=f"Rows inserted per transaction (default: {IMPORT_BATCH_SIZE})")
+    movimport_parser.set_defaults(func=handle_movimport)
+
+
 def setup_movfv(subparsers):
-    movfv_parser = subparsers.add_parser('movfv', help="Mark movie as favorite")
-    movfv_parser.add_argument('movie_id', type=int, help="ID of the movie to mark as favorite")
+    movfv_parser = subparsers.add_parser('movfv', help="Mark movies as favorite")
+    movfv_parser.add_argument('movie_ids', type=int, nargs='*', help="IDs of the movies to mark as favorite")
+    movfv_parser.add_argument('--stdin', action='store_true',
+                              help="Also read whitespace-separated movie IDs from standard input")
     movfv_parser.set_defaults(func=handle_movfv)
 
 
 def setup_movcat(subparsers):
     movcat_parser = subparsers.add_parser('movcat', help="Get movies by category")
-    movcat_parser.add_argument('category', choices=['liked', 'newest', 'genre'], help="Category of movies")
+    movcat_parser.add_argument('category', choices=MOVCAT_CATEGORIES, help="Category of movies")
     movcat_parser.add_argument('genre_name', type=str, nargs='?', help="Genre name (required if category is 'genre')")
+    movcat_parser.add_argument('--from', dest='start_date', help="For 'range': first release date (YYYY-MM-DD)")
+    movcat_parser.add_argument('--to', dest='end_date', help="For 'range': last release date (YYYY-MM-DD)")
+    movcat_parser.add_argument('--year', type=int, help="For 'range': movies released in this year")
+    movcat_parser.add_argument('--decade', type=int, help="For 'range': movies released in this decade, e.g. 1990")
+    movcat_parser.add_argument('--limit', type=int,
+                               help=f"Maximum number of movies (default: {CATEGORY_LIMIT}, "
+                                    f"{RELEASE_RANGE_LIMIT} for 'range')")
+    movcat_parser.add_argument('--format', choices=OUTPUT_FORMATS, default='text', help="Output format (default: text)")
     movcat_parser.set_defaults(func=handle_movcat)
 
 
+def setup_movstats(subparsers):
+    movstats_parser = subparsers.add_parser('movstats', help="Count movies and likes per genre, year or director")
+    movstats_parser.add_argument('group', nargs='?', choices=list(STATS_QUERIES), default='genre',
+                                 help="What to group by (default: genre)")
+    movstats_parser.add_argument('--sort', choices=STATS_SORTS, default='movies',
+                                 help="Largest groups by movies or likes first, or by name (default: movies)")
+    movstats_parser.add_argument('--limit', type=int, help="Maximum number of groups")
+    movstats_parser.add_argument('--format', choices=MOVSTATS_FORMATS, default='text',
+                                 help="Output format (default: text)")
+    movstats_parser.add_argument('--verify', action='store_true',
+                                 help="Compare the statistics with a full recount of the catalog")
+    movstats_parser.add_argument('--rebuild', action='store_true', help="Recount the statistics from the catalog")
+    movstats_parser.set_defaults(func=handle_movstats)
+
+
+def setup_movsim(subparsers):
+    movsim_parser = subparsers.add_parser('movsim', help="Find the movies most similar to a movie")
+    movsim_parser.add_argument('movie_id', type=int, nargs='?', help="ID of the movie to compare with")
+    movsim_parser.add_argument('--limit', type=int, default=SIMILARITY_RESULT_LIMIT,
+                               help=f"Maximum number of movies (default: {SIMILARITY_RESULT_LIMIT})")
+    movsim_parser.add_argument('--rebuild', action='store_true',
+                               help="Rebuild the similarity index from scratch, folding in every movie added since")
+    movsim_parser.add_argument('--format', choices=OUTPUT_FORMATS, default='text', help="Output format (default: text)")
+    movsim_parser.set_defaults(func=handle_movsim)
+
+
 def setup_movcvr(subparsers):
-    movcvr_parser = subparsers.add_parser('movcvr', help="Add or view movie covers")
-    movcvr_parser.add_argument('interaction', choices=['view', 'add'], help="Interact with movie cover")
-    movcvr_parser.add_argument('movie_id', type=int, help="ID of the movie")
+    movcvr_parser = subparsers.add_parser('movcvr', help="Add, view or prefetch movie covers")
+    movcvr_parser.add_argument('interaction', choices=['view', 'add', 'prefetch'], help="Interact with movie cover")
+    movcvr_parser.add_argument('movie_id', type=int, nargs='?', help="ID of the movie (required for 'view' and 'add')")
     movcvr_parser.add_argument('image_url', type=str, nargs='?', help="Genre name (required if interaction is 'add')")
+    movcvr_parser.add_argument('--workers', type=int, default=COVER_PREFETCH_WORKERS,
+                               help=f"Concurrent downloads for 'prefetch' (default: {COVER_PREFETCH_WORKERS})")
+    movcvr_parser.add_argument('--timeout', type=float, default=COVER_REQUEST_TIMEOUT,
+                               help=f"Seconds to wait for each download (default: {COVER_REQUEST_TIMEOUT})")
+    movcvr_parser.add_argument('--retries', type=int, default=2,
+                               help="Extra attempts per cover for 'prefetch', with exponential backoff (default: 2)")
     movcvr_parser.set_defaults(func=handle_movcvr)
 
 
+def setup_movdb(subparsers):
+    movdb_parser = subparsers.add_parser('movdb', help="Inspect and maintain the database")
+    movdb_parser.add_argument('action', choices=MOVDB_ACTIONS, help="Maintenance action")
+    movdb_parser.set_defaults(func=handle_movdb)
+
+
+def setup_serve(subparsers):
+    serve_parser = subparsers.add_parser('serve', help="Serve the movie database as a JSON API over HTTP")
+    serve_parser.add_argument('--host', default=SERVER_HOST, help=f"Interface to listen on (default: {SERVER_HOST})")
+    serve_parser.add_argument('--port', type=int, default=SERVER_PORT,
+                              help=f"Port to listen on (default: {SERVER_PORT})")
+    serve_parser.add_argument('--readers', type=int, default=SERVER_READERS,
+                              help=f"Worker threads with read-only connections (default: {SERVER_READERS})")
+    serve_parser.add_argument('--group-commit-ms', type=float, default=GROUP_COMMIT_WINDOW * 1000,
+                              help=f"Commit the writes that arrive within this many milliseconds together "
+                                   f"(default: {GROUP_COMMIT_WINDOW * 1000:g})")
+    serve_parser.set_defaults(func=handle_serve)
+
+
+def setup_batch(subparsers):
+    batch_parser = subparsers.add_parser('batch', help="Run many commands, one per line, in a single process")
+    batch_parser.add_argument('file', nargs='?', default='-', help="File with one command per line (default: stdin)")
+    batch_parser.add_argument('--group-size', type=int, default=BATCH_GROUP_SIZE,
+                              help=f"Commands written per transaction (default: {BATCH_GROUP_SIZE})")
+    batch_parser.set_defaults(func=handle_batch)
+
+
+def setup_repl(subparsers):
+    repl_parser = subparsers.add_parser('repl', help="Run commands interactively in a single process")
+    repl_parser.add_argument('--prompt', default='movdb> ', help="Input prompt (default: 'movdb> ')")
+    repl_parser.set_defaults(func=handle_repl)
+
+
 def setup_parser():
     parser = argparse.ArgumentParser(description="Movie database CLI")
+    parser.add_argument('--profile', action='store_const', const='text',
+                        help="Print where the command spent its time (SQL, connections, cover HTTP, render) to stderr")
+    parser.add_argument('--profile-json', action='store_const', const='json', dest='profile',
+                        help="Like --profile, but print the summary as JSON")
+    parser.add_argument('--slow-ms', type=float, default=PROFILE_SLOW_QUERY_MS,
+                        help=f"With --profile, log the query plan of statements slower than this "
+                             f"(default: {PROFILE_SLOW_QUERY_MS:g})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always run queries instead of reusing results read since the last write")
+    parser.add_argument('--disk-cache', action='store_true', default=RESULT_CACHE_DISK,
+                        help="Share cached query results between CLI runs through the user cache directory "
+                             "(default: on if MOVIE_DB_RESULT_CACHE_DISK is set)")
     subparsers = parser.add_subparsers(dest="command")
     subparsers.required = True
 
@@ -141,18 +625,38 @@ def setup_parser():
     setup_movdt(subparsers)
     setup_movsrch(subparsers)
     setup_movadd(subparsers)
+    setup_movimport(subparsers)
     setup_movfv(subparsers)
     setup_movcat(subparsers)
+    setup_movsim(subparsers)
+    setup_movstats(subparsers)
     setup_movcvr(subparsers)
+    setup_movdb(subparsers)
+    setup_serve(subparsers)
+    setup_batch(subparsers)
+    setup_repl(subparsers)
 
     return parser
 
 
 def main():
-    init_db()
     parser = setup_parser()
     args = parser.parse_args()
-    args.func(args)
+    configure_result_cache(not args.no_cache, args.disk_cache)
+    if not args.profile:
+        init_db()
+        args.func(args)
+        return
+
+    # Profiling has to start before init_db() opens the first connection.
+    from Helpers.profiler import enable_profiling, print_profile
+
+    profiler = enable_profiling(args.slow_ms)
+    try:
+        init_db()
+        args.func(args)
+    finally:
+        print_profile(profiler, args.command, args.profile)
 
 
 if __name__ == '__main__':
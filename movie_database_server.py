@@ -0,0 +1,285 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+from db_init import bind_connection_manager, connection_manager, ConnectionManager, GroupCommitWriter
+from Helpers.constants import (CATEGORY_LIMIT, GROUP_COMMIT_WINDOW, RELEASE_RANGE_LIMIT, SERVER_HOST, SERVER_PORT,
+                               SERVER_READERS, SERVER_KEEP_ALIVE_TIMEOUT, SERVER_MAX_BODY_BYTES,
+                               SIMILARITY_RESULT_LIMIT)
+from Helpers.dates import decade_dates, release_day, year_dates
+from Models.Movie import Movie, STATS_QUERIES, STATS_SORTS
+
+MAX_LIST_LIMIT = 1000
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _int_param(query, name, default=None):
+    values = query.get(name)
+    if not values:
+        return default
+    try:
+        return int(values[0])
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f"'{name}' must be an integer")
+
+
+def _limit_param(query, default):
+    return max(0, min(_int_param(query, 'limit', default), MAX_LIST_LIMIT))
+
+
+def _json_object(body, fields):
+    """
+    Check that a request body is a JSON object holding the given fields as strings.
+
+    Returns:
+        list: The values of the fields, in order.
+    """
+    if body is not None and not isinstance(body, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "The request body must be a JSON object")
+    values = []
+    for field in fields:
+        value = (body or {}).get(field)
+        if not value:
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Missing field: {field}")
+        if not isinstance(value, str):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Field must be a string: {field}")
+        values.append(value)
+    return values
+
+
+def _release_range_params(query):
+    year, decade = _int_param(query, 'year'), _int_param(query, 'decade')
+    if year is not None or decade is not None:
+        if not 1 <= (year if year is not None else decade) <= 9999:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "The year must be between 1 and 9999")
+        return year_dates(year) if year is not None else decade_dates(decade)
+    dates = query.get('from', [None])[0], query.get('to', [None])[0]
+    if any(date is not None and release_day(date) is None for date in dates):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "'from' and 'to' must be dates in YYYY-MM-DD format")
+    return dates
+
+
+class MovieServer:
+    """
+    Serve the Movie operations as JSON over HTTP/1.1 with keep-alive, from a single long-running process.
+
+    Reads run on a pool of worker threads, each with its own read-only connection. Writes all go through
+    one group commit writer, so they are serialized without contending for the SQLite write lock, and the
+    writes that arrive within the group commit window share one transaction.
+    """
+
+    def __init__(self, readers=SERVER_READERS, group_commit_window=GROUP_COMMIT_WINDOW):
+        read_manager = ConnectionManager(connection_manager.database, read_only=True)
+        self.reader_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='reader',
+                                              initializer=bind_connection_manager, initargs=(read_manager,))
+        self.writer = GroupCommitWriter(group_commit_window)
+        self.read_manager = read_manager
+
+    async def read(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.reader_pool, function, *args)
+
+    async def write(self, function, *args):
+        return await asyncio.wrap_future(self.writer.submit(function, *args))
+
+    async def route(self, method, path, query, body):
+        parts = [part for part in path.split('/') if part]
+        if not parts or parts[0] != 'movies':
+            raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+
+        if method == 'GET' and len(parts) == 1:
+            after_id = _int_param(query, 'after_id', 0)
+            limit = _limit_param(query, 100)
+            movies = await self.read(lambda: [movie.as_dict(Movie.SUMMARY_FIELDS)
+                                              for movie in Movie.get_all(after_id, limit, summary=True)])
+            next_after_id = movies[-1]['id'] if len(movies) == limit and movies else None
+            return HTTPStatus.OK, {'movies': movies, 'next_after_id': next_after_id}
+
+        if method == 'GET' and parts[1:] == ['search']:
+            search_query = query.get('q', [''])[0]
+            field = query.get('field', ['title'])[0]
+            limit = _limit_param(query, 20)
+            if query.get('fuzzy', ['0'])[0] not in ('0', ''):
+                movies = await self.read(lambda: [movie.as_dict(Movie.SUMMARY_FIELDS) for movie
+                                                  in Movie.fuzzy_search_by_title(search_query, limit, summary=True)])
+            else:
+                movies = await self.read(lambda: [movie.as_dict(Movie.SUMMARY_FIELDS) for movie
+                                                  in Movie.search_by_title(search_query, field, limit, summary=True)])
+            return HTTPStatus.OK, {'movies': movies}
+
+        if method == 'GET' and len(parts) == 3 and parts[1] == 'category':
+            return HTTPStatus.OK, {'movies': await self.read(self._category, parts[2], query)}
+
+        if method == 'GET' and len(parts) == 3 and parts[1] == 'stats':
+            sort = query.get('sort', ['movies'])[0]
+            if parts[2] not in STATS_QUERIES or sort not in STATS_SORTS:
+                raise HttpError(HTTPStatus.NOT_FOUND if parts[2] not in STATS_QUERIES else HTTPStatus.BAD_REQUEST,
+                                f"Statistics are grouped by one of [{', '.join(STATS_QUERIES)}] and sorted by one of "
+                                f"[{', '.join(STATS_SORTS)}]")
+            limit = _int_param(query, 'limit')
+            stats = await self.read(Movie.get_stats, parts[2], sort, limit)
+            return HTTPStatus.OK, {'totals': await self.read(Movie.get_stats_totals), 'groups': stats}
+
+        if method == 'POST' and len(parts) == 1:
+            args = _json_object(body, ('title', 'description', 'release_date', 'director', 'genre'))
+            movie_id = await self.write(Movie.add, *args)
+            if movie_id is None:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Failed to add the movie.")
+            return HTTPStatus.CREATED, {'id': movie_id}
+
+        try:
+            movie_id = int(parts[1]) if len(parts) > 1 else None
+        except ValueError:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+
+        if method == 'GET' and len(parts) == 2:
+            movie = await self.read(Movie.get_by_id, movie_id)
+            if movie is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"No movie found with ID: {movie_id}")
+            return HTTPStatus.OK, movie.as_dict()
+
+        if method == 'POST' and parts[2:] == ['favourite']:
+            liked = await self.write(Movie.favourite_movies, [movie_id])
+            if not liked[movie_id]:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"Movie with ID {movie_id} does not exist.")
+            return HTTPStatus.OK, {'id': movie_id, 'liked': True}
+
+        if method == 'GET' and parts[2:] == ['similar']:
+            limit = _limit_param(query, SIMILARITY_RESULT_LIMIT)
+            movies = await self.read(Movie.get_similar, movie_id, limit, True)
+            if movies is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"No movie found with ID: {movie_id}")
+            return HTTPStatus.OK, {'movies': [movie.as_dict(Movie.SUMMARY_FIELDS) for movie in movies]}
+
+        if method == 'GET' and parts[2:] == ['cover']:
+            cover = await self.read(Movie.get_movie_cover, movie_id)
+            if cover is None:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"No cover found for movie with ID: {movie_id}")
+            return HTTPStatus.OK, {'id': movie_id, 'cover': cover}
+
+        if method == 'PUT' and parts[2:] == ['cover']:
+            url, = _json_object(body, ('url',))
+            if not await self.write(Movie.add_movie_cover_url, movie_id, url):
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Failed to add movie cover.")
+            return HTTPStatus.OK, {'id': movie_id, 'cover_url': url}
+
+        raise HttpError(HTTPStatus.NOT_FOUND, "Not found")
+
+    @staticmethod
+    def _category(category, query):
+        limit = _limit_param(query, RELEASE_RANGE_LIMIT if category == 'range' else CATEGORY_LIMIT)
+        if category == 'liked':
+            movies = Movie.get_top_liked(limit, summary=True)
+        elif category == 'newest':
+            movies = Movie.get_newest(limit, summary=True)
+        elif category == 'genre':
+            genre_name = query.get('genre', [''])[0]
+            if not genre_name:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Missing parameter: genre")
+            movies = Movie.get_by_genre(genre_name, limit, summary=True)
+        elif category == 'range':
+            movies = Movie.get_by_release_date(*_release_range_params(query), limit, summary=True)
+        else:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Invalid category. Choose from [liked, newest, genre, range]")
+        return [movie.as_dict(Movie.SUMMARY_FIELDS) for movie in movies]
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), SERVER_KEEP_ALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                        ConnectionError):
+                    return
+
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = request_line.split(' ')
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Malformed request line"}, False)
+                    return
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                status, payload = await self._dispatch(reader, method, target, headers)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader, method, target, headers):
+        try:
+            try:
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length header")
+            if length > SERVER_MAX_BODY_BYTES:
+                raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+            body = None
+            if length:
+                data = await reader.readexactly(length)
+                try:
+                    body = json.loads(data)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid JSON body")
+            url = urlsplit(target)
+            return await self.route(method, url.path, parse_qs(url.query), body)
+        except HttpError as e:
+            return e.status, {'error': e.message}
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"An error occurred: {e}"}
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        writer.write(
+            f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode('latin-1') + body
+        )
+        await writer.drain()
+
+    def close(self):
+        self.reader_pool.shutdown()
+        self.writer.close()
+        self.read_manager.close_all()
+
+
+async def serve(host=SERVER_HOST, port=SERVER_PORT, readers=SERVER_READERS, group_commit_window=GROUP_COMMIT_WINDOW):
+    """
+    Run the JSON API until cancelled.
+
+    Args:
+        host (str, optional): The interface to listen on. Defaults to SERVER_HOST.
+        port (int, optional): The port to listen on. Defaults to SERVER_PORT.
+        readers (int, optional): The number of read worker threads. Defaults to SERVER_READERS.
+        group_commit_window (float, optional): How long, in seconds, writes are gathered into one transaction.
+            Defaults to GROUP_COMMIT_WINDOW.
+    """
+    movie_server = MovieServer(readers, group_commit_window)
+    server = await asyncio.start_server(movie_server.handle_client, host, port)
+    print(f"Serving the movie database on http://{host}:{port} with {readers} readers (pid {os.getpid()})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        movie_server.close()
+
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_init import ConnectionManager, bind_connection_manager  # noqa: E402
+from db_migrations import migrate  # noqa: E402
+from Helpers.result_cache import configure_result_cache  # noqa: E402
+from Models.Genre import Genre  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    A migrated, empty catalog in a temporary directory, bound to the test's thread.
+
+    Yields:
+        ConnectionManager: The manager handing out connections to the catalog.
+    """
+    manager = ConnectionManager(str(tmp_path / 'movies.db'))
+    bind_connection_manager(manager)
+    configure_result_cache(enabled=False, disk=False)
+    Genre.invalidate_cache()
+    migrate(manager.get_connection())
+    yield manager
+    bind_connection_manager(None)
+    configure_result_cache()
+    Genre.invalidate_cache()
+    manager.close_all()
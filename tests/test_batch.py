@@ -0,0 +1,51 @@
+import argparse
+
+import pytest
+
+import db_init
+from Models.Movie import Movie
+from movie_database_cli import handle_batch
+
+
+def run_batch(tmp_path, lines):
+    path = tmp_path / 'commands.txt'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    handle_batch(argparse.Namespace(file=str(path), group_size=4))
+
+
+@pytest.fixture
+def write_locks(monkeypatch):
+    taken = []
+    original = db_init.begin_immediate
+
+    def begin_immediate(conn, *args):
+        taken.append(conn)
+        original(conn, *args)
+
+    monkeypatch.setattr(db_init, 'begin_immediate', begin_immediate)
+    return taken
+
+
+def test_read_only_commands_never_take_the_write_lock(database, tmp_path, write_locks, capsys):
+    Movie.add('Read Me', 'A movie.', '2000-01-01', 'Director', 'drama')
+    write_locks.clear()
+
+    run_batch(tmp_path, ['movlst', 'movdt 1', 'movcat newest', 'movstats', 'movcvr view 1'])
+
+    assert write_locks == []
+    assert 'Read Me' in capsys.readouterr().out
+
+
+def test_writes_take_the_lock_once_per_group_from_their_first_write(database, tmp_path, write_locks):
+    run_batch(tmp_path, [
+        'movlst',
+        "movadd 'One' 'A movie.' 2000-01-01 Director drama",
+        'movlst',
+        'movdt 1',
+        'movcat newest',
+        "movadd 'Two' 'A movie.' 2000-01-02 Director drama",
+        'movfv 1 2',
+    ])
+
+    assert len(write_locks) == 2
+    assert [movie.likes for movie in Movie.get_all()] == [1, 1]
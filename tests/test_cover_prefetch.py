@@ -0,0 +1,156 @@
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import Helpers.cover_prefetch as cover_prefetch
+import Helpers.movie_cover as movie_cover
+from Helpers.cover_cache import CoverCache
+from Models.Movie import Movie
+
+
+def make_cover():
+    buffer = BytesIO()
+    Image.linear_gradient('L').resize((40, 60)).convert('RGB').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class CoverServer(ThreadingHTTPServer):
+    """
+    A local stand-in for cover hosts: /cover/<name> serves an image with an ETag, /missing/<name> is a 404,
+    and /flaky/<name> fails with a 503 the first time it is asked for.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), CoverRequestHandler)
+        self.image = make_cover()
+        self.lock = threading.Lock()
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+class CoverRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            first = not any(path == self.path for path, _ in server.requests)
+            server.requests.append((self.path, self.headers.get('If-None-Match')))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            # Long enough for the other workers' requests to overlap with this one.
+            time.sleep(0.05)
+            etag = f'"{self.path}"'
+            if self.path.startswith('/missing/'):
+                self._send(HTTPStatus.NOT_FOUND)
+            elif self.path.startswith('/flaky/') and first:
+                self._send(HTTPStatus.SERVICE_UNAVAILABLE)
+            elif self.headers.get('If-None-Match') == etag:
+                self._send(HTTPStatus.NOT_MODIFIED)
+            else:
+                self._send(HTTPStatus.OK, server.image, {'ETag': etag, 'Content-Type': 'image/png'})
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = CoverServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = CoverCache(str(tmp_path / 'covers'))
+    monkeypatch.setattr(cover_prefetch, 'get_cover_cache', lambda: cache)
+    yield cache
+    cache.close()
+
+
+def test_prefetch_downloads_every_distinct_url_once_and_concurrently(server, cache):
+    covers = [(movie_id, server.url(f'/cover/{movie_id % 8}.png')) for movie_id in range(1, 25)]
+    covers.append((99, server.url('/missing/99.png')))
+
+    progress = []
+    summary = cover_prefetch.prefetch_covers(covers, workers=4, retries=0, on_progress=progress.append)
+
+    assert summary['done'] == 9
+    assert summary['succeeded'] == 8
+    assert summary['failed_ids'] == [99]
+    assert [path for path, _ in server.requests].count('/cover/0.png') == 1
+    assert server.max_active > 1
+    assert progress[-1]['done'] == summary['done']
+
+
+def test_prefetch_serves_a_url_repeated_after_its_fetch_from_the_cache(server, cache):
+    covers = iter([(1, server.url('/cover/1.png')), (2, server.url('/cover/2.png'))])
+
+    def covers_after_the_first_finished():
+        yield next(covers)
+        yield next(covers)
+        # By the time the slow second download is done, the first one is long finished.
+        time.sleep(0.2)
+        yield 3, server.url('/cover/1.png')
+
+    summary = cover_prefetch.prefetch_covers(covers_after_the_first_finished(), workers=2)
+
+    assert summary['succeeded'] == 3
+    assert [path for path, _ in server.requests].count('/cover/1.png') == 1
+
+
+def test_prefetch_revalidates_expired_covers_with_a_conditional_get(server, cache, monkeypatch):
+    covers = [(1, server.url('/cover/1.png'))]
+    assert cover_prefetch.prefetch_covers(covers, workers=1)['succeeded'] == 1
+
+    # Within the TTL the cached cover is used without asking the server at all.
+    assert cover_prefetch.prefetch_covers(covers, workers=1)['succeeded'] == 1
+    assert len(server.requests) == 1
+
+    monkeypatch.setattr(movie_cover, 'COVER_CACHE_TTL', 0)
+    summary = cover_prefetch.prefetch_covers(covers, workers=1)
+
+    assert summary['succeeded'] == 1
+    assert server.requests[-1] == ('/cover/1.png', '"/cover/1.png"')
+
+
+def test_prefetch_retries_failed_downloads(server, cache):
+    assert cover_prefetch.prefetch_covers([(1, server.url('/flaky/1.png'))], workers=1, retries=0)['failed'] == 1
+    assert cover_prefetch.prefetch_covers([(2, server.url('/flaky/2.png'))], workers=1, retries=1)['succeeded'] == 1
+
+
+def test_covers_are_listed_and_counted_once_per_url(database):
+    conn = database.get_connection()
+    for movie_id in range(1, 5):
+        Movie.add(f'Movie {movie_id}', 'A movie.', '2000-01-01', 'Director', 'drama')
+    with conn:
+        conn.execute("UPDATE Movies SET cover = 'http://example.com/shared.png' WHERE id <= 3")
+
+    assert Movie.count_covers() == 1
+    assert [tuple(row) for row in Movie.get_covers()] == [(1, 'http://example.com/shared.png')]
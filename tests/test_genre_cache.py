@@ -0,0 +1,46 @@
+import sqlite3
+
+from Models.Genre import Genre
+from Models.Movie import Movie
+
+
+class CountingConnection:
+    """
+    Wraps a connection to count the statements run on it.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = []
+
+    def execute(self, sql, *args):
+        self.statements.append(sql)
+        return self.conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def test_known_genres_are_looked_up_without_queries(database, monkeypatch):
+    drama_id = Genre.get_id_by_name('drama')
+    counting = CountingConnection(database.get_connection())
+    monkeypatch.setattr('Models.Genre.get_db_connection', lambda: counting)
+
+    Movie.add('A Movie', 'A movie.', '2000-01-01', 'Director', 'drama')
+    assert Genre.get_id_by_name('Drama') == drama_id
+    assert Genre.get_name_by_id(drama_id) == 'drama'
+
+    assert counting.statements == []
+
+
+def test_genres_added_by_another_connection_are_found(database):
+    Genre.get_id_by_name('drama')
+    other = sqlite3.connect(database.database)
+    with other:
+        other.execute("INSERT INTO Genres (name) VALUES ('western noir')")
+    other.close()
+
+    genre_id = Genre.get_id_by_name('western noir')
+    assert genre_id is not None
+    assert Genre.get_name_by_id(genre_id) == 'western noir'
+    assert 'western noir' in [genre.name for genre in Genre.get_all()]
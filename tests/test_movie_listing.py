@@ -0,0 +1,17 @@
+import pytest
+
+from Models.Movie import Movie
+
+
+def test_get_all_pages_through_every_movie(database):
+    for day in range(1, 6):
+        Movie.add(f'Movie {day}', 'A movie.', f'2000-01-0{day}', 'Director', 'drama')
+
+    assert [movie.title for movie in Movie.get_all(page_size=2)] == [f'Movie {day}' for day in range(1, 6)]
+    assert [movie.id for movie in Movie.get_all(2, 2, page_size=1)] == [3, 4]
+
+
+@pytest.mark.parametrize('options', [{'page_size': 0}, {'page_size': -1}, {'limit': -1}])
+def test_get_all_rejects_sizes_that_would_never_finish(database, options):
+    with pytest.raises(ValueError):
+        Movie.get_all(**options)
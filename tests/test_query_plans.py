@@ -0,0 +1,13 @@
+import pytest
+
+from db_migrations import INDEXED_QUERIES, explain_indexed_queries
+
+
+@pytest.mark.parametrize('entry', range(len(INDEXED_QUERIES)),
+                         ids=[f'{index_name}-{caller}' for index_name, caller, _, _ in INDEXED_QUERIES])
+def test_indexed_queries_use_their_index(database, entry):
+    index_name, caller, plan_text, uses_index = explain_indexed_queries(database.get_connection())[entry]
+
+    assert uses_index, f"{caller} no longer uses {index_name}: {plan_text}"
+    full_scans = [step for step in plan_text.split('; ') if step.startswith('SCAN') and ' USING ' not in step]
+    assert not full_scans, f"{caller} scans a whole table: {plan_text}"
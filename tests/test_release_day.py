@@ -0,0 +1,32 @@
+import sqlite3
+
+from Models.Movie import Movie
+
+
+def release_days(conn):
+    return dict(conn.execute('SELECT title, release_day FROM Movies'))
+
+
+def test_triggers_fill_in_release_day_for_other_clients(database):
+    conn = sqlite3.connect(database.database)
+    with conn:
+        conn.execute("INSERT INTO Movies (title, description, release_date, director, genre_id) "
+                     "VALUES ('Plain', 'A movie.', '1970-01-11', 'Director', 1)")
+        conn.execute("INSERT INTO Movies (title, description, release_date, director, genre_id) "
+                     "VALUES ('Moved', 'A movie.', '1970-01-01', 'Director', 1)")
+        conn.execute("UPDATE Movies SET release_date = '1969-12-31' WHERE title = 'Moved'")
+    conn.close()
+
+    assert release_days(database.get_connection()) == {'Plain': 10, 'Moved': -1}
+    assert [movie.title for movie in Movie.get_by_release_date('1970-01-01', '1970-12-31')] == ['Plain']
+
+
+def test_release_days_from_python_are_kept(database):
+    Movie.add('Unpadded', 'A movie.', '1970-1-2', 'Director', 'drama')
+    conn = database.get_connection()
+    # SQL only converts canonical dates, so the trigger leaves this one to Movie.add.
+    assert release_days(conn) == {'Unpadded': 1}
+    with conn:
+        conn.execute("UPDATE Movies SET release_date = '1970-01-03', release_day = 2")
+
+    assert release_days(conn) == {'Unpadded': 2}
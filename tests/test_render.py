@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from Benchmarks.render_benchmark import make_fixture_image  # noqa: E402
+from Helpers.movie_cover import render, render_vectorized  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def image():
+    return make_fixture_image()
+
+
+@pytest.mark.parametrize('colorize', [True, False], ids=['colored', 'plain'])
+@pytest.mark.parametrize('width', [10, 40, 80, 120, 200])
+def test_vectorized_render_is_byte_identical(image, width, colorize):
+    expected = render(image, width, colorize=colorize).encode('utf-8')
+
+    assert render_vectorized(image, width, colorize=colorize).encode('utf-8') == expected
+
+
+@pytest.mark.parametrize('mode', ['RGB', 'L', 'P'])
+def test_vectorized_render_is_byte_identical_for_other_modes(image, mode):
+    converted = image.convert(mode)
+
+    assert render_vectorized(converted, 80).encode('utf-8') == render(converted, 80).encode('utf-8')
@@ -0,0 +1,32 @@
+import pytest
+
+from Helpers.result_cache import configure_result_cache, get_result_cache
+from Models.Movie import Movie
+
+
+@pytest.fixture
+def cache(database):
+    configure_result_cache(enabled=True, disk=False)
+    return get_result_cache()
+
+
+def test_changing_a_cached_movie_does_not_change_the_cache(cache):
+    movie_id = Movie.add('Cached', 'A movie.', '2000-01-01', 'Director', 'drama')
+
+    Movie.get_by_id(movie_id).title = 'Changed'
+    Movie.get_newest()[0].likes = 100
+
+    assert Movie.get_by_id(movie_id).title == 'Cached'
+    assert Movie.get_newest()[0].likes == 0
+    assert cache.stats()['hits'] == 2
+
+
+def test_changing_cached_statistics_does_not_change_the_cache(cache):
+    Movie.add('Counted', 'A movie.', '2000-01-01', 'Director', 'drama')
+
+    Movie.get_stats()[0]['movies'] = 100
+    Movie.get_stats_totals()['movies'] = 100
+
+    assert Movie.get_stats()[0]['movies'] == 1
+    assert Movie.get_stats_totals()['movies'] == 1
+    assert cache.stats()['hits'] == 2
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from db_init import transaction
+from Models.Genre import Genre
+from Models.Movie import Movie
+
+pytest.importorskip('numpy')
+
+from Helpers.similarity import (SIMILARITY_DELTA_SUFFIX, SimilarityIndex, build_index,  # noqa: E402
+                                get_index_path, get_similarity_index)
+
+
+def add_movies(titles, description='A heist in a dream within a dream.'):
+    with transaction():
+        Movie.add_batch([(title, description, '2010-07-16', 'Christopher Nolan', Genre.get_id_by_name('drama'), None)
+                         for title in titles])
+
+
+def read_delta(conn):
+    with open(get_index_path(conn) + SIMILARITY_DELTA_SUFFIX, encoding='utf-8') as delta_file:
+        return [json.loads(line) for line in delta_file]
+
+
+def similar_titles(movie_id):
+    return {movie.title for movie in Movie.get_similar(movie_id, 20)}
+
+
+def test_imported_movies_are_found_even_after_a_later_movadd(database):
+    add_movies(['Inception'])
+    build_index(database.get_connection())
+
+    add_movies(['Imported Dream Heist'])
+    Movie.add('Added Dream Heist', 'A heist in a dream within a dream.', '2011-01-01', 'Christopher Nolan', 'drama')
+
+    assert similar_titles(1) == {'Imported Dream Heist', 'Added Dream Heist'}
+
+
+def test_movies_the_catch_up_scan_appends_are_searched_in_the_same_call(database):
+    add_movies(['Inception'])
+    build_index(database.get_connection())
+
+    add_movies(['Imported Dream Heist'])
+
+    assert similar_titles(1) == {'Imported Dream Heist'}
+
+
+def test_movies_added_in_a_transaction_are_indexed_once_it_commits(database):
+    add_movies(['Inception'])
+    conn = database.get_connection()
+    build_index(conn)
+
+    with transaction():
+        Movie.add('Kept Dream Heist', 'A heist in a dream within a dream.', '2011-01-01', 'Christopher Nolan', 'drama')
+        with pytest.raises(RuntimeError):
+            with transaction():
+                Movie.add('Rolled Back Heist', 'A heist in a dream.', '2012-01-01', 'Christopher Nolan', 'drama')
+                raise RuntimeError()
+
+    assert [entry['id'] for entry in read_delta(conn) if 'id' in entry] == [2]
+    assert sorted(get_similarity_index(conn).delta) == [2]
+
+
+def test_the_catch_up_scan_starts_above_the_highest_id_any_process_has_scanned(database):
+    add_movies(['Inception'])
+    conn = database.get_connection()
+    build_index(conn)
+    add_movies(['Imported Dream Heist'])
+    Movie.add('Added Dream Heist', 'A heist in a dream within a dream.', '2011-01-01', 'Christopher Nolan', 'drama')
+
+    get_similarity_index(conn)
+    assert read_delta(conn)[0] == {'scanned_id': 3}
+
+    # A process loading the index now only looks for movies above the header's ID.
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        index = SimilarityIndex.load(get_index_path(conn))
+        index.refresh_delta(conn)
+    finally:
+        conn.set_trace_callback(None)
+
+    assert sorted(index.delta) == [2, 3]
+    assert any(statement.rstrip().endswith('WHERE m.id > 3 ORDER BY m.id') for statement in statements)
@@ -0,0 +1,55 @@
+import sqlite3
+
+from db_migrations import rebuild_title_trigram_index
+from Models.Movie import Movie
+
+
+def read_counts(conn):
+    return dict(conn.execute('SELECT trigram, movies FROM MoviesTitleTrigramCounts WHERE movies != 0'))
+
+
+def test_trigger_counts_match_a_rebuild_for_non_ascii_titles(database):
+    conn = database.get_connection()
+    for title in ('Écoute', 'écoute encore', 'Über Alles', 'ÜBER', 'Ecoute'):
+        assert Movie.add(title, 'A movie.', '2000-01-01', 'Director', 'drama') is not None
+    counted = read_counts(conn)
+
+    with conn:
+        rebuild_title_trigram_index(conn)
+
+    assert read_counts(conn) == counted
+    # SQL lower() only folds ASCII, on every path alike.
+    assert counted['Éco'] == 1
+    assert counted['éco'] == 1
+    assert counted['Übe'] == 2
+    assert counted['cou'] == 3
+
+
+def test_deletes_after_a_rebuild_leave_no_negative_counts(database):
+    conn = database.get_connection()
+    Movie.add('Écoute', 'A movie.', '2000-01-01', 'Director', 'drama')
+    with conn:
+        rebuild_title_trigram_index(conn)
+        conn.execute('DELETE FROM Movies')
+
+    assert conn.execute('SELECT COUNT(*) FROM MoviesTitleTrigramCounts WHERE movies < 0').fetchone()[0] == 0
+    assert read_counts(conn) == {}
+
+
+def test_a_plain_sqlite3_connection_can_write_movies(database):
+    conn = sqlite3.connect(database.database)
+    with conn:
+        conn.execute("INSERT INTO Movies (title, description, release_date, director, genre_id) "
+                     "VALUES ('Über Alles', 'A movie.', '2000-01-01', 'Director', 1)")
+        conn.execute("UPDATE Movies SET title = 'Unter Alles'")
+        conn.execute('DELETE FROM Movies')
+    conn.close()
+
+    assert read_counts(database.get_connection()) == {}
+
+
+def test_fuzzy_search_finds_titles_with_non_ascii_capitals(database):
+    Movie.add('Écoute le silence', 'A movie.', '2000-01-01', 'Director', 'drama')
+
+    assert [movie.title for movie in Movie.fuzzy_search_by_title('ecoute le silence')] == ['Écoute le silence']
+    assert [movie.title for movie in Movie.fuzzy_search_by_title('ÉCOUTE LE SILENCE')] == ['Écoute le silence']
@@ -0,0 +1,115 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db_init
+from db_init import GroupCommitWriter, begin_immediate, call_after_commit, transaction
+from Models.Movie import Movie
+
+
+@pytest.fixture
+def locked(database, monkeypatch):
+    """
+    Hold the write lock from a second connection, and make the first one give up on a locked database at once,
+    so every wait is a retry of begin_immediate rather than SQLite's busy timeout.
+
+    Yields:
+        sqlite3.Connection: The connection holding the lock; commit or roll it back to release it.
+    """
+    monkeypatch.setattr(db_init, 'DB_WRITE_RETRY_DELAY', 0.02)
+    monkeypatch.setattr(db_init, 'DB_WRITE_RETRY_MAX_DELAY', 0.05)
+    # Enough attempts for writes that call begin_immediate with its default retries to outlast the lock.
+    monkeypatch.setattr(begin_immediate, '__defaults__', (100,))
+    database.get_connection().execute('PRAGMA busy_timeout = 0')
+    other = sqlite3.connect(database.database, isolation_level=None, check_same_thread=False)
+    other.execute('BEGIN IMMEDIATE')
+    yield other
+    if other.in_transaction:
+        other.rollback()
+    other.close()
+
+
+def test_begin_immediate_retries_until_the_lock_is_released(database, locked):
+    conn = database.get_connection()
+    attempts = []
+    original_execute = conn.execute
+
+    def release_after_a_while():
+        time.sleep(0.2)
+        locked.rollback()
+
+    releaser = threading.Thread(target=release_after_a_while)
+    releaser.start()
+    started = time.perf_counter()
+    try:
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr(conn, 'execute', lambda sql, *args: attempts.append(sql) or original_execute(sql, *args),
+                          raising=False)
+            begin_immediate(conn, retries=100)
+    finally:
+        releaser.join()
+    conn.rollback()
+
+    assert time.perf_counter() - started >= 0.2
+    assert attempts.count('BEGIN IMMEDIATE') > 1
+
+
+def test_begin_immediate_gives_up_after_the_last_retry(database, locked):
+    with pytest.raises(sqlite3.OperationalError, match='database is locked'):
+        begin_immediate(database.get_connection(), retries=3)
+
+
+def test_a_write_waits_for_the_lock_and_then_commits(database, locked):
+    threading.Timer(0.2, locked.rollback).start()
+
+    movie_id = Movie.add('Locked Out', 'A movie.', '2000-01-01', 'Director', 'drama')
+
+    assert movie_id is not None
+    assert Movie.get_by_id(movie_id).title == 'Locked Out'
+
+
+def test_group_commit_rolls_back_a_failing_call_on_its_own(database):
+    movie_id = Movie.add('Liked', 'A movie.', '2000-01-01', 'Director', 'drama')
+    writer = GroupCommitWriter(window=0.05, manager=database)
+
+    def fail():
+        with transaction() as conn:
+            conn.execute('UPDATE Movies SET likes = likes + 100')
+        raise ValueError("rejected")
+
+    futures = [writer.submit(Movie.favourite_movies, [movie_id]) for _ in range(5)]
+    futures.insert(2, writer.submit(fail))
+    try:
+        with pytest.raises(ValueError):
+            futures[2].result()
+        assert all(future.result()[movie_id] for future in futures if future is not futures[2])
+    finally:
+        writer.close()
+
+    assert Movie.get_by_id(movie_id).likes == 5
+    assert writer.get_stats()['calls'] == 6
+    assert writer.get_stats()['commits'] < 6
+
+
+def test_group_commit_reports_a_failing_after_commit_callback_without_failing_the_calls(database, capsys):
+    writer = GroupCommitWriter(window=0.05, manager=database)
+    ran = []
+
+    def add_with_callbacks(title):
+        with transaction() as conn:
+            movie_id = Movie.add(title, 'A movie.', '2000-01-01', 'Director', 'drama')
+            call_after_commit(conn, lambda: 1 / 0)
+            call_after_commit(conn, lambda: ran.append(movie_id))
+        return movie_id
+
+    try:
+        futures = [writer.submit(add_with_callbacks, title) for title in ('First', 'Second')]
+        movie_ids = [future.result() for future in futures]
+    finally:
+        writer.close()
+
+    assert all(Movie.get_by_id(movie_id) is not None for movie_id in movie_ids)
+    assert sorted(ran) == sorted(movie_ids)
+    assert 'An after-commit callback failed: division by zero' in capsys.readouterr().err